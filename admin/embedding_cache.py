@@ -0,0 +1,115 @@
+"""
+embedding_cache.py
+Caché persistente de embeddings para los scripts de indexación.
+
+Envuelve un modelo de embeddings de LlamaIndex y guarda cada vector en
+SQLite, indexado por hash del texto + modelo. Al re-ejecutar el indexador
+(p. ej. tras añadir libros nuevos) los textos ya vistos no vuelven a
+enviarse a la API.
+
+Los vectores se guardan en float16 (mitad de espacio en disco). Los
+vectores nuevos también pasan por float16 antes de devolverse, para que
+una ejecución con caché y otra sin caché produzcan exactamente los mismos
+cortes semánticos.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from pydantic import PrivateAttr
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+# SQLite limita el número de parámetros por sentencia
+_SQL_LOOKUP_CHUNK = 500
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Modelo de embeddings con caché en disco delante de otro modelo."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _conn: sqlite3.Connection = PrivateAttr()
+    _namespace: bytes = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache_dir, **kwargs):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs
+        )
+        self._inner = inner
+
+        # Cambiar de modelo (o de dimensiones) invalida la caché
+        dimensions = getattr(inner, "dimensions", None)
+        self._namespace = f"{inner.model_name}:{dimensions}\0".encode("utf-8")
+
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(cache_dir / "embeddings.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.blake2b(self._namespace + text.encode("utf-8"), digest_size=16).digest()
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, bytes]:
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        for i in range(0, len(unique_keys), _SQL_LOOKUP_CHUNK):
+            chunk = unique_keys[i:i + _SQL_LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            )
+            found.update(rows)
+
+        return found
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        # Textos sin vector en caché (sin duplicados dentro del lote)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self._inner.get_text_embedding_batch(list(missing.values()))
+            new_rows = [
+                (key, np.asarray(vector, dtype=np.float16).tobytes())
+                for key, vector in zip(missing.keys(), vectors)
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", new_rows
+            )
+            self._conn.commit()
+            cached.update(new_rows)
+
+        return [
+            np.frombuffer(cached[key], dtype=np.float16).astype(np.float32).tolist()
+            for key in keys
+        ]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embedding(text)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        # Las consultas no se repiten entre ejecuciones: sin caché
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._inner.aget_query_embedding(query)
@@ -8,14 +8,31 @@ USO:
 1. Coloca tus libros CFA en: ./data/cfa_books/
 2. Configura OPENAI_API_KEY en .env
 3. Ejecuta: python admin/generate_index.py
+   Sin preguntas (cron, CI): python admin/generate_index.py --yes --recreate
+   (o --append para añadir al índice existente)
 4. Los documentos se indexan en Elasticsearch
 
 SOLO el administrador ejecuta este script.
 """
 
+import os
+import re
 import sys
+import argparse
+import asyncio
+import hashlib
+import functools
+import contextlib
+import itertools
+import queue
+import threading
+import multiprocessing
 from pathlib import Path
+from collections import Counter, deque
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 # Añadir el directorio padre al path para imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -33,6 +50,15 @@ from config_elasticsearch import (
 # Importar API key de OpenAI
 from config import OPENAI_API_KEY
 
+# Importar logger
+try:
+    from utils.logger import get_logger
+    logger = get_logger('indexer')
+except ImportError:
+    import logging
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger('indexer')
+
 # ========================================
 # CONFIGURACIÓN
 # ========================================
@@ -40,53 +66,133 @@ from config import OPENAI_API_KEY
 # Donde están los libros CFA (relativo al proyecto)
 BOOKS_DIR = Path("./data/cfa_books")
 
+# Procesos para parsear PDFs en paralelo (parsing de PDF es CPU-bound)
+LOAD_WORKERS = int(os.getenv("INDEX_LOAD_WORKERS", max((os.cpu_count() or 2) - 1, 1)))
+
+# Tokens por batch de embeddings (límite de OpenAI: 300k por request).
+# Con conteo exacto (tiktoken) basta un margen pequeño.
+MAX_TOKENS_PER_BATCH = 290000
+
+# Batches de embeddings en vuelo a la vez contra la API de OpenAI
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# Bulk paralelo hacia Elasticsearch
+BULK_THREADS = min(8, os.cpu_count() or 1)
+BULK_CHUNK_SIZE = 500  # ~500 chunks con vector de 3072 dims ≈ 5-10 MB por request
+
+# Detección del nivel CFA en el nombre del archivo (III antes que II antes que I)
+CFA_LEVEL_PATTERN = re.compile(r"Level_(III|II|I|3|2|1)")
+CFA_LEVEL_MAP = {"I": "I", "1": "I", "II": "II", "2": "II", "III": "III", "3": "III"}
+
+# Chunks que el hilo de carga/split puede adelantar al de embeddings
+PIPELINE_QUEUE_SIZE = 1024
+
+# Duplicados que se acumulan antes de indexarlos con el vector del original
+DUPLICATE_FLUSH_SIZE = 5000
+
+# Settings del índice durante la carga masiva (se restauran al terminar):
+# sin refresh periódico, sin réplicas y translog asíncrono
+BULK_LOAD_SETTINGS = {
+    "index.refresh_interval": "-1",
+    "index.number_of_replicas": "0",
+    "index.translog.durability": "async",
+}
+
+# Barras de progreso solo en terminal interactiva (no en CI / logs redirigidos)
+SHOW_PROGRESS = sys.stderr.isatty()
+
 # ========================================
 # FUNCIONES
 # ========================================
 
 def print_header(text):
-    """Imprime un header bonito."""
-    print("\n" + "="*60)
-    print(f"  {text}")
-    print("="*60 + "\n")
+    """Registra un header bonito."""
+    logger.info("=" * 60)
+    logger.info(f"  {text}")
+    logger.info("=" * 60)
+
+
+def confirm(question, default):
+    """
+    Pide confirmación s/n por consola.
+    Sin terminal interactiva (CI, nohup, stdin redirigido) no bloquea:
+    devuelve `default` y lo deja registrado.
+    """
+    if not sys.stdin.isatty():
+        logger.info(f"{question} → {'s' if default else 'n'} (sin terminal interactiva)")
+        return default
+
+    return input(f"{question} (s/n): ").strip().lower() == 's'
+
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos para ejecuciones no interactivas (cron, CI)."""
+    parser = argparse.ArgumentParser(
+        description="Indexa los libros CFA en Elasticsearch (OpenAI Embeddings)."
+    )
+    parser.add_argument(
+        "-y", "--yes", action="store_true",
+        help="No pedir confirmación antes de empezar"
+    )
+    index_mode = parser.add_mutually_exclusive_group()
+    index_mode.add_argument(
+        "--recreate", dest="recreate", action="store_const", const=True,
+        help="Si el índice ya existe, eliminarlo y recrearlo"
+    )
+    index_mode.add_argument(
+        "--append", dest="recreate", action="store_const", const=False,
+        help="Si el índice ya existe, añadir los documentos al índice existente"
+    )
+    return parser.parse_args(argv)
 
 
 def check_prerequisites():
-    """Verifica que todo esté listo."""
+    """
+    Verifica que todo esté listo.
+
+    Returns:
+        Cliente de Elasticsearch ya conectado (se reutiliza en todo el proceso)
+    """
     print_header("Verificando Prerrequisitos")
     
     # 0. Verificar OpenAI API Key
     if not OPENAI_API_KEY:
-        print("❌ ERROR: OPENAI_API_KEY no encontrada")
-        print("   Configúrala en .env o como variable de entorno:")
-        print("   OPENAI_API_KEY=sk-...")
+        logger.error("❌ ERROR: OPENAI_API_KEY no encontrada")
+        logger.info("   Configúrala en .env o como variable de entorno:")
+        logger.info("   OPENAI_API_KEY=sk-...")
         sys.exit(1)
     else:
-        print(f"✅ OpenAI API Key configurada")
-        print(f"   Modelo: {EMBEDDING_MODEL}")
-        print(f"   Dimensiones: {EMBEDDING_DIMENSIONS}")
+        logger.info(f"✅ OpenAI API Key configurada")
+        logger.info(f"   Modelo: {EMBEDDING_MODEL}")
+        logger.info(f"   Dimensiones: {EMBEDDING_DIMENSIONS}")
     
     # 1. Verificar carpeta de libros
     if not BOOKS_DIR.exists():
-        print(f"❌ ERROR: No existe la carpeta: {BOOKS_DIR}")
-        print(f"   Créala y coloca tus PDFs ahí:")
-        print(f"   mkdir -p {BOOKS_DIR}")
+        logger.error(f"❌ ERROR: No existe la carpeta: {BOOKS_DIR}")
+        logger.info(f"   Créala y coloca tus PDFs ahí:")
+        logger.info(f"   mkdir -p {BOOKS_DIR}")
         sys.exit(1)
     
     # 2. Contar archivos
-    pdf_count = len(list(BOOKS_DIR.rglob("*.pdf")))
-    txt_count = len(list(BOOKS_DIR.rglob("*.txt")))
-    md_count = len(list(BOOKS_DIR.rglob("*.md")))
+    # Un solo recorrido del árbol (en vez de un rglob por extensión)
+    ext_counts = Counter(
+        os.path.splitext(name)[1]
+        for _, _, files in os.walk(BOOKS_DIR)
+        for name in files
+    )
+    pdf_count = ext_counts[".pdf"]
+    txt_count = ext_counts[".txt"]
+    md_count = ext_counts[".md"]
     total = pdf_count + txt_count + md_count
     
-    print(f"📚 Libros encontrados:")
-    print(f"   PDFs: {pdf_count}")
-    print(f"   TXTs: {txt_count}")
-    print(f"   Markdowns: {md_count}")
-    print(f"   TOTAL: {total}")
+    logger.info(f"📚 Libros encontrados:")
+    logger.info(f"   PDFs: {pdf_count}")
+    logger.info(f"   TXTs: {txt_count}")
+    logger.info(f"   Markdowns: {md_count}")
+    logger.info(f"   TOTAL: {total}")
     
     if total == 0:
-        print(f"\n❌ ERROR: No hay archivos en {BOOKS_DIR}")
+        logger.error(f"❌ ERROR: No hay archivos en {BOOKS_DIR}")
         sys.exit(1)
     
     # 3. Verificar dependencias
@@ -96,128 +202,270 @@ def check_prerequisites():
         from langchain_openai import OpenAIEmbeddings
         from langchain_elasticsearch import ElasticsearchStore
         from elasticsearch import Elasticsearch
-        print("✅ Dependencias instaladas correctamente")
+        logger.info("✅ Dependencias instaladas correctamente")
     except ImportError as e:
-        print(f"❌ ERROR: Falta instalar dependencias")
-        print(f"   {e}")
-        print(f"\n   Ejecuta: pip install -r requirements.txt")
+        logger.error(f"❌ ERROR: Falta instalar dependencias")
+        logger.info(f"   {e}")
+        logger.info(f"   Ejecuta: pip install -r requirements.txt")
         sys.exit(1)
     
     # 4. Verificar conexión a Elasticsearch
     client = get_elasticsearch_client()
     if not client:
-        print("❌ ERROR: No se pudo conectar a Elasticsearch")
+        logger.error("❌ ERROR: No se pudo conectar a Elasticsearch")
         sys.exit(1)
     
-    print("\n✅ Todos los prerrequisitos cumplidos\n")
-    return True
+    logger.info("✅ Todos los prerrequisitos cumplidos")
+    return client
+
 
+def _load_single_pdf(path):
+    """
+    Carga un PDF (una página por Document).
+    Debe estar a nivel de módulo para poder enviarse a ProcessPoolExecutor.
 
-def load_documents():
-    """Carga todos los documentos."""
+    Usa PyMuPDF (MuPDF, en C) si está instalado: extrae el texto mucho más
+    rápido que pypdf (Python puro). Si no está o no puede abrir el archivo,
+    se recurre a PyPDFLoader.
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    try:
+        from langchain_community.document_loaders import PyMuPDFLoader
+        return PyMuPDFLoader(path).load()
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"⚠️  PyMuPDF no pudo leer {path} ({e}), usando pypdf")
+
+    try:
+        return PyPDFLoader(path).load()
+    except Exception as e:
+        logger.warning(f"⚠️  Error cargando {path}: {e}")
+        return []
+
+
+def _map_bounded(executor, fn, items, max_in_flight):
+    """
+    Como executor.map (resultados en orden), pero con como mucho
+    `max_in_flight` tareas enviadas a la vez. executor.map envía todo el
+    corpus de golpe y los workers siguen parseando aunque el consumidor
+    (embeddings) vaya más lento: las páginas se acumulan en los futures.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_documents():
+    """
+    Genera los documentos archivo a archivo (streaming).
+
+    Los PDFs se parsean en paralelo (hasta LOAD_WORKERS procesos) y sus
+    páginas se entregan en orden a medida que cada archivo termina, de modo
+    que el splitter puede ir trabajando sin esperar a todo el corpus y las
+    páginas ya divididas se liberan.
+    """
     print_header("Cargando Documentos")
     
     from langchain_community.document_loaders import (
         DirectoryLoader,
         TextLoader,
-        PyPDFLoader,
     )
     
-    all_docs = []
-    
-    # PDFs
-    print("📄 Cargando PDFs...")
+    # PDFs: un proceso por archivo (hasta LOAD_WORKERS en paralelo)
+    logger.info("📄 Cargando PDFs...")
+    pdf_count = 0
     try:
-        pdf_loader = DirectoryLoader(
-            str(BOOKS_DIR),
-            glob="**/*.pdf",
-            loader_cls=PyPDFLoader,
-            show_progress=True
+        pdf_files = sorted(str(path) for path in BOOKS_DIR.rglob("*.pdf"))
+        workers = max(1, min(LOAD_WORKERS, len(pdf_files)))
+        logger.info(f"   {len(pdf_files)} archivos, {workers} procesos")
+
+        # spawn: este generador corre en el hilo productor mientras el hilo
+        # principal tiene hilos de parallel_bulk, el event loop y logging;
+        # hacer fork con hilos vivos puede dejar locks tomados en el hijo
+        executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
         )
-        pdf_docs = pdf_loader.load()
-        all_docs.extend(pdf_docs)
-        print(f"✅ {len(pdf_docs)} PDFs cargados\n")
+        with executor:
+            # Ventana acotada de archivos en vuelo; el orden se conserva
+            for file_docs in _map_bounded(executor, _load_single_pdf, pdf_files, workers * 2):
+                pdf_count += len(file_docs)
+                yield from file_docs
+
+        logger.info(f"✅ {pdf_count} PDFs cargados")
     except Exception as e:
-        print(f"⚠️  Error cargando PDFs: {e}\n")
+        logger.warning(f"⚠️  Error cargando PDFs: {e}")
     
-    # TXTs
-    print("📝 Cargando archivos TXT...")
+    # TXTs (I/O-bound: basta con hilos)
+    logger.info("📝 Cargando archivos TXT...")
+    txt_count = 0
     try:
         txt_loader = DirectoryLoader(
             str(BOOKS_DIR),
             glob="**/*.txt",
             loader_cls=TextLoader,
-            show_progress=True
+            show_progress=True,
+            use_multithreading=True,
+            max_concurrency=LOAD_WORKERS
         )
-        txt_docs = txt_loader.load()
-        all_docs.extend(txt_docs)
-        print(f"✅ {len(txt_docs)} TXTs cargados\n")
+        for doc in txt_loader.lazy_load():
+            txt_count += 1
+            yield doc
+        logger.info(f"✅ {txt_count} TXTs cargados")
     except Exception as e:
-        print(f"⚠️  Error cargando TXTs: {e}\n")
+        logger.warning(f"⚠️  Error cargando TXTs: {e}")
     
-    print(f"📚 TOTAL DOCUMENTOS CARGADOS: {len(all_docs)}\n")
-    return all_docs
+    logger.info(f"📚 TOTAL DOCUMENTOS CARGADOS: {pdf_count + txt_count}")
+
 
+def _get_document_splitter():
+    """
+    Devuelve (función doc -> chunks, nombre del splitter).
 
-def split_documents(documents):
-    """Divide documentos en chunks."""
+    Usa semantic-text-splitter (crate text-splitter, en Rust) si está
+    instalado: mismo criterio recursivo (párrafos > líneas > oraciones >
+    palabras) y tamaño en caracteres, pero compilado. Si no, se usa
+    RecursiveCharacterTextSplitter de LangChain.
+    """
+    try:
+        from semantic_text_splitter import TextSplitter
+        from langchain_core.documents import Document
+    except ImportError:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        class PrefilteredTextSplitter(RecursiveCharacterTextSplitter):
+            """
+            Descarta de entrada los separadores que no aparecen en el texto.
+            Un separador ausente del texto completo tampoco está en sus
+            trozos, así que la recursión no vuelve a buscarlo en cada nivel.
+            """
+
+            def split_text(self, text):
+                separators = [sep for sep in self._separators if not sep or sep in text]
+                return self._split_text(text, separators)
+
+        text_splitter = PrefilteredTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            length_function=len,
+            separators=["\n\n## ", "\n\n### ", "\n\n", "\n", ". ", " ", ""]
+        )
+        return (
+            lambda doc: text_splitter.split_documents([doc]),
+            "RecursiveCharacterTextSplitter (LangChain)"
+        )
+
+    text_splitter = TextSplitter(CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+
+    def split_document(doc):
+        return [
+            Document(page_content=text, metadata=dict(doc.metadata))
+            for text in text_splitter.chunks(doc.page_content)
+        ]
+
+    return split_document, "semantic-text-splitter (Rust)"
+
+
+def split_documents(documents, stats):
+    """
+    Divide documentos en chunks (generador).
+
+    Args:
+        documents: Iterable de documentos (p. ej. iter_documents()); se
+            consume en streaming, documento a documento.
+        stats: Dict que se rellena al terminar con num_documents y num_chunks
+
+    Yields:
+        Chunks con su metadata, en el orden de los documentos
+    """
     print_header("Dividiendo Documentos en Chunks")
     
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
-    
-    print(f"✂️  Configuración:")
-    print(f"   Chunk size: {CHUNK_SIZE}")
-    print(f"   Overlap: {CHUNK_OVERLAP}\n")
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        separators=["\n\n## ", "\n\n### ", "\n\n", "\n", ". ", " ", ""]
-    )
-    
-    chunks = text_splitter.split_documents(documents)
-    
-    # Añadir metadata adicional
-    for i, chunk in enumerate(chunks):
-        source = chunk.metadata.get('source', '')
-        
-        # Detectar Level CFA
-        if 'Level_I' in source or 'Level_1' in source:
-            chunk.metadata['cfa_level'] = 'I'
-        elif 'Level_II' in source or 'Level_2' in source:
-            chunk.metadata['cfa_level'] = 'II'
-        elif 'Level_III' in source or 'Level_3' in source:
-            chunk.metadata['cfa_level'] = 'III'
-        
-        chunk.metadata['chunk_id'] = f"chunk_{i+1}"
-        chunk.metadata['indexed_at'] = datetime.now().isoformat()
+    split_document, splitter_name = _get_document_splitter()
     
-    print(f"✅ {len(chunks)} chunks creados")
-    print(f"   Promedio: {len(chunks) / max(len(documents), 1):.1f} chunks por documento\n")
+    logger.info(f"✂️  Configuración:")
+    logger.info(f"   Splitter: {splitter_name}")
+    logger.info(f"   Chunk size: {CHUNK_SIZE}")
+    logger.info(f"   Overlap: {CHUNK_OVERLAP}")
     
-    return chunks
+    num_chunks = 0
+    num_documents = 0
+    total_chars = 0
+    min_chars = None
+    max_chars = 0
 
+    # Un único timestamp para toda la ejecución
+    indexed_at = datetime.now().isoformat()
+    levels_by_source = {}
 
-def create_or_recreate_index(es_client):
-    """Crea o recrea el índice en Elasticsearch."""
+    # Una sola pasada: dividir, añadir metadata y acumular estadísticas
+    for doc in documents:
+        num_documents += 1
+
+        for chunk in split_document(doc):
+            source = chunk.metadata.get('source', '')
+
+            # Detectar Level CFA (una búsqueda por archivo, no por chunk)
+            if source not in levels_by_source:
+                match = CFA_LEVEL_PATTERN.search(source)
+                levels_by_source[source] = CFA_LEVEL_MAP[match.group(1)] if match else None
+
+            cfa_level = levels_by_source[source]
+            if cfa_level:
+                chunk.metadata['cfa_level'] = cfa_level
+
+            num_chunks += 1
+            chunk.metadata['chunk_id'] = f"chunk_{num_chunks}"
+            chunk.metadata['indexed_at'] = indexed_at
+
+            size = len(chunk.page_content)
+            total_chars += size
+            max_chars = max(max_chars, size)
+            min_chars = size if min_chars is None else min(min_chars, size)
+
+            yield chunk
+
+    stats['num_documents'] = num_documents
+    stats['num_chunks'] = num_chunks
+
+    logger.info(f"✅ {num_chunks} chunks creados")
+    logger.info(f"   Promedio: {num_chunks / max(num_documents, 1):.1f} chunks por documento")
+    if num_chunks:
+        logger.info(f"   Tamaño (caracteres): min {min_chars}, máx {max_chars}, "
+              f"promedio {total_chars / num_chunks:.0f}")
+
+
+def create_or_recreate_index(es_client, recreate=None):
+    """
+    Crea o recrea el índice en Elasticsearch.
+
+    Args:
+        es_client: Cliente de Elasticsearch
+        recreate: Si el índice existe: True lo recrea, False añade a él,
+            None pregunta (ver --recreate / --append)
+    """
     print_header("Configurando Índice en Elasticsearch")
     
     # Verificar si el índice existe
     if es_client.indices.exists(index=ES_INDEX_NAME):
-        print(f"⚠️  El índice '{ES_INDEX_NAME}' ya existe.")
-        response = input("¿Deseas eliminarlo y recrearlo? (s/n): ")
+        logger.warning(f"⚠️  El índice '{ES_INDEX_NAME}' ya existe.")
+        if recreate is None:
+            recreate = confirm("¿Deseas eliminarlo y recrearlo?", default=False)
         
-        if response.lower() == 's':
-            print(f"🗑️  Eliminando índice '{ES_INDEX_NAME}'...")
+        if recreate:
+            logger.info(f"🗑️  Eliminando índice '{ES_INDEX_NAME}'...")
             es_client.indices.delete(index=ES_INDEX_NAME)
-            print("✅ Índice eliminado")
+            logger.info("✅ Índice eliminado")
         else:
-            print("ℹ️  Los documentos se añadirán al índice existente")
+            logger.info("ℹ️  Los documentos se añadirán al índice existente")
             return
     
     # Crear índice con mapping para vectores densos
-    print(f"🔨 Creando índice '{ES_INDEX_NAME}'...")
+    logger.info(f"🔨 Creando índice '{ES_INDEX_NAME}'...")
     
     index_mapping = {
         "mappings": {
@@ -227,7 +475,11 @@ def create_or_recreate_index(es_client):
                     "type": "dense_vector",
                     "dims": EMBEDDING_DIMENSIONS,  # 1536 para OpenAI text-embedding-3-small
                     "index": True,
-                    "similarity": "cosine"
+                    "similarity": "cosine",
+                    # Cuantización int8 hecha por ES (8.12+): el grafo HNSW
+                    # ocupa ~4x menos memoria. El microservicio RAG sigue
+                    # enviando queries en float, no hay cambios en el cliente.
+                    "index_options": {"type": "int8_hnsw"}
                 },
                 "metadata": {"type": "object"}
             }
@@ -235,67 +487,400 @@ def create_or_recreate_index(es_client):
     }
     
     es_client.indices.create(index=ES_INDEX_NAME, body=index_mapping)
-    print(f"✅ Índice '{ES_INDEX_NAME}' creado\n")
+    logger.info(f"✅ Índice '{ES_INDEX_NAME}' creado")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_tokenizer():
+    """Tokenizer de OpenAI para EMBEDDING_MODEL (None si tiktoken no está instalado)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
 
 
 def estimate_tokens(text: str) -> int:
     """
-    Estima la cantidad de tokens en un texto.
-    Aproximación: ~4 caracteres = 1 token para inglés.
+    Cuenta los tokens de un texto con el tokenizer del modelo de embeddings.
+    Sin tiktoken: aproximación de ~4 caracteres = 1 token.
     """
-    return len(text) // 4
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return len(text) // 4
+    return len(tokenizer.encode_ordinary(text))
 
 
-def create_batches(chunks, max_tokens_per_batch=250000):
+def count_tokens(texts, slice_size=1000):
+    """
+    Cuenta tokens de muchos textos de una vez.
+    encode_ordinary_batch tokeniza en paralelo (hilos nativos de tiktoken);
+    se procesa por tramos para no tener todos los tokens en memoria.
+    """
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return [len(text) // 4 for text in texts]
+
+    counts = []
+    for start in range(0, len(texts), slice_size):
+        encoded = tokenizer.encode_ordinary_batch(texts[start:start + slice_size])
+        counts.extend(len(tokens) for tokens in encoded)
+    return counts
+
+
+def create_batches(chunks, max_tokens_per_batch=MAX_TOKENS_PER_BATCH):
     """
     Divide chunks en batches que no excedan el límite de tokens.
 
+    Mismo reparto greedy que antes, pero vectorizado: suma acumulada de
+    tokens y np.searchsorted para encontrar cada corte.
+
     Args:
         chunks: Lista de documentos
-        max_tokens_per_batch: Límite de tokens por batch (dejamos margen de 250k vs 300k límite)
+        max_tokens_per_batch: Límite de tokens por batch (conteo exacto: margen
+            pequeño frente al límite de 300k de OpenAI)
 
     Returns:
         Lista de lotes de chunks
     """
+    if not chunks:
+        return []
+
+    sizes = np.asarray(
+        count_tokens([chunk.page_content for chunk in chunks]),
+        dtype=np.int64
+    )
+    cumulative = np.cumsum(sizes)
+
     batches = []
-    current_batch = []
-    current_tokens = 0
+    start = 0
+    total = len(chunks)
 
-    for chunk in chunks:
-        # Estimar tokens del chunk
-        chunk_tokens = estimate_tokens(chunk.page_content)
-
-        # Si añadir este chunk excede el límite, crear nuevo batch
-        if current_tokens + chunk_tokens > max_tokens_per_batch and current_batch:
-            batches.append(current_batch)
-            current_batch = [chunk]
-            current_tokens = chunk_tokens
-        else:
-            current_batch.append(chunk)
-            current_tokens += chunk_tokens
+    while start < total:
+        # Tokens acumulados antes de este batch
+        offset = cumulative[start - 1] if start else 0
+
+        # Primer índice cuyo acumulado excede el límite del batch
+        end = int(np.searchsorted(cumulative, offset + max_tokens_per_batch, side="right"))
+
+        # Un chunk que por sí solo supera el límite va en su propio batch
+        end = max(end, start + 1)
 
-    # Añadir último batch si tiene contenido
-    if current_batch:
-        batches.append(current_batch)
+        batches.append(chunks[start:end])
+        start = end
 
     return batches
 
 
-def index_documents_to_elasticsearch(chunks):
-    """Indexa los chunks en Elasticsearch usando OpenAI Embeddings con batching."""
+def _iter_unique_batches(chunks, duplicates):
+    """
+    Agrupa el flujo de chunks en batches para embeber, sin duplicados.
+
+    Los libros repiten mucho texto (cabeceras, disclaimers, glosarios de
+    fórmulas): cada chunk recibe metadata['content_sha'] y solo la primera
+    aparición de cada contenido va a los batches. Las demás copias se
+    añaden a `duplicates` en cuanto el batch de su original se ha entregado,
+    y reutilizan el vector ya indexado (ver _iter_duplicate_actions).
+
+    Los chunks se acumulan hasta llenar ~EMBED_CONCURRENCY batches y se
+    reparten con create_batches; el último batch (incompleto) pasa al
+    siguiente tramo.
+    """
+    # ~4 caracteres por token: solo decide cuándo repartir, no el tamaño
+    buffer_chars = 4 * MAX_TOKENS_PER_BATCH * EMBED_CONCURRENCY
+
+    seen = set()
+    pending = []
+    pending_shas = set()
+    pending_chars = 0
+    # Copias cuyo original sigue en `pending` (aún no entregado)
+    waiting = []
+
+    for chunk in chunks:
+        content_sha = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        chunk.metadata['content_sha'] = content_sha
+
+        if content_sha in seen:
+            (waiting if content_sha in pending_shas else duplicates).append(chunk)
+            continue
+
+        seen.add(content_sha)
+        pending.append(chunk)
+        pending_shas.add(content_sha)
+        pending_chars += len(chunk.page_content)
+
+        if pending_chars >= buffer_chars:
+            batches = create_batches(pending)
+            yield from batches[:-1]
+            pending = batches[-1]
+            pending_shas = {c.metadata['content_sha'] for c in pending}
+            pending_chars = sum(len(c.page_content) for c in pending)
+
+            still_waiting = []
+            for copy in waiting:
+                (still_waiting if copy.metadata['content_sha'] in pending_shas else duplicates).append(copy)
+            waiting = still_waiting
+
+    yield from create_batches(pending)
+    duplicates.extend(waiting)
+
+
+def _iter_until_duplicates(batches, duplicates, limit=DUPLICATE_FLUSH_SIZE):
+    """
+    Entrega batches hasta que haya `limit` duplicados pendientes (un tramo).
+    No cierra `batches`: el siguiente tramo sigue donde terminó este.
+    """
+    for batch in batches:
+        yield batch
+        if len(duplicates) >= limit:
+            return
+
+
+async def _embed_batches(embeddings, batches):
+    """Embebe varios batches a la vez (requests concurrentes a OpenAI)."""
+    return await asyncio.gather(*[
+        embeddings.aembed_documents([chunk.page_content for chunk in batch])
+        for batch in batches
+    ])
+
+
+def _iter_bulk_actions(batches, embeddings, loop):
+    """
+    Genera acciones de bulk con los embeddings ya calculados.
+
+    Los batches se embeben de EMBED_CONCURRENCY en EMBED_CONCURRENCY con el
+    cliente async de OpenAI, así que la latencia de la API se solapa en vez
+    de sumarse; la ventana acota los vectores en memoria y los requests en
+    vuelo (límites de rate de OpenAI).
+
+    Es un generador: parallel_bulk lo consume desde el hilo task-handler de
+    su ThreadPool (imap), NO desde el hilo principal, así que el event loop
+    y las llamadas de embedding viven en ese hilo. La siguiente ventana se
+    embebe mientras los workers del pool suben la anterior. No guardar aquí
+    estado que deba vivir en el hilo principal (señales, UI, thread-locals).
+    Usa el mismo formato de documento que ElasticsearchStore de
+    LangChain (text / vector / metadata), que es lo que lee el microservicio RAG.
+    Cada documento usa su content_sha como _id.
+
+    `loop` lo crea el llamador y es el mismo para todos los tramos: el
+    cliente async de OpenAI mantiene conexiones ligadas al loop en que se
+    crearon.
+    """
+    batches = iter(batches)
+    embedded = 0
+
+    while True:
+        window = list(itertools.islice(batches, EMBED_CONCURRENCY))
+        if not window:
+            break
+
+        window_chunks = sum(len(batch) for batch in window)
+        logger.debug(f"📤 Embebiendo batches {embedded + 1}-{embedded + len(window)} "
+              f"({window_chunks} chunks)...")
+        embedded += len(window)
+
+        window_vectors = loop.run_until_complete(_embed_batches(embeddings, window))
+
+        for batch, vectors in zip(window, window_vectors):
+            for chunk, vector in zip(batch, vectors):
+                yield {
+                    "_index": ES_INDEX_NAME,
+                    "_id": chunk.metadata['content_sha'],
+                    "_source": {
+                        "text": chunk.page_content,
+                        "vector": vector,
+                        "metadata": chunk.metadata,
+                    },
+                }
+
+
+def _iter_duplicate_actions(es_client, duplicates):
+    """
+    Genera acciones de bulk para las copias de chunks ya indexados.
+
+    El vector se lee del documento original (mget por _id = content_sha,
+    en tiempo real: no necesita refresh). Si el original no se indexó, la
+    copia se omite; ese fallo ya se contó al indexar el original.
+    """
+    for start in range(0, len(duplicates), BULK_CHUNK_SIZE):
+        window = duplicates[start:start + BULK_CHUNK_SIZE]
+        ids = list(dict.fromkeys(chunk.metadata['content_sha'] for chunk in window))
+
+        response = es_client.mget(index=ES_INDEX_NAME, ids=ids, source_includes=["vector"])
+        vectors = {
+            doc["_id"]: doc["_source"]["vector"]
+            for doc in response["docs"]
+            if doc.get("found")
+        }
+
+        for chunk in window:
+            metadata = chunk.metadata
+            vector = vectors.get(metadata['content_sha'])
+            if vector is None:
+                continue
+            yield {
+                "_index": ES_INDEX_NAME,
+                # _id determinista: re-ejecutar con --append sobrescribe la copia
+                "_id": f"{metadata['content_sha']}:{metadata.get('source', '')}:{metadata.get('chunk_id', '')}",
+                "_source": {
+                    "text": chunk.page_content,
+                    "vector": vector,
+                    "metadata": chunk.metadata,
+                },
+            }
+
+
+# Marca de fin de la cola de iter_in_background
+_END_OF_STREAM = object()
+
+
+def _produce(items, out_queue, stop_event, errors):
+    """Hilo productor de iter_in_background."""
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                out_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for item in items:
+            if not put(item):
+                return
+    except Exception as e:
+        errors.append(e)
+    finally:
+        put(_END_OF_STREAM)
+
+
+def iter_in_background(items, maxsize=PIPELINE_QUEUE_SIZE):
+    """
+    Consume un iterable en un hilo aparte y lo entrega por una cola acotada.
+
+    Con iter_documents() + split_documents() la carga de PDFs y el split
+    avanzan mientras el hilo principal espera a OpenAI y a Elasticsearch,
+    en lugar de ejecutarse por etapas. La cola limita cuántos chunks se
+    adelantan (memoria acotada). Los errores del productor se relanzan aquí.
+    """
+    out_queue = queue.Queue(maxsize=maxsize)
+    stop_event = threading.Event()
+    errors = []
+
+    producer = threading.Thread(
+        target=_produce,
+        args=(items, out_queue, stop_event, errors),
+        name="chunk-producer",
+        daemon=True
+    )
+    producer.start()
+
+    try:
+        while True:
+            item = out_queue.get()
+            if item is _END_OF_STREAM:
+                break
+            yield item
+
+        if errors:
+            raise errors[0]
+    finally:
+        stop_event.set()
+        producer.join()
+
+
+@contextlib.contextmanager
+def bulk_load_settings(es_client):
+    """
+    Aplica BULK_LOAD_SETTINGS al índice mientras dura la carga masiva.
+
+    Sin refresh cada segundo ES no crea un segmento nuevo por intervalo, y
+    sin réplicas cada documento se escribe una sola vez. Al salir (también
+    si la indexación falla) se restauran los valores previos del índice y
+    se hace un refresh para que los documentos queden visibles.
+    """
+    current = es_client.indices.get_settings(
+        index=ES_INDEX_NAME, flat_settings=True, include_defaults=True
+    )[ES_INDEX_NAME]
+    original = {
+        key: current["settings"].get(key, current.get("defaults", {}).get(key))
+        for key in BULK_LOAD_SETTINGS
+    }
+
+    es_client.indices.put_settings(index=ES_INDEX_NAME, settings=BULK_LOAD_SETTINGS)
+    try:
+        yield
+    finally:
+        es_client.indices.put_settings(index=ES_INDEX_NAME, settings=original)
+        es_client.indices.refresh(index=ES_INDEX_NAME)
+        logger.info(f"🔄 Settings del índice restaurados: {original}")
+
+
+def _bulk_index(es_client, actions, desc="Indexando"):
+    """
+    Envía acciones con parallel_bulk. Returns: (indexados, fallidos).
+    El progreso va a una barra tqdm en terminal; sin terminal, al log cada
+    BULK_CHUNK_SIZE documentos.
+    """
+    from elasticsearch import helpers
+    from tqdm import tqdm
+
+    indexed = 0
+    failed = 0
+
+    with tqdm(desc=desc, unit="chunk", disable=not SHOW_PROGRESS) as progress:
+        for ok, info in helpers.parallel_bulk(
+            es_client.options(request_timeout=120),
+            actions,
+            thread_count=BULK_THREADS,
+            chunk_size=BULK_CHUNK_SIZE,
+            queue_size=4,
+            raise_on_error=False
+        ):
+            progress.update()
+            if ok:
+                indexed += 1
+                if not SHOW_PROGRESS and indexed % BULK_CHUNK_SIZE == 0:
+                    logger.info(f"   ✅ {indexed} chunks indexados")
+            else:
+                failed += 1
+                if failed <= 5:
+                    logger.error(f"   ❌ Documento rechazado: {info}")
+
+    return indexed, failed
+
+
+def index_documents_to_elasticsearch(chunks, es_client):
+    """
+    Indexa los chunks en Elasticsearch usando OpenAI Embeddings con batching.
+
+    Los chunks se consumen en streaming (p. ej. desde iter_in_background), se
+    deduplican por contenido, se embeben con requests async concurrentes y
+    se envían con helpers.parallel_bulk (varios _bulk concurrentes).
+
+    La indexación va por tramos: cuando se acumulan DUPLICATE_FLUSH_SIZE
+    copias de textos repetidos, se termina el tramo (sus originales quedan
+    indexados) y las copias se indexan con el vector del original. Así no
+    se guardan todas las copias del corpus hasta el final.
+    """
     print_header("Indexando Documentos en Elasticsearch")
 
     from langchain_openai import OpenAIEmbeddings
-    from langchain_elasticsearch import ElasticsearchStore
-    from config_elasticsearch import get_es_config
 
-    print(f"🧠 Modelo de embeddings OpenAI: {EMBEDDING_MODEL}")
-    print(f"   Dimensiones: {EMBEDDING_DIMENSIONS}")
-    print(f"   ⚡ Velocidad: ~1 segundo por lote\n")
+    logger.info(f"🧠 Modelo de embeddings OpenAI: {EMBEDDING_MODEL}")
+    logger.info(f"   Dimensiones: {EMBEDDING_DIMENSIONS}")
+    logger.info(f"   📦 Batches de hasta {MAX_TOKENS_PER_BATCH} tokens")
+    logger.info(f"   ⚡ Embeddings: {EMBED_CONCURRENCY} batches concurrentes")
+    logger.info(f"   📤 Bulk paralelo: {BULK_THREADS} hilos, {BULK_CHUNK_SIZE} docs/request")
 
     # Verificar API key
     if not OPENAI_API_KEY:
-        print("❌ ERROR: OPENAI_API_KEY no encontrada")
+        logger.error("❌ ERROR: OPENAI_API_KEY no encontrada")
         sys.exit(1)
 
     # Inicializar embeddings de OpenAI
@@ -306,148 +891,151 @@ def index_documents_to_elasticsearch(chunks):
         max_retries=3
     )
 
-    # Obtener configuración
-    es_config = get_es_config()
-
-    # Crear batches para evitar exceder límite de tokens
-    print(f"📦 Creando batches de documentos...")
-    batches = create_batches(chunks, max_tokens_per_batch=250000)
-    print(f"   Total chunks: {len(chunks)}")
-    print(f"   Total batches: {len(batches)}")
-    print(f"   Chunks por batch (aprox): {len(chunks) // len(batches) if batches else 0}\n")
+    # Un único event loop para todo el proceso: el cliente async de OpenAI
+    # mantiene conexiones ligadas al loop en que se crearon
+    loop = asyncio.new_event_loop()
 
     try:
-        vector_store = None
+        duplicates = []
         total_indexed = 0
+        failed = 0
+        dup_total = 0
 
-        for i, batch in enumerate(batches, 1):
-            print(f"📤 Procesando batch {i}/{len(batches)} ({len(batch)} chunks)...")
-
-            if i == 1:
-                # Primer batch: crear el vector store
-                vector_store = ElasticsearchStore.from_documents(
-                    documents=batch,
-                    embedding=embeddings,
-                    index_name=ES_INDEX_NAME,
-                    es_url=es_config["es_url"],
-                    es_user=es_config["es_user"],
-                    es_password=es_config["es_password"],
-                    bulk_kwargs={"request_timeout": 120}
+        def flush_duplicates():
+            # Copias cuyos originales ya están indexados, reutilizando su vector
+            ready = duplicates[:]
+            duplicates.clear()
+            logger.info(f"   ♻️  {len(ready)} duplicados reutilizan el vector del original")
+            return _bulk_index(
+                es_client, _iter_duplicate_actions(es_client, ready), desc="Duplicados"
+            )
+
+        with bulk_load_settings(es_client):
+            batches = _iter_unique_batches(chunks, duplicates)
+
+            for first_batch in batches:
+                # 1. Tramo de textos únicos: embeber + indexar en streaming
+                segment = itertools.chain(
+                    [first_batch], _iter_until_duplicates(batches, duplicates)
                 )
-            else:
-                # Batches siguientes: añadir al vector store existente
-                vector_store.add_documents(
-                    documents=batch,
-                    bulk_kwargs={"request_timeout": 120}
+                indexed, segment_failed = _bulk_index(
+                    es_client, _iter_bulk_actions(segment, embeddings, loop)
                 )
+                total_indexed += indexed
+                failed += segment_failed
+
+                # 2. Copias acumuladas en el tramo
+                if duplicates:
+                    dup_indexed, dup_failed = flush_duplicates()
+                    dup_total += dup_indexed
+                    failed += dup_failed
+
+            # Copias que esperaban al último batch
+            if duplicates:
+                dup_indexed, dup_failed = flush_duplicates()
+                dup_total += dup_indexed
+                failed += dup_failed
+
+        logger.info(f"   Chunks únicos indexados: {total_indexed}")
+        total_indexed += dup_total
 
-            total_indexed += len(batch)
-            print(f"   ✅ Batch {i} completado ({total_indexed}/{len(chunks)} chunks indexados)")
+        if failed:
+            logger.error(f"❌ {failed} chunks no se pudieron indexar ({total_indexed} OK)")
+            return False
 
-        print(f"\n✅ Todos los documentos indexados exitosamente ({total_indexed} chunks)\n")
+        logger.info(f"✅ Todos los documentos indexados exitosamente ({total_indexed} chunks)")
         return True
 
     except Exception as e:
-        print(f"❌ ERROR indexando documentos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ ERROR indexando documentos: {e}")
         return False
+    finally:
+        loop.close()
 
 
-def verify_index():
+def verify_index(es_client):
     """Verifica que el índice se haya creado correctamente."""
     print_header("Verificando Índice")
     
-    es_client = get_elasticsearch_client()
-    
     try:
         # Contar documentos
         count = es_client.count(index=ES_INDEX_NAME)
         doc_count = count['count']
         
-        print(f"✅ Índice verificado:")
-        print(f"   Nombre: {ES_INDEX_NAME}")
-        print(f"   Documentos: {doc_count}")
+        logger.info(f"✅ Índice verificado:")
+        logger.info(f"   Nombre: {ES_INDEX_NAME}")
+        logger.info(f"   Documentos: {doc_count}")
         
         # Obtener un documento de muestra
         sample = es_client.search(index=ES_INDEX_NAME, size=1)
         if sample['hits']['hits']:
-            print(f"   Estado: Activo y funcional ✅\n")
+            logger.info(f"   Estado: Activo y funcional ✅")
         
         return True
     
     except Exception as e:
-        print(f"❌ Error verificando índice: {e}")
+        logger.error(f"❌ Error verificando índice: {e}")
         return False
 
 
-def main():
+def main(argv=None):
     """Función principal."""
-    print("\n" + "🚀"*30)
-    print("  INDEXADOR ELASTICSEARCH - Sistema CFA")
-    print("  LangChain 1.0 + OpenAI Embeddings")
-    print("🚀"*30)
+    args = parse_args(argv)
+
+    logger.info("🚀" * 30)
+    logger.info("  INDEXADOR ELASTICSEARCH - Sistema CFA")
+    logger.info("  LangChain 1.0 + OpenAI Embeddings")
+    logger.info("🚀" * 30)
     
-    print(f"\n📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"📂 Libros: {BOOKS_DIR}")
-    print(f"📦 Índice ES: {ES_INDEX_NAME}")
-    print(f"🧠 Embeddings: {EMBEDDING_MODEL} (OpenAI)\n")
+    logger.info(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"📂 Libros: {BOOKS_DIR}")
+    logger.info(f"📦 Índice ES: {ES_INDEX_NAME}")
+    logger.info(f"🧠 Embeddings: {EMBEDDING_MODEL} (OpenAI)")
     
     # Confirmar
-    response = input("¿Deseas continuar? (s/n): ")
-    if response.lower() != 's':
-        print("❌ Cancelado por el usuario.")
+    if not args.yes and not confirm("¿Deseas continuar?", default=True):
+        logger.info("❌ Cancelado por el usuario.")
         sys.exit(0)
     
     try:
         # 1. Verificar prerrequisitos
-        check_prerequisites()
-        
-        # 2. Obtener cliente ES
-        es_client = get_elasticsearch_client()
-        if not es_client:
-            print("❌ No se pudo conectar a Elasticsearch")
-            sys.exit(1)
+        # 2. Obtener cliente ES (una sola conexión para todo el proceso)
+        es_client = check_prerequisites()
         
         # 3. Configurar índice
-        create_or_recreate_index(es_client)
+        create_or_recreate_index(es_client, recreate=args.recreate)
         
-        # 4. Cargar documentos
-        documents = load_documents()
+        # 4-6. Cargar, dividir e indexar en pipeline: la carga y el split
+        # corren en un hilo aparte mientras se embebe e indexa
+        stats = {}
+        chunks = iter_in_background(split_documents(iter_documents(), stats))
+        success = index_documents_to_elasticsearch(chunks, es_client)
         
-        if not documents:
-            print("❌ ERROR: No se cargaron documentos.")
+        if not stats.get('num_documents'):
+            logger.error("❌ ERROR: No se cargaron documentos.")
             sys.exit(1)
         
-        # 5. Dividir en chunks
-        chunks = split_documents(documents)
-        
-        # 6. Indexar en Elasticsearch
-        success = index_documents_to_elasticsearch(chunks)
-        
         if not success:
-            print("❌ ERROR: Fallo en la indexación")
+            logger.error("❌ ERROR: Fallo en la indexación")
             sys.exit(1)
         
         # 7. Verificar
-        verify_index()
+        verify_index(es_client)
         
         # Resumen final
         print_header("✅ PROCESO COMPLETADO EXITOSAMENTE")
-        print(f"📊 Resumen:")
-        print(f"   - Documentos procesados: {len(documents)}")
-        print(f"   - Chunks generados: {len(chunks)}")
-        print(f"   - Índice Elasticsearch: {ES_INDEX_NAME}")
-        print(f"   - Embeddings: OpenAI {EMBEDDING_MODEL}")
-        print(f"\n🎯 Los usuarios ya pueden consultar este material desde la app.\n")
+        logger.info(f"📊 Resumen:")
+        logger.info(f"   - Documentos procesados: {stats['num_documents']}")
+        logger.info(f"   - Chunks generados: {stats['num_chunks']}")
+        logger.info(f"   - Índice Elasticsearch: {ES_INDEX_NAME}")
+        logger.info(f"   - Embeddings: OpenAI {EMBEDDING_MODEL}")
+        logger.info(f"🎯 Los usuarios ya pueden consultar este material desde la app.")
         
     except KeyboardInterrupt:
-        print("\n\n❌ Proceso cancelado por el usuario.")
+        logger.error("❌ Proceso cancelado por el usuario.")
         sys.exit(1)
     except Exception as e:
-        print(f"\n❌ ERROR CRÍTICO: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ ERROR CRÍTICO: {e}")
         sys.exit(1)
 
 
@@ -10,16 +10,27 @@ USO:
 1. Coloca tus libros CFA en: ./data/cfa_books/
 2. Configura OPENAI_API_KEY en .env
 3. Ejecuta: python admin/generate_index_semantic.py
+   Sin preguntas (cron, CI): python admin/generate_index_semantic.py --yes --recreate
+   (o --append para añadir al índice existente)
 4. Los documentos se indexan en Elasticsearch con índice semántico
 
 SOLO el administrador ejecuta este script.
 """
 
+import os
+import re
 import sys
+import argparse
+import functools
+import multiprocessing
 from pathlib import Path
+from collections import Counter
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 
+import numpy as np
+
 # Suprimir warnings de LlamaIndex
 warnings.filterwarnings('ignore')
 
@@ -31,15 +42,24 @@ from config_elasticsearch import (
     get_elasticsearch_client,
     ES_INDEX_NAME,
     EMBEDDING_MODEL,
-    EMBEDDING_DIMENSIONS,
-    ES_URL,
-    ES_USERNAME,
-    ES_PASSWORD
+    EMBEDDING_DIMENSIONS
 )
 
+# Ventana acotada de tareas del pool (compartida con el indexador tradicional)
+from admin.generate_index import _map_bounded
+
 # Importar API key de OpenAI
 from config import OPENAI_API_KEY
 
+# Importar logger
+try:
+    from utils.logger import get_logger
+    logger = get_logger('indexer_semantic')
+except ImportError:
+    import logging
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger('indexer_semantic')
+
 # ========================================
 # CONFIGURACIÓN
 # ========================================
@@ -50,127 +70,287 @@ BOOKS_DIR = Path("./data/cfa_books")
 # Nombre del índice semántico (diferente al tradicional)
 SEMANTIC_INDEX_NAME = ES_INDEX_NAME + "_semantic"
 
+# Detección del nivel CFA en el nombre del archivo (III antes que II antes que I)
+CFA_LEVEL_PATTERN = re.compile(r"Level_(III|II|I|3|2|1)")
+CFA_LEVEL_MAP = {"I": "I", "1": "I", "II": "II", "2": "II", "III": "III", "3": "III"}
+
+# Oraciones más cortas que esto (o sin letras: "p. 37", "Figure 1.", viñetas)
+# se pegan a la oración anterior antes del análisis semántico
+MIN_SENTENCE_CHARS = 30
+
+# Extensiones soportadas por el indexador
+SUPPORTED_EXTS = (".pdf", ".txt", ".md")
+
+# Procesos para parsear archivos en paralelo (parsing de PDF es CPU-bound)
+LOAD_WORKERS = int(os.getenv("INDEX_LOAD_WORKERS", os.cpu_count() or 1))
+
+# Textos por request a la API de embeddings. El default de OpenAIEmbedding
+# (100) obliga a muchas idas y vueltas en el análisis semántico, donde cada
+# texto es un grupo corto de oraciones; la API admite hasta 2048 por request.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# Caché de embeddings en disco (junto a los libros, fuera del repo)
+EMBED_CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", str(BOOKS_DIR.parent / ".embed_cache")))
+
+# Indexación: tope de tokens por llamada de embeddings
+# (OpenAI rechaza requests de embeddings por encima de 300k tokens)
+MAX_TOKENS_PER_EMBED_CALL = 250000
+
+# Decimales de los vectores en el JSON del _bulk (los embeddings de OpenAI
+# están normalizados: componentes ~1e-2, así que 5 decimales ≈ float16)
+EMBEDDING_JSON_DECIMALS = 5
+
+# Bulk paralelo hacia Elasticsearch
+BULK_THREADS = 4
+BULK_CHUNK_SIZE = 500
+
+# Barras de progreso solo en terminal interactiva (no en CI / logs redirigidos)
+SHOW_PROGRESS = sys.stderr.isatty()
+
 # ========================================
 # FUNCIONES
 # ========================================
 
 def print_header(text):
-    """Imprime un header bonito."""
-    print("\n" + "="*60)
-    print(f"  {text}")
-    print("="*60 + "\n")
+    """Registra un header bonito."""
+    logger.info("=" * 60)
+    logger.info(f"  {text}")
+    logger.info("=" * 60)
+
+
+def confirm(question, default):
+    """
+    Pide confirmación s/n por consola.
+    Sin terminal interactiva (CI, nohup, stdin redirigido) no bloquea:
+    devuelve `default` y lo deja registrado.
+    """
+    if not sys.stdin.isatty():
+        logger.info(f"{question} → {'s' if default else 'n'} (sin terminal interactiva)")
+        return default
+
+    return input(f"{question} (s/n): ").strip().lower() == 's'
+
+
+def parse_args(argv=None):
+    """Opciones de línea de comandos para ejecuciones no interactivas (cron, CI)."""
+    parser = argparse.ArgumentParser(
+        description="Indexa los libros CFA con Semantic Chunking (LlamaIndex)."
+    )
+    parser.add_argument(
+        "-y", "--yes", action="store_true",
+        help="No pedir confirmación antes de empezar"
+    )
+    index_mode = parser.add_mutually_exclusive_group()
+    index_mode.add_argument(
+        "--recreate", dest="recreate", action="store_const", const=True,
+        help="Si el índice ya existe, eliminarlo y recrearlo"
+    )
+    index_mode.add_argument(
+        "--append", dest="recreate", action="store_const", const=False,
+        help="Si el índice ya existe, añadir los nodos al índice existente"
+    )
+    return parser.parse_args(argv)
+
+
+@functools.lru_cache(maxsize=1)
+def get_embed_model():
+    """
+    Modelo de embeddings compartido por el análisis semántico y la indexación.
+    Una sola instancia reutiliza el cliente HTTP (y sus conexiones keep-alive).
+    Va envuelto en una caché en disco: re-ejecutar el indexador no vuelve a
+    pagar los embeddings de textos ya procesados.
+    """
+    from llama_index.embeddings.openai import OpenAIEmbedding
+    from admin.embedding_cache import CachedEmbedding
+
+    openai_model = OpenAIEmbedding(
+        model=EMBEDDING_MODEL,
+        api_key=OPENAI_API_KEY,
+        embed_batch_size=EMBED_BATCH_SIZE
+    )
+    return CachedEmbedding(openai_model, cache_dir=EMBED_CACHE_DIR)
 
 
 def check_prerequisites():
-    """Verifica que todo esté listo."""
+    """
+    Verifica que todo esté listo.
+
+    Returns:
+        Cliente de Elasticsearch ya conectado (se reutiliza en todo el proceso)
+    """
     print_header("Verificando Prerrequisitos")
 
     # 0. Verificar OpenAI API Key
     if not OPENAI_API_KEY:
-        print("❌ ERROR: OPENAI_API_KEY no encontrada")
-        print("   Configúrala en .env o como variable de entorno:")
-        print("   OPENAI_API_KEY=sk-...")
+        logger.error("❌ ERROR: OPENAI_API_KEY no encontrada")
+        logger.info("   Configúrala en .env o como variable de entorno:")
+        logger.info("   OPENAI_API_KEY=sk-...")
         sys.exit(1)
     else:
-        print(f"✅ OpenAI API Key configurada")
-        print(f"   Modelo: {EMBEDDING_MODEL}")
-        print(f"   Dimensiones: {EMBEDDING_DIMENSIONS}")
+        logger.info(f"✅ OpenAI API Key configurada")
+        logger.info(f"   Modelo: {EMBEDDING_MODEL}")
+        logger.info(f"   Dimensiones: {EMBEDDING_DIMENSIONS}")
 
     # 1. Verificar carpeta de libros
     if not BOOKS_DIR.exists():
-        print(f"❌ ERROR: No existe la carpeta: {BOOKS_DIR}")
-        print(f"   Créala y coloca tus PDFs ahí:")
-        print(f"   mkdir -p {BOOKS_DIR}")
+        logger.error(f"❌ ERROR: No existe la carpeta: {BOOKS_DIR}")
+        logger.info(f"   Créala y coloca tus PDFs ahí:")
+        logger.info(f"   mkdir -p {BOOKS_DIR}")
         sys.exit(1)
 
     # 2. Contar archivos
-    pdf_count = len(list(BOOKS_DIR.rglob("*.pdf")))
-    txt_count = len(list(BOOKS_DIR.rglob("*.txt")))
-    md_count = len(list(BOOKS_DIR.rglob("*.md")))
+    # Un solo recorrido del árbol (en vez de un rglob por extensión)
+    ext_counts = Counter(
+        os.path.splitext(name)[1]
+        for _, _, files in os.walk(BOOKS_DIR)
+        for name in files
+    )
+    pdf_count = ext_counts[".pdf"]
+    txt_count = ext_counts[".txt"]
+    md_count = ext_counts[".md"]
     total = pdf_count + txt_count + md_count
 
-    print(f"📚 Libros encontrados:")
-    print(f"   PDFs: {pdf_count}")
-    print(f"   TXTs: {txt_count}")
-    print(f"   Markdowns: {md_count}")
-    print(f"   TOTAL: {total}")
+    logger.info(f"📚 Libros encontrados:")
+    logger.info(f"   PDFs: {pdf_count}")
+    logger.info(f"   TXTs: {txt_count}")
+    logger.info(f"   Markdowns: {md_count}")
+    logger.info(f"   TOTAL: {total}")
 
     if total == 0:
-        print(f"\n❌ ERROR: No hay archivos en {BOOKS_DIR}")
+        logger.error(f"❌ ERROR: No hay archivos en {BOOKS_DIR}")
         sys.exit(1)
 
     # 3. Verificar dependencias de LlamaIndex
     try:
         from llama_index.core.node_parser import SemanticSplitterNodeParser
         from llama_index.embeddings.openai import OpenAIEmbedding
-        from llama_index.vector_stores.elasticsearch import ElasticsearchStore
-        from llama_index.core import StorageContext, VectorStoreIndex, SimpleDirectoryReader
-        print("✅ Dependencias de LlamaIndex instaladas")
+        from llama_index.core import SimpleDirectoryReader
+        logger.info("✅ Dependencias de LlamaIndex instaladas")
     except ImportError as e:
-        print(f"❌ ERROR: Falta instalar LlamaIndex")
-        print(f"   {e}")
-        print(f"\n   Ejecuta: pip install -r requirements.txt")
+        logger.error(f"❌ ERROR: Falta instalar LlamaIndex")
+        logger.info(f"   {e}")
+        logger.info(f"   Ejecuta: pip install -r requirements.txt")
         sys.exit(1)
 
     # 4. Verificar conexión a Elasticsearch
     client = get_elasticsearch_client()
     if not client:
-        print("❌ ERROR: No se pudo conectar a Elasticsearch")
+        logger.error("❌ ERROR: No se pudo conectar a Elasticsearch")
         sys.exit(1)
 
-    print("\n✅ Todos los prerrequisitos cumplidos\n")
-    return True
+    logger.info("✅ Todos los prerrequisitos cumplidos")
+    return client
+
+
+def _load_one(path):
+    """
+    Carga un único archivo con SimpleDirectoryReader.
+    Debe estar a nivel de módulo para poder enviarse a ProcessPoolExecutor.
+
+    Los PDFs se leen con PyMuPDF (MuPDF, en C) cuando está instalado; si no,
+    se usa el lector por defecto (pypdf, Python puro, bastante más lento).
+    """
+    from llama_index.core import SimpleDirectoryReader
+
+    file_extractor = None
+    try:
+        from llama_index.readers.file import PyMuPDFReader
+        file_extractor = {".pdf": PyMuPDFReader()}
+    except ImportError:
+        pass
+
+    return SimpleDirectoryReader(input_files=[path], file_extractor=file_extractor).load_data()
 
 
-def load_documents_llamaindex():
+def iter_documents_llamaindex():
     """
-    Carga documentos usando SimpleDirectoryReader de LlamaIndex.
-    Más simple y eficiente que DirectoryLoader de LangChain.
+    Genera los documentos de SimpleDirectoryReader archivo a archivo (streaming).
+
+    Los archivos se reparten entre varios procesos (un archivo por tarea)
+    porque el parsing de PDFs es CPU-bound y no comparte estado. Con
+    _map_bounded solo hay unos pocos archivos en vuelo: el pool no se
+    adelanta al análisis semántico acumulando páginas en memoria.
     """
     print_header("Cargando Documentos con LlamaIndex")
 
-    from llama_index.core import SimpleDirectoryReader
+    logger.info(f"📂 Directorio: {BOOKS_DIR}")
 
-    print(f"📂 Directorio: {BOOKS_DIR}")
+    files = sorted(
+        str(path) for path in BOOKS_DIR.rglob("*")
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTS
+    )
+    workers = max(1, min(LOAD_WORKERS, len(files)))
+    logger.info(f"⚙️  Parseando {len(files)} archivos con {workers} procesos...")
 
-    try:
-        # SimpleDirectoryReader carga automáticamente PDFs, TXTs, MD, etc.
-        reader = SimpleDirectoryReader(
-            input_dir=str(BOOKS_DIR),
-            recursive=True,
-            required_exts=[".pdf", ".txt", ".md"]
-        )
+    # Mismo timestamp para toda la ejecución
+    indexed_at = datetime.now().isoformat()
+    num_documents = 0
 
-        documents = reader.load_data()
+    # spawn: el generador lo consume el hilo task-handler de parallel_bulk;
+    # hacer fork con hilos vivos puede dejar locks tomados en el hijo
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    with executor:
+        # El orden de los archivos se conserva (resultado determinista)
+        for file_docs in _map_bounded(executor, _load_one, files, workers * 2):
+            for doc in file_docs:
+                source = doc.metadata.get('file_name', '')
 
-        print(f"✅ {len(documents)} documentos cargados\n")
+                # Detectar Level CFA
+                match = CFA_LEVEL_PATTERN.search(source)
+                if match:
+                    doc.metadata['cfa_level'] = CFA_LEVEL_MAP[match.group(1)]
 
-        # Añadir metadata adicional
-        for doc in documents:
-            source = doc.metadata.get('file_name', '')
+                doc.metadata['indexed_at'] = indexed_at
+                num_documents += 1
+                yield doc
 
-            # Detectar Level CFA
-            if 'Level_I' in source or 'Level_1' in source:
-                doc.metadata['cfa_level'] = 'I'
-            elif 'Level_II' in source or 'Level_2' in source:
-                doc.metadata['cfa_level'] = 'II'
-            elif 'Level_III' in source or 'Level_3' in source:
-                doc.metadata['cfa_level'] = 'III'
+    logger.info(f"✅ {num_documents} documentos cargados")
 
-            doc.metadata['indexed_at'] = datetime.now().isoformat()
 
-        return documents
+def _is_sentence_fragment(sentence):
+    """Indica si una 'oración' es un fragmento sin contenido semántico propio."""
+    stripped = sentence.strip()
+    return len(stripped) < MIN_SENTENCE_CHARS or not any(ch.isalpha() for ch in stripped)
 
-    except Exception as e:
-        print(f"❌ ERROR cargando documentos: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
 
+def _merge_short_sentences(split_fn):
+    """
+    Envuelve el segmentador de oraciones del SemanticSplitter para unir los
+    fragmentos a la oración vecina.
+
+    Los fragmentos no pueden mover el umbral del percentil 95 pero cuestan
+    un embedding cada uno. Como solo se concatenan (sin descartar texto),
+    los nodos resultantes conservan el contenido completo.
+    """
+    def splitter(text):
+        merged = []
+        carry = ""
+
+        for sentence in split_fn(text):
+            if _is_sentence_fragment(sentence):
+                if merged:
+                    merged[-1] += sentence
+                else:
+                    carry += sentence
+                continue
+
+            merged.append(carry + sentence)
+            carry = ""
 
-def split_documents_semantic(documents):
+        # Texto compuesto solo por fragmentos
+        if carry:
+            merged.append(carry)
+
+        return merged
+
+    return splitter
+
+
+def split_documents_semantic(documents, stats):
     """
-    Divide documentos usando SEMANTIC CHUNKING (Patrón S29).
+    Divide documentos usando SEMANTIC CHUNKING (Patrón S29) (generador).
 
     VENTAJAS vs RecursiveCharacterTextSplitter:
     1. Corta solo cuando hay cambio drástico de tema
@@ -179,106 +359,146 @@ def split_documents_semantic(documents):
     4. Mejor para material técnico financiero
 
     Args:
-        documents: Lista de documentos de LlamaIndex
+        documents: Iterable de documentos de LlamaIndex (p. ej.
+            iter_documents_llamaindex()); se consume documento a documento.
+        stats: Dict que se rellena al terminar con num_documents y num_nodes
 
-    Returns:
-        Lista de nodos semánticos
+    Yields:
+        Nodos semánticos, en el orden de los documentos
     """
     print_header("Fragmentación Semántica (S29 Pattern)")
 
-    from llama_index.core.node_parser import SemanticSplitterNodeParser, SentenceSplitter
-    from llama_index.embeddings.openai import OpenAIEmbedding
-
-    print(f"🧠 Modelo de embeddings: {EMBEDDING_MODEL}")
-    print(f"📊 Método: Semantic Chunking (percentil 95)")
-    print(f"   - Corta solo en cambios drásticos de tema")
-    print(f"   - Preserva contexto financiero completo\n")
-
-    try:
-        # 0. PRE-PROCESAMIENTO DE SEGURIDAD
-        # Dividir documentos gigantes en bloques manejables (<8192 tokens)
-        # Esto evita el error OpenAI BadRequestError (context length exceeded)
-        print("🛡️  Ejecutando pre-split de seguridad (max 4000 tokens)...")
-        
-        pre_splitter = SentenceSplitter(
-            chunk_size=4000,
-            chunk_overlap=200
-        )
-        safe_nodes = pre_splitter.get_nodes_from_documents(documents, show_progress=True)
-        print(f"✅ Pre-split completado: {len(documents)} docs originales → {len(safe_nodes)} bloques seguros\n")
-
-        # 1. Inicializar modelo de embeddings
-        embed_model = OpenAIEmbedding(
-            model=EMBEDDING_MODEL,
-            api_key=OPENAI_API_KEY
-        )
-
-        # 2. Crear Semantic Splitter
-        # buffer_size=1: evalúa cada oración individualmente
-        # breakpoint_percentile_threshold=95: corta solo en top 5% de cambios semánticos
-        splitter = SemanticSplitterNodeParser(
-            buffer_size=1,
-            breakpoint_percentile_threshold=95,
-            embed_model=embed_model
-        )
-
-        print("🔍 Ejecutando análisis semántico...")
-
-        # 3. Fragmentar los nodos seguros
-        nodes = splitter.get_nodes_from_documents(safe_nodes, show_progress=True)
-
-        print(f"\n✅ {len(nodes)} nodos semánticos creados")
-        print(f"   Promedio: {len(nodes) / max(len(documents), 1):.1f} nodos por documento original\n")
-
-        # Estadísticas de tamaño de chunks
-        chunk_sizes = [len(node.text) for node in nodes]
-        avg_size = sum(chunk_sizes) / len(chunk_sizes) if chunk_sizes else 0
-        min_size = min(chunk_sizes) if chunk_sizes else 0
-        max_size = max(chunk_sizes) if chunk_sizes else 0
-
-        print(f"📏 Estadísticas de tamaño:")
-        print(f"   Promedio: {avg_size:.0f} caracteres")
-        print(f"   Mínimo: {min_size} caracteres")
-        print(f"   Máximo: {max_size} caracteres\n")
-
-        return nodes
-
-    except Exception as e:
-        print(f"❌ ERROR en fragmentación semántica: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
-
+    from llama_index.core.node_parser import SemanticSplitterNodeParser, TokenTextSplitter
+    from llama_index.core.node_parser.text.utils import split_by_sentence_tokenizer
+    from tqdm import tqdm
+
+    logger.info(f"🧠 Modelo de embeddings: {EMBEDDING_MODEL}")
+    logger.info(f"📊 Método: Semantic Chunking (percentil 95)")
+    logger.info(f"   - Corta solo en cambios drásticos de tema")
+    logger.info(f"   - Preserva contexto financiero completo")
+
+    # 0. PRE-PROCESAMIENTO DE SEGURIDAD
+    # Dividir documentos gigantes en bloques manejables (<8192 tokens)
+    # Esto evita el error OpenAI BadRequestError (context length exceeded)
+    # Sin solapamiento: el SemanticSplitter vuelve a segmentar en oraciones,
+    # así que un overlap solo duplicaría oraciones (embebidas dos veces y
+    # repetidas en nodos contiguos del índice final).
+    # TokenTextSplitter solo cuenta tokens (tiktoken, en Rust) sin
+    # segmentar en oraciones: esa segmentación ya la hace el
+    # SemanticSplitter a continuación.
+    pre_splitter = TokenTextSplitter(
+        chunk_size=4000,
+        chunk_overlap=0,
+        separator=" ",
+        backup_separators=["\n"]
+    )
+
+    # 1. Inicializar modelo de embeddings
+    embed_model = get_embed_model()
+
+    # 2. Crear Semantic Splitter
+    # buffer_size=1: evalúa cada oración individualmente
+    # breakpoint_percentile_threshold=95: corta solo en top 5% de cambios semánticos
+    splitter = SemanticSplitterNodeParser(
+        buffer_size=1,
+        breakpoint_percentile_threshold=95,
+        embed_model=embed_model,
+        sentence_splitter=_merge_short_sentences(split_by_sentence_tokenizer())
+    )
+
+    logger.info("🔍 Ejecutando pre-split de seguridad (max 4000 tokens) + análisis semántico...")
+
+    # 3. Procesar documento a documento: los bloques del pre-split y los
+    # nodos de un documento se entregan (y se liberan) antes de leer el
+    # siguiente. El SemanticSplitter embebe cada bloque por separado, así
+    # que el número de llamadas a la API no cambia.
+    num_documents = 0
+    num_nodes = 0
+    safe_count = 0
+    total_chars = 0
+    min_chars = None
+    max_chars = 0
+
+    progress = tqdm(documents, desc="Fragmentando", unit="doc", disable=not SHOW_PROGRESS)
+
+    for doc in progress:
+        num_documents += 1
+        safe_nodes = pre_splitter.get_nodes_from_documents([doc])
+        safe_count += len(safe_nodes)
+
+        for node in splitter.get_nodes_from_documents(safe_nodes):
+            num_nodes += 1
+            size = len(node.text)
+            total_chars += size
+            max_chars = max(max_chars, size)
+            min_chars = size if min_chars is None else min(min_chars, size)
+            yield node
+
+        # Sin terminal: progreso por log cada 50 documentos
+        if not SHOW_PROGRESS and num_documents % 50 == 0:
+            logger.info(f"   {num_documents} documentos → {num_nodes} nodos")
+
+    stats['num_documents'] = num_documents
+    stats['num_nodes'] = num_nodes
+
+    logger.info(f"✅ Pre-split: {num_documents} docs originales → {safe_count} bloques seguros")
+
+    logger.info(f"✅ {num_nodes} nodos semánticos creados")
+    logger.info(f"   Promedio: {num_nodes / max(num_documents, 1):.1f} nodos por documento original")
+
+    logger.info(f"📏 Estadísticas de tamaño:")
+    logger.info(f"   Promedio: {total_chars / max(num_nodes, 1):.0f} caracteres")
+    logger.info(f"   Mínimo: {min_chars or 0} caracteres")
+    logger.info(f"   Máximo: {max_chars} caracteres")
+
+
+def create_or_recreate_index(es_client, recreate=None):
+    """
+    Crea o recrea el índice semántico en Elasticsearch.
 
-def create_or_recreate_index(es_client):
-    """Crea o recrea el índice semántico en Elasticsearch."""
+    Args:
+        es_client: Cliente de Elasticsearch
+        recreate: Si el índice existe: True lo recrea, False añade a él,
+            None pregunta (ver --recreate / --append)
+    """
     print_header("Configurando Índice en Elasticsearch")
 
     # Verificar si el índice existe
     if es_client.indices.exists(index=SEMANTIC_INDEX_NAME):
-        print(f"⚠️  El índice '{SEMANTIC_INDEX_NAME}' ya existe.")
-        response = input("¿Deseas eliminarlo y recrearlo? (s/n): ")
+        logger.warning(f"⚠️  El índice '{SEMANTIC_INDEX_NAME}' ya existe.")
+        if recreate is None:
+            recreate = confirm("¿Deseas eliminarlo y recrearlo?", default=False)
 
-        if response.lower() == 's':
-            print(f"🗑️  Eliminando índice '{SEMANTIC_INDEX_NAME}'...")
+        if recreate:
+            logger.info(f"🗑️  Eliminando índice '{SEMANTIC_INDEX_NAME}'...")
             es_client.indices.delete(index=SEMANTIC_INDEX_NAME)
-            print("✅ Índice eliminado")
+            logger.info("✅ Índice eliminado")
         else:
-            print("ℹ️  Los documentos se añadirán al índice existente")
+            logger.info("ℹ️  Los documentos se añadirán al índice existente")
             return
 
     # Crear índice con mapping para vectores densos
-    print(f"🔨 Creando índice '{SEMANTIC_INDEX_NAME}'...")
+    logger.info(f"🔨 Creando índice '{SEMANTIC_INDEX_NAME}'...")
 
     index_mapping = {
         "mappings": {
             "properties": {
-                "text": {"type": "text"},
+                # Campo de texto que usa el ElasticsearchStore de LlamaIndex
+                "content": {"type": "text"},
                 "embedding": {
                     "type": "dense_vector",
                     "dims": EMBEDDING_DIMENSIONS,
                     "index": True,
-                    "similarity": "cosine"
+                    "similarity": "cosine",
+                    # HNSW sobre vectores cuantizados a int8 por ES (8.12+):
+                    # ~4x menos memoria para el grafo y búsquedas más rápidas.
+                    # Los vectores originales (float) se siguen guardando para
+                    # el re-scoring, así que el cliente no cambia.
+                    "index_options": {
+                        "type": "int8_hnsw",
+                        "m": 16,
+                        "ef_construction": 100
+                    }
                 },
                 "metadata": {"type": "object"}
             }
@@ -286,187 +506,225 @@ def create_or_recreate_index(es_client):
     }
 
     es_client.indices.create(index=SEMANTIC_INDEX_NAME, body=index_mapping)
-    print(f"✅ Índice '{SEMANTIC_INDEX_NAME}' creado\n")
+    logger.info(f"✅ Índice '{SEMANTIC_INDEX_NAME}' creado")
+
+
+def _iter_node_batches(nodes, embed_texts):
+    """
+    Agrupa nodos para las llamadas de embeddings respetando a la vez
+    EMBED_BATCH_SIZE (un request por grupo) y el presupuesto de tokens
+    (estimado como len // 4).
+    """
+    batch, batch_texts, batch_tokens = [], [], 0
+
+    for node, text in zip(nodes, embed_texts):
+        tokens = len(text) // 4
+        if batch and (len(batch) >= EMBED_BATCH_SIZE
+                      or batch_tokens + tokens > MAX_TOKENS_PER_EMBED_CALL):
+            yield batch, batch_texts
+            batch, batch_texts, batch_tokens = [], [], 0
+
+        batch.append(node)
+        batch_texts.append(text)
+        batch_tokens += tokens
 
+    if batch:
+        yield batch, batch_texts
 
-def index_nodes_to_elasticsearch(nodes):
+
+def _vector_to_json(vector):
+    """
+    Convierte un vector float16 a lista para el JSON del _bulk.
+    Redondear a EMBEDDING_JSON_DECIMALS da floats con repr corto ("0.01234"
+    en vez de "0.012340000085532665"): ~2.4x menos bytes por vector sin
+    perder nada respecto a la precisión float16.
+    """
+    return np.round(vector.astype(np.float64), EMBEDDING_JSON_DECIMALS).tolist()
+
+
+def _iter_bulk_actions(nodes, embed_model):
+    """
+    Genera acciones de bulk con el embedding ya calculado.
+
+    Es un generador: parallel_bulk lo consume desde el hilo task-handler de
+    su ThreadPool (imap), NO desde el hilo principal, así que la carga, el
+    análisis semántico y las llamadas a CachedEmbedding (SQLite) ocurren en
+    ese hilo. El siguiente lote se embebe mientras los workers del pool suben
+    el anterior, y nunca hay más de un lote de vectores en memoria. No
+    guardar aquí estado que deba vivir en el hilo principal (señales, UI,
+    thread-locals).
+
+    El documento replica el formato del ElasticsearchStore de LlamaIndex
+    (content / embedding / metadata) para que el índice siga siendo legible
+    desde LlamaIndex.
+    """
+    from llama_index.core.schema import MetadataMode
+    from llama_index.core.vector_stores.utils import node_to_metadata_dict
+
+    # Mismo texto que embebía VectorStoreIndex (incluye metadata de embedding)
+    embed_texts = (node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes)
+
+    for batch, batch_texts in _iter_node_batches(nodes, embed_texts):
+        # Matriz float16 contigua en vez de listas de floats de Python (~16x
+        # menos memoria por lote); misma precisión que la caché de embeddings
+        embeddings = np.asarray(embed_model.get_text_embedding_batch(batch_texts), dtype=np.float16)
+
+        for node, embedding in zip(batch, embeddings):
+            yield {
+                "_index": SEMANTIC_INDEX_NAME,
+                "_id": node.node_id,
+                "_source": {
+                    "content": node.get_content(metadata_mode=MetadataMode.NONE),
+                    "embedding": _vector_to_json(embedding),
+                    "metadata": node_to_metadata_dict(node, remove_text=True, flat_metadata=False),
+                },
+            }
+
+
+def index_nodes_to_elasticsearch(nodes, es_client):
     """
-    Indexa nodos semánticos en Elasticsearch usando LlamaIndex con BATCHING MANUAL.
-    Corrige el error de Timeout dividiendo el trabajo en lotes pequeños.
+    Indexa nodos semánticos en Elasticsearch con helpers.parallel_bulk.
+
+    Los nodos se consumen en streaming (p. ej. desde split_documents_semantic),
+    así que la carga y el análisis semántico avanzan a medida que se indexa.
+    Los embeddings se calculan por lotes acotados (nodos y tokens) y los
+    documentos se envían en requests _bulk concurrentes, sin pasar por
+    VectorStoreIndex.insert_nodes (un _bulk secuencial por lote).
     """
     print_header("Indexando Nodos Semánticos en Elasticsearch")
 
-    from llama_index.vector_stores.elasticsearch import ElasticsearchStore
-    from llama_index.core import StorageContext, VectorStoreIndex
-    from llama_index.embeddings.openai import OpenAIEmbedding
+    from elasticsearch import helpers
 
-    print(f"🧠 Modelo de embeddings: {EMBEDDING_MODEL}")
-    print(f"📦 Total de nodos: {len(nodes)}")
-    print(f"🎯 Índice destino: {SEMANTIC_INDEX_NAME}\n")
+    logger.info(f"🧠 Modelo de embeddings: {EMBEDDING_MODEL}")
+    logger.info(f"🎯 Índice destino: {SEMANTIC_INDEX_NAME}")
 
     try:
         # 1. Inicializar embeddings
-        embed_model = OpenAIEmbedding(
-            model=EMBEDDING_MODEL,
-            api_key=OPENAI_API_KEY
-        )
-
-        # 2. Crear ElasticsearchStore con TIMEOUT aumentado
-        # Agregamos request_timeout=300 (5 minutos) y retry_on_timeout=True
-        vector_store = ElasticsearchStore(
-            index_name=SEMANTIC_INDEX_NAME,
-            es_url=ES_URL,
-            es_user=ES_USERNAME,
-            es_password=ES_PASSWORD,
-            request_timeout=300,
-            retry_on_timeout=True
-        )
-
-        # 3. Crear StorageContext
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-        # 4. Indexación por LOTES (Batching)
-        # LlamaIndex no tiene un "batch_size" directo en from_documents que controle la subida,
-        # así que lo hacemos manualmente insertando nodos poco a poco.
-        
-        batch_size = 200  # Tamaño del lote (seguro para evitar timeouts)
-        total_nodes = len(nodes)
-        total_batches = (total_nodes + batch_size - 1) // batch_size
-        
-        print(f"📤 Iniciando indexación por lotes (Total: {total_batches} batches)...")
-        
-        index = None
-        
-        for i in range(0, total_nodes, batch_size):
-            batch_nodes = nodes[i : i + batch_size]
-            current_batch = (i // batch_size) + 1
-            
-            print(f"   Processing batch {current_batch}/{total_batches} ({len(batch_nodes)} nodos)...")
-            
-            try:
-                if index is None:
-                    # Primer lote: Crea el índice inicial
-                    index = VectorStoreIndex(
-                        batch_nodes,
-                        storage_context=storage_context,
-                        embed_model=embed_model,
-                        show_progress=False
-                    )
-                else:
-                    # Lotes siguientes: Inserta en el índice existente
-                    index.insert_nodes(batch_nodes)
-                
-                print(f"   ✅ Batch {current_batch} completado.")
-                
-            except Exception as e:
-                print(f"   ❌ Error crítico en batch {current_batch}: {e}")
-                raise e  # Detenemos si hay error para no perder consistencia
-
-        print(f"\n✅ Todos los {total_nodes} nodos indexados exitosamente.\n")
+        embed_model = get_embed_model()
+
+        # 2. Cliente con timeout amplio para requests _bulk grandes
+        bulk_client = es_client.options(request_timeout=300)
+
+        logger.info(f"📤 Iniciando bulk paralelo ({BULK_THREADS} hilos, {BULK_CHUNK_SIZE} docs/request)...")
+
+        indexed = 0
+        failed = 0
+        for ok, info in helpers.parallel_bulk(
+            bulk_client,
+            _iter_bulk_actions(nodes, embed_model),
+            thread_count=BULK_THREADS,
+            chunk_size=BULK_CHUNK_SIZE,
+            queue_size=4,
+            raise_on_error=False
+        ):
+            if ok:
+                indexed += 1
+                if indexed % BULK_CHUNK_SIZE == 0:
+                    logger.info(f"   ✅ {indexed} nodos indexados")
+            else:
+                failed += 1
+                if failed <= 5:
+                    logger.error(f"   ❌ Documento rechazado: {info}")
+
+        if failed:
+            logger.error(f"❌ {failed} nodos no se pudieron indexar ({indexed} OK)")
+            return False
+
+        logger.info(f"✅ Todos los {indexed} nodos indexados exitosamente.")
         return True
 
     except Exception as e:
-        print(f"❌ ERROR GENERAL indexando nodos: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ ERROR GENERAL indexando nodos: {e}")
         return False
-def verify_index():
+
+
+def verify_index(es_client):
     """Verifica que el índice semántico se haya creado correctamente."""
     print_header("Verificando Índice")
 
-    es_client = get_elasticsearch_client()
-
     try:
         # Contar documentos
         count = es_client.count(index=SEMANTIC_INDEX_NAME)
         doc_count = count['count']
 
-        print(f"✅ Índice verificado:")
-        print(f"   Nombre: {SEMANTIC_INDEX_NAME}")
-        print(f"   Documentos: {doc_count}")
+        logger.info(f"✅ Índice verificado:")
+        logger.info(f"   Nombre: {SEMANTIC_INDEX_NAME}")
+        logger.info(f"   Documentos: {doc_count}")
 
         # Obtener un documento de muestra
         sample = es_client.search(index=SEMANTIC_INDEX_NAME, size=1)
         if sample['hits']['hits']:
-            print(f"   Estado: Activo y funcional ✅\n")
+            logger.info(f"   Estado: Activo y funcional ✅")
 
         return True
 
     except Exception as e:
-        print(f"❌ Error verificando índice: {e}")
+        logger.error(f"❌ Error verificando índice: {e}")
         return False
 
 
-def main():
+def main(argv=None):
     """Función principal."""
-    print("\n" + "🚀"*30)
-    print("  INDEXADOR SEMÁNTICO - Sistema CFA")
-    print("  LlamaIndex + Semantic Chunking (S29)")
-    print("🚀"*30)
+    args = parse_args(argv)
 
-    print(f"\n📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"📂 Libros: {BOOKS_DIR}")
-    print(f"📦 Índice ES: {SEMANTIC_INDEX_NAME}")
-    print(f"🧠 Embeddings: {EMBEDDING_MODEL} (OpenAI)")
-    print(f"🔬 Método: Semantic Chunking (percentil 95)\n")
+    logger.info("🚀" * 30)
+    logger.info("  INDEXADOR SEMÁNTICO - Sistema CFA")
+    logger.info("  LlamaIndex + Semantic Chunking (S29)")
+    logger.info("🚀" * 30)
+
+    logger.info(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"📂 Libros: {BOOKS_DIR}")
+    logger.info(f"📦 Índice ES: {SEMANTIC_INDEX_NAME}")
+    logger.info(f"🧠 Embeddings: {EMBEDDING_MODEL} (OpenAI)")
+    logger.info(f"💾 Caché de embeddings: {EMBED_CACHE_DIR}")
+    logger.info(f"🔬 Método: Semantic Chunking (percentil 95)")
 
     # Confirmar
-    response = input("¿Deseas continuar? (s/n): ")
-    if response.lower() != 's':
-        print("❌ Cancelado por el usuario.")
+    if not args.yes and not confirm("¿Deseas continuar?", default=True):
+        logger.info("❌ Cancelado por el usuario.")
         sys.exit(0)
 
     try:
         # 1. Verificar prerrequisitos
-        check_prerequisites()
-
-        # 2. Obtener cliente ES
-        es_client = get_elasticsearch_client()
-        if not es_client:
-            print("❌ No se pudo conectar a Elasticsearch")
-            sys.exit(1)
+        # 2. Obtener cliente ES (una sola conexión para todo el proceso)
+        es_client = check_prerequisites()
 
         # 3. Configurar índice
-        create_or_recreate_index(es_client)
+        create_or_recreate_index(es_client, recreate=args.recreate)
 
-        # 4. Cargar documentos
-        documents = load_documents_llamaindex()
+        # 4-6. Cargar, fragmentar (S29) e indexar en pipeline: ni las
+        # páginas ni los nodos del corpus completo están en memoria a la vez
+        stats = {}
+        nodes = split_documents_semantic(iter_documents_llamaindex(), stats)
+        success = index_nodes_to_elasticsearch(nodes, es_client)
 
-        if not documents:
-            print("❌ ERROR: No se cargaron documentos.")
+        if not stats.get('num_documents'):
+            logger.error("❌ ERROR: No se cargaron documentos.")
             sys.exit(1)
 
-        # 5. Fragmentación SEMÁNTICA (El corazón del S29)
-        nodes = split_documents_semantic(documents)
-
-        # 6. Indexar en Elasticsearch
-        success = index_nodes_to_elasticsearch(nodes)
-
         if not success:
-            print("❌ ERROR: Fallo en la indexación")
+            logger.error("❌ ERROR: Fallo en la indexación")
             sys.exit(1)
 
         # 7. Verificar
-        verify_index()
+        verify_index(es_client)
 
         # Resumen final
         print_header("✅ PROCESO COMPLETADO EXITOSAMENTE")
-        print(f"📊 Resumen:")
-        print(f"   - Documentos procesados: {len(documents)}")
-        print(f"   - Nodos semánticos: {len(nodes)}")
-        print(f"   - Índice Elasticsearch: {SEMANTIC_INDEX_NAME}")
-        print(f"   - Embeddings: OpenAI {EMBEDDING_MODEL}")
-        print(f"   - Método: Semantic Chunking (S29)")
-        print(f"\n🎯 Los usuarios ya pueden consultar este material con mejor precisión.\n")
-        print(f"💡 Ventaja: Fórmulas financieras ahora se preservan completas.\n")
+        logger.info(f"📊 Resumen:")
+        logger.info(f"   - Documentos procesados: {stats['num_documents']}")
+        logger.info(f"   - Nodos semánticos: {stats['num_nodes']}")
+        logger.info(f"   - Índice Elasticsearch: {SEMANTIC_INDEX_NAME}")
+        logger.info(f"   - Embeddings: OpenAI {EMBEDDING_MODEL}")
+        logger.info(f"   - Método: Semantic Chunking (S29)")
+        logger.info(f"🎯 Los usuarios ya pueden consultar este material con mejor precisión.")
+        logger.info(f"💡 Ventaja: Fórmulas financieras ahora se preservan completas.")
 
     except KeyboardInterrupt:
-        print("\n\n❌ Proceso cancelado por el usuario.")
+        logger.error("❌ Proceso cancelado por el usuario.")
         sys.exit(1)
     except Exception as e:
-        print(f"\n❌ ERROR CRÍTICO: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ ERROR CRÍTICO: {e}")
         sys.exit(1)
 
 
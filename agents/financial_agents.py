@@ -8,15 +8,24 @@ Actualizado:
 """
 
 import os
+import re
+import asyncio
+import threading
+import httpx
 import requests
-from langchain_core.messages import AIMessage, HumanMessage
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections.abc import Mapping
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import tool
-from typing import Literal
+from langgraph.errors import GraphRecursionError
+from langchain_core.tools import StructuredTool
+from langchain_core.runnables import RunnableLambda
+from typing import Literal, Optional, get_args
 from pydantic import BaseModel, Field
 
 # Importar configuración
-from config import get_llm, RAG_API_URL
+from config import get_llm, get_structured_llm, RAG_API_URL
 
 # Importar herramientas financieras (locales)
 from tools.financial_tools import (
@@ -42,134 +51,395 @@ except ImportError:
 
 llm = get_llm()
 
+# ========================================
+# NOMBRES DE NODOS (FUENTE ÚNICA)
+# ========================================
+
+# Nodos de agente enrutables; RouterSchema y agent_nodes se derivan de aquí
+NodoAgente = Literal[
+    "Agente_Renta_Fija", "Agente_Finanzas_Corp", "Agente_Equity",
+    "Agente_Portafolio", "Agente_Derivados", "Agente_Ayuda", "Agente_RAG"
+]
+AgentName = Literal[NodoAgente, "FINISH"]
+
+AGENT_KEYS: tuple = get_args(NodoAgente)
+
+# ========================================
+# PROMPTS CACHEABLES
+# ========================================
+
+def mensaje_sistema_cacheable(system_prompt_text: str) -> SystemMessage:
+    """
+    System prompt marcado para prompt caching de Anthropic.
+
+    Los prompts de los agentes son constantes: con cache_control, Claude
+    cachea el prefijo (herramientas + system) y las llamadas siguientes lo
+    cobran como lectura de caché. OpenAI cachea solo los prefijos idénticos,
+    que es lo que ya son estos prompts (sin datos del turno interpolados).
+    """
+    return SystemMessage(content=[{
+        "type": "text",
+        "text": system_prompt_text,
+        "cache_control": {"type": "ephemeral"}
+    }])
+
+
 # ========================================
 # HERRAMIENTA RAG (CLIENTE MICROSERVICIO)
 # ========================================
 
-@tool
-def buscar_documentacion_financiera(consulta: str) -> str:
+# Conexiones keep-alive hacia el microservicio (incluye el fan-out paralelo)
+RAG_POOL_SIZE = 32
+
+
+def _crear_sesion_rag() -> requests.Session:
     """
-    Busca información en material financiero consultando el Microservicio RAG externo.
+    Sesión HTTP compartida con el microservicio RAG.
+
+    requests.post abre una conexión nueva (TCP + TLS) en cada consulta; la
+    sesión mantiene un pool keep-alive y reintenta una vez los fallos de
+    conexión (la petición no llegó a enviarse, así que el POST es seguro).
     """
-    logger.info(f"🔍 Consultando Microservicio RAG: '{consulta[:50]}...'")
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=RAG_POOL_SIZE,
+        max_retries=Retry(total=1, connect=1, read=0, status=0, backoff_factor=0.5)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_rag_session = _crear_sesion_rag()
+
+
+# Timeout de las búsquedas RAG (antes 45s: bloqueaba el sistema innecesariamente)
+RAG_TIMEOUT = 20
+
+# Un cliente por event loop: las conexiones de httpx quedan ligadas al loop
+# que las abrió, y un asyncio.run posterior (tests, evaluaciones) usa otro
+_rag_async_clients = {}
+
 
+def _get_rag_async_client() -> httpx.AsyncClient:
+    """
+    Cliente async (pool keep-alive) del event loop en curso para ainvoke.
+    Se crea en el primer uso de cada loop: los flujos síncronos no lo
+    necesitan. Los clientes de loops ya cerrados se descartan.
+    """
+    loop = asyncio.get_running_loop()
+    client = _rag_async_clients.get(loop)
+    if client is None:
+        for cerrado in [l for l in _rag_async_clients if l.is_closed()]:
+            del _rag_async_clients[cerrado]
+        client = _rag_async_clients[loop] = httpx.AsyncClient(
+            timeout=RAG_TIMEOUT,
+            limits=httpx.Limits(max_connections=RAG_POOL_SIZE, max_keepalive_connections=RAG_POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=1)
+        )
+    return client
+
+
+def _endpoint_rag() -> Optional[str]:
+    """Endpoint de búsqueda del microservicio (None si falta RAG_API_URL)."""
     if not RAG_API_URL:
-        msg = "❌ Error de configuración: RAG_API_URL no definida."
-        logger.error(msg)
-        return msg
+        logger.error("❌ Error de configuración: RAG_API_URL no definida.")
+        return None
+    return f"{RAG_API_URL.rstrip('/')}/search"
+
+
+def _resultado_rag(response) -> str:
+    """Extrae el resultado de la respuesta del microservicio (requests o httpx)."""
+    if response.status_code == 200:
+        data = response.json()
+        resultado = data.get("resultado", "No se encontró información relevante.")
+        logger.info("✅ Respuesta recibida del Microservicio")
+        return resultado
 
-    endpoint = f"{RAG_API_URL.rstrip('/')}/search"
+    error_msg = f"Error del Servicio RAG ({response.status_code}): {response.text}"
+    logger.error("❌ %s", error_msg)
+    return error_msg
+
+
+def _buscar_documentacion(consulta: str) -> str:
+    """
+    Busca información en material financiero consultando el Microservicio RAG externo.
+    """
+    logger.info("🔍 Consultando Microservicio RAG: '%.50s...'", consulta)
+
+    endpoint = _endpoint_rag()
+    if endpoint is None:
+        return "❌ Error de configuración: RAG_API_URL no definida."
 
     try:
-        # OPTIMIZACIÓN: Reducir timeout de 45s a 20s con retry
-        # - Timeout excesivo bloquea el sistema innecesariamente
-        # - 20s es suficiente para búsquedas RAG típicas
-        # - Si falla, retry una vez con exponential backoff
-        response = requests.post(
-            endpoint,
-            json={"consulta": consulta},
-            timeout=20  # Reducido de 45s a 20s
-        )
+        # Si falla la conexión, retry una vez con backoff (ver _crear_sesion_rag)
+        response = _rag_session.post(endpoint, json={"consulta": consulta}, timeout=RAG_TIMEOUT)
+        return _resultado_rag(response)
+
+    except Exception as e:
+        error_msg = f"Error de Conexión con RAG: {str(e)}"
+        logger.error("❌ %s", error_msg)
+        return error_msg
+
+
+async def _abuscar_documentacion(consulta: str) -> str:
+    """
+    Versión async: la espera HTTP no bloquea el event loop, así que otros
+    nodos del grafo (p. ej. ramas paralelas) avanzan mientras tanto.
+    """
+    logger.info("🔍 Consultando Microservicio RAG (async): '%.50s...'", consulta)
 
-        if response.status_code == 200:
-            data = response.json()
-            resultado = data.get("resultado", "No se encontró información relevante.")
-            logger.info("✅ Respuesta recibida del Microservicio")
-            return resultado
-        else:
-            error_msg = f"Error del Servicio RAG ({response.status_code}): {response.text}"
-            logger.error(f"❌ {error_msg}")
-            return error_msg
+    endpoint = _endpoint_rag()
+    if endpoint is None:
+        return "❌ Error de configuración: RAG_API_URL no definida."
+
+    try:
+        response = await _get_rag_async_client().post(endpoint, json={"consulta": consulta})
+        return _resultado_rag(response)
 
     except Exception as e:
         error_msg = f"Error de Conexión con RAG: {str(e)}"
-        logger.error(f"❌ {error_msg}")
+        logger.error("❌ %s", error_msg)
         return error_msg
 
+
+# Tool con ambas implementaciones: invoke() usa la sesión requests,
+# ainvoke() el cliente httpx async
+buscar_documentacion_financiera = StructuredTool.from_function(
+    func=_buscar_documentacion,
+    coroutine=_abuscar_documentacion,
+    name="buscar_documentacion_financiera",
+    description="Busca información en material financiero consultando el Microservicio RAG externo."
+)
+
 # ========================================
 # NODOS ESPECIALES
 # ========================================
 
+# La guía de ayuda es estática: se genera una vez al importar el módulo
+try:
+    _AYUDA_CONTENT = obtener_ejemplos_de_uso.invoke({}) + "\n\nTAREA_COMPLETADA"
+except Exception as e:
+    logger.error("❌ Error generando la guía de ayuda: %s", e)
+    _AYUDA_CONTENT = f"Error ayuda: {e}\nERROR_BLOQUEANTE"
+
+
 def nodo_ayuda_directo(state: dict) -> dict:
-    """Nodo simple que llama a la herramienta de ayuda."""
-    try:
-        guia = obtener_ejemplos_de_uso.invoke({})
-        return {"messages": [AIMessage(content=guia + "\n\nTAREA_COMPLETADA")]}
-    except Exception as e:
-        return {"messages": [AIMessage(content=f"Error ayuda: {e}\nERROR_BLOQUEANTE")]}
+    """Nodo simple que devuelve la guía de ayuda (precalculada)."""
+    # Mensaje nuevo por turno: el historial no comparte instancias
+    return {"messages": [AIMessage(content=_AYUDA_CONTENT)]}
+
+# Prompt de síntesis: constante para que el prefijo sea cacheable;
+# el contexto y la consulta van en el mensaje del usuario
+PROMPT_SINTESIS_RAG = """Eres un Asistente Financiero CFA experto.
+
+INSTRUCCIONES:
+1. Responde a la consulta del usuario basándote EXCLUSIVAMENTE en el CONTEXTO proporcionado.
+2. Si el contexto contiene la respuesta, sé directo y técnico.
+3. Si el contexto NO es relevante, dilo claramente.
+4. Responde siempre en ESPAÑOL profesional."""
+
+# El SystemMessage se construye una vez: mismo prefijo en cada síntesis
+MENSAJE_SINTESIS_RAG = mensaje_sistema_cacheable(PROMPT_SINTESIS_RAG)
+
+
+# Andamiaje fijo del mensaje de usuario (solo se concatenan las partes variables)
+_SINTESIS_PREFIJO = "CONTEXTO RECUPERADO:\n"
+_SINTESIS_MEDIO = "\n\nCONSULTA ORIGINAL:\n"
+_SINTESIS_SUFIJO = " (Nota: Esta query fue optimizada para búsqueda)\n\nRespuesta final:"
+
+
+def _mensajes_sintesis(query_para_rag: str, contexto_recuperado: str) -> list:
+    """Prompt de síntesis: system constante (cacheable) + contexto y consulta."""
+    return [
+        MENSAJE_SINTESIS_RAG,
+        HumanMessage(content="".join((
+            _SINTESIS_PREFIJO, contexto_recuperado,
+            _SINTESIS_MEDIO, query_para_rag,
+            _SINTESIS_SUFIJO
+        )))
+    ]
+
+
+_MENSAJE_ERROR_RAG = "Lo siento, hubo un error técnico al consultar la base de conocimientos. ERROR_BLOQUEANTE"
+
+_MENSAJE_SIN_MENSAJES = "Error: Sin mensajes."
+
+
+def _respuesta_error(contenido: str) -> dict:
+    """
+    Respuesta de error con un AIMessage nuevo en cada llamada: add_messages
+    asigna el id al propio objeto, así que una instancia compartida haría que
+    el segundo error de un hilo reemplace al primero en vez de añadirse.
+    """
+    return {"messages": [AIMessage(content=contenido)]}
+
+# Resultados de la herramienta que no aportan contexto: se responden sin LLM
+MIN_CONTEXTO_CHARS = 50
+_SIN_RESULTADOS_PATTERN = re.compile(r"^\W*no se encontr[oó] informaci[oó]n relevante", re.IGNORECASE)
+_ERROR_HERRAMIENTA_PATTERN = re.compile(
+    r"^\W*error (del servicio rag|de conexi[oó]n con rag|de configuraci[oó]n)", re.IGNORECASE
+)
+RESPUESTA_SIN_CONTEXTO = (
+    "No encontré información relevante en el material CFA para responder esta consulta. "
+    "Intenta reformular la pregunta con otros términos."
+)
+
+
+def _respuesta_sin_contexto(contexto_recuperado: str) -> Optional[AIMessage]:
+    """
+    Respuesta directa cuando la búsqueda no trajo contexto útil (sin
+    resultados, error del microservicio o texto trivial), o None si hay
+    que sintetizar. Evita pagar una llamada al LLM para decir "no sé".
+    """
+    texto = contexto_recuperado.strip()
+    if _ERROR_HERRAMIENTA_PATTERN.match(texto):
+        return AIMessage(content=_MENSAJE_ERROR_RAG)
+    if len(texto) < MIN_CONTEXTO_CHARS or _SIN_RESULTADOS_PATTERN.match(texto):
+        return AIMessage(content=RESPUESTA_SIN_CONTEXTO)
+    return None
+
+
+def _mensajes_pendientes(queries, contextos: list) -> tuple:
+    """Respuestas directas por sub-consulta y prompts de las que sí requieren síntesis."""
+    directas = [_respuesta_sin_contexto(c) for c in contextos]
+    prompts = [
+        _mensajes_sintesis(q, c)
+        for q, c, d in zip(queries, contextos, directas) if d is None
+    ]
+    return directas, prompts
+
+
+def _completar_respuestas(directas: list, sintetizadas: list) -> list:
+    sintetizadas = iter(sintetizadas)
+    return [d if d is not None else next(sintetizadas) for d in directas]
+
+
+RAG_MAX_CONCURRENCY = 8
+
+
+def _subconsultas(state: dict) -> tuple:
+    """
+    (sub-preguntas del usuario, queries optimizadas) cuando el supervisor
+    partió un mensaje con varias preguntas teóricas (state["rag_queries"]);
+    tuplas vacías si es una consulta única. Cada query ya viene reescrita a
+    keywords en inglés con el mensaje completo como contexto.
+    """
+    consultas = state.get("rag_queries") or []
+    if len(consultas) < 2:
+        return (), ()
+    return (
+        tuple(c["pregunta"] for c in consultas),
+        tuple(c["query"] for c in consultas)
+    )
+
+
+def _unir_respuestas(subpreguntas: list, respuestas: list) -> dict:
+    contenido = "\n\n".join(
+        f"**{pregunta}**\n{respuesta.content}"
+        for pregunta, respuesta in zip(subpreguntas, respuestas)
+    )
+    return {"messages": [AIMessage(content=contenido)]}
+
 
 def nodo_rag(state: dict) -> dict:
     """
     Nodo RAG Deterministico (Optimizacion v2).
     Ya NO es un agente ReAct. Es una cadena lineal:
-    Query Optimizada (del Supervisor) -> API RAG -> Síntesis LLM.
+    Query Optimizada (del Supervisor) -> API RAG -> Síntesis LLM (streaming).
+
+    La síntesis usa llm.invoke: con stream_mode="messages" LangGraph activa
+    el streaming del modelo y reenvía cada token a la app, y a diferencia de
+    llm.stream pasa por la cache de LLM (una pregunta + contexto repetidos
+    se responden sin llamar al modelo).
     """
     logger.info("📚 Agente RAG (Modo Ejecución Directa) invocado")
 
     messages = state.get("messages", [])
     if not messages:
-        return {"messages": [AIMessage(content="Error: Sin mensajes.")]}
+        return _respuesta_error(_MENSAJE_SIN_MENSAJES)
 
     # 1. OBTENER QUERY OPTIMIZADA
     # Como el Supervisor v2 ya reemplazó el último mensaje con la query perfecta,
     # solo la tomamos.
-    last_message = messages[-1]
-    query_para_rag = last_message.content 
+    query_para_rag = messages[-1].content
     
-    logger.info(f"🔍 Ejecutando búsqueda directa: '{query_para_rag[:50]}...'")
+    logger.info("🔍 Ejecutando búsqueda directa: '%.50s...'", query_para_rag)
 
     try:
+        # Varias preguntas en un mensaje: búsquedas y síntesis en lote
+        # (una llamada batch al LLM en lugar de una síntesis por turno)
+        subpreguntas, queries = _subconsultas(state)
+        if subpreguntas:
+            logger.info("📚 %s sub-preguntas: búsqueda y síntesis en lote", len(subpreguntas))
+            config = {"max_concurrency": RAG_MAX_CONCURRENCY}
+            contextos = buscar_documentacion_financiera.batch(list(queries), config=config)
+            directas, prompts = _mensajes_pendientes(queries, contextos)
+            sintetizadas = llm.batch(prompts, config=config) if prompts else []
+            return _unir_respuestas(subpreguntas, _completar_respuestas(directas, sintetizadas))
+
         # 2. LLAMADA DIRECTA A LA HERRAMIENTA (Sin pedirle permiso a un LLM)
-        # Invocamos la herramienta directamente como función
-        # Nota: buscar_documentacion_financiera es un @tool, usamos .invoke()
         contexto_recuperado = buscar_documentacion_financiera.invoke(query_para_rag)
+
+        directa = _respuesta_sin_contexto(contexto_recuperado)
+        if directa is not None:
+            logger.info("⏭️ Búsqueda sin contexto útil: se omite la síntesis")
+            return {"messages": [directa]}
         
         # 3. SÍNTESIS DE RESPUESTA (Única llamada al LLM en este nodo)
-        # Usamos un prompt de síntesis estricto para evitar alucinaciones
-        prompt_sintesis = f"""Eres un Asistente Financiero CFA experto.
-        
-        INSTRUCCIONES:
-        1. Responde a la consulta del usuario basándote EXCLUSIVAMENTE en el CONTEXTO proporcionado.
-        2. Si el contexto contiene la respuesta, sé directo y técnico.
-        3. Si el contexto NO es relevante, dilo claramente.
-        4. Responde siempre en ESPAÑOL profesional.
+        respuesta = llm.invoke(_mensajes_sintesis(query_para_rag, contexto_recuperado))
+        return {"messages": [AIMessage(content=respuesta.content)]}
+
+    except Exception as e:
+        logger.error("❌ Error en RAG Directo: %s", e, exc_info=True)
+        return _respuesta_error(_MENSAJE_ERROR_RAG)
 
-        CONTEXTO RECUPERADO:
-        {contexto_recuperado}
 
-        CONSULTA ORIGINAL:
-        {query_para_rag} (Nota: Esta query fue optimizada para búsqueda)
-        
-        Respuesta final:"""
+async def anodo_rag(state: dict) -> dict:
+    """Versión async de nodo_rag (grafo ejecutado con ainvoke / astream)."""
+    logger.info("📚 Agente RAG (async) invocado")
 
-        # Usamos el LLM configurado (idealmente un modelo rápido como Haiku o GPT-4o-mini)
-        response_message = llm.invoke(prompt_sintesis)
-        
-        # Aseguramos que termine con la señal de éxito para el grafo
-        if isinstance(response_message, AIMessage):
-            # Agregamos la etiqueta de cierre si no está (aunque el supervisor ya no la necesite tanto, ayuda al log)
-            if "TAREA_COMPLETADA" not in response_message.content:
-                 # Hack opcional: modificar el contenido es inmutable, creamos uno nuevo
-                 pass 
-        
-        return {"messages": [response_message]}
+    messages = state.get("messages", [])
+    if not messages:
+        return _respuesta_error(_MENSAJE_SIN_MENSAJES)
+
+    query_para_rag = messages[-1].content
+
+    try:
+        subpreguntas, queries = _subconsultas(state)
+        if subpreguntas:
+            config = {"max_concurrency": RAG_MAX_CONCURRENCY}
+            contextos = await buscar_documentacion_financiera.abatch(list(queries), config=config)
+            directas, prompts = _mensajes_pendientes(queries, contextos)
+            sintetizadas = await llm.abatch(prompts, config=config) if prompts else []
+            return _unir_respuestas(subpreguntas, _completar_respuestas(directas, sintetizadas))
+
+        contexto_recuperado = await buscar_documentacion_financiera.ainvoke(query_para_rag)
+
+        directa = _respuesta_sin_contexto(contexto_recuperado)
+        if directa is not None:
+            logger.info("⏭️ Búsqueda sin contexto útil: se omite la síntesis")
+            return {"messages": [directa]}
+
+        respuesta = await llm.ainvoke(_mensajes_sintesis(query_para_rag, contexto_recuperado))
+        return {"messages": [AIMessage(content=respuesta.content)]}
 
     except Exception as e:
-        logger.error(f"❌ Error en RAG Directo: {e}", exc_info=True)
-        return {
-            "messages": [AIMessage(
-                content="Lo siento, hubo un error técnico al consultar la base de conocimientos. ERROR_BLOQUEANTE"
-            )]
-        }
+        logger.error("❌ Error en RAG Directo (async): %s", e, exc_info=True)
+        return _respuesta_error(_MENSAJE_ERROR_RAG)
+
+
+# Supersteps máximos por especialista (agent -> tools -> agent ...): ~3 llamadas al LLM
+AGENT_RECURSION_LIMIT = 6
 
-def nodo_sintesis_rag(state: dict) -> dict:
-    """Nodo passthrough para compatibilidad."""
-    return {"messages": [AIMessage(content="Síntesis finalizada.\nTAREA_COMPLETADA")]}
 
 def crear_agente_especialista(llm_instance, tools_list, system_prompt_text):
     if not tools_list: raise ValueError("Sin herramientas")
-    llm_with_system = llm_instance.bind(system=system_prompt_text)
-    return create_react_agent(llm_with_system, tools_list)
+    return create_react_agent(
+        llm_instance, tools_list,
+        prompt=mensaje_sistema_cacheable(system_prompt_text)
+    ).with_config({"recursion_limit": AGENT_RECURSION_LIMIT})
 
 
 # ========================================
@@ -214,49 +484,154 @@ PROMPT_DERIVADOS = f"Eres especialista en Derivados. {PROTOCOLO_SEGURIDAD}"
 # CREACIÓN DE AGENTES
 # ========================================
 
-agent_renta_fija = crear_agente_especialista(llm, [
+# Herramientas de cada especialista
+HERRAMIENTAS_RENTA_FIJA = [
     _calcular_valor_presente_bono, _calcular_duration_macaulay, _calcular_duration_modificada,
     _calcular_convexity, _calcular_current_yield, _calcular_bono_cupon_cero
-], PROMPT_RENTA_FIJA)
+]
 
-agent_fin_corp = crear_agente_especialista(llm, [
+HERRAMIENTAS_FIN_CORP = [
     _calcular_van, _calcular_wacc, _calcular_tir,
     _calcular_payback_period, _calcular_profitability_index
-], PROMPT_FIN_CORP)
+]
 
-agent_equity = crear_agente_especialista(llm, [_calcular_gordon_growth], PROMPT_EQUITY)
+HERRAMIENTAS_EQUITY = [_calcular_gordon_growth]
 
-agent_portafolio = crear_agente_especialista(llm, [
+HERRAMIENTAS_PORTAFOLIO = [
     _calcular_capm, _calcular_sharpe_ratio, _calcular_treynor_ratio,
     _calcular_jensen_alpha, _calcular_beta_portafolio,
     _calcular_retorno_portafolio, _calcular_std_dev_portafolio
-], PROMPT_PORTAFOLIO)
+]
 
-agent_derivados = crear_agente_especialista(llm, [
+HERRAMIENTAS_DERIVADOS = [
     _calcular_opcion_call, _calcular_opcion_put, _calcular_put_call_parity
-], PROMPT_DERIVADOS)
-
-agent_nodes = {
-    "Agente_Renta_Fija": agent_renta_fija,
-    "Agente_Finanzas_Corp": agent_fin_corp,
-    "Agente_Equity": agent_equity,
-    "Agente_Portafolio": agent_portafolio,
-    "Agente_Derivados": agent_derivados,
-    "Agente_Ayuda": nodo_ayuda_directo,
-    "Agente_RAG": nodo_rag,
-    "Agente_Sintesis_RAG": nodo_sintesis_rag
+]
+
+
+class LazyAgents(Mapping):
+    """
+    Diccionario de nodos que construye cada especialista en su primer uso.
+
+    create_react_agent compila el grafo del agente y los esquemas de sus
+    herramientas; hacerlo para los cinco al importar el módulo alarga el
+    arranque aunque la sesión solo haga consultas RAG. Los nodos función
+    (Ayuda, RAG) se registran ya construidos.
+
+    Iterar las claves no construye nada; acceder con [] sí.
+    """
+
+    def __init__(self, claves, fabricas: dict, nodos_directos: dict):
+        faltantes = [k for k in claves if k not in fabricas and k not in nodos_directos]
+        if faltantes:
+            raise ValueError(f"Nodos sin fábrica ni función: {faltantes}")
+        self._fabricas = fabricas
+        self._built = dict(nodos_directos)
+        self._keys = tuple(claves)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        agente = self._built.get(key)
+        if agente is None:
+            fabrica = self._fabricas[key]  # KeyError si la clave no existe
+            with self._lock:
+                agente = self._built.get(key)
+                if agente is None:
+                    logger.info("🛠️ Construyendo %s (primer uso)", key)
+                    agente = self._built[key] = fabrica()
+        return agente
+
+    def precalentar(self, claves) -> Optional[threading.Thread]:
+        """
+        Construye en segundo plano los especialistas aún no construidos.
+        Pensado para solaparse con una llamada de red (p. ej. la
+        clasificación L2): el grafo ya compilado está listo cuando llega
+        la decisión. Devuelve el hilo, o None si no había nada pendiente.
+        """
+        pendientes = [k for k in claves if k in self._fabricas and k not in self._built]
+        if not pendientes:
+            return None
+
+        def construir():
+            for key in pendientes:
+                try:
+                    self[key]
+                except Exception as e:
+                    logger.warning("⚠️ No se pudo precalentar %s: %s", key, e)
+
+        hilo = threading.Thread(target=construir, name="precalentar_agentes", daemon=True)
+        hilo.start()
+        return hilo
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def nodo(self, key):
+        """
+        Nodo para el grafo: los nodos función se devuelven tal cual; los
+        especialistas, envueltos para construirse al ejecutarse por primera vez.
+        """
+        if key in self._built:
+            return self._built[key]
+        if key not in self._fabricas:
+            raise KeyError(key)
+
+        def nodo_perezoso(state: dict, config=None):
+            # El límite propio del agente manda sobre el del grafo padre
+            config = {k: v for k, v in (config or {}).items() if k != "recursion_limit"}
+            try:
+                return self[key].invoke(state, config)
+            except GraphRecursionError:
+                logger.warning("⚠️ %s agotó sus %s pasos", key, AGENT_RECURSION_LIMIT)
+                return {"messages": [AIMessage(
+                    content="Error técnico: se alcanzó el límite de pasos del agente. ERROR_BLOQUEANTE"
+                )]}
+
+        nodo_perezoso.__name__ = key
+        return nodo_perezoso
+
+
+agent_nodes = LazyAgents(
+    AGENT_KEYS,
+    fabricas={
+        "Agente_Renta_Fija": lambda: crear_agente_especialista(llm, HERRAMIENTAS_RENTA_FIJA, PROMPT_RENTA_FIJA),
+        "Agente_Finanzas_Corp": lambda: crear_agente_especialista(llm, HERRAMIENTAS_FIN_CORP, PROMPT_FIN_CORP),
+        "Agente_Equity": lambda: crear_agente_especialista(llm, HERRAMIENTAS_EQUITY, PROMPT_EQUITY),
+        "Agente_Portafolio": lambda: crear_agente_especialista(llm, HERRAMIENTAS_PORTAFOLIO, PROMPT_PORTAFOLIO),
+        "Agente_Derivados": lambda: crear_agente_especialista(llm, HERRAMIENTAS_DERIVADOS, PROMPT_DERIVADOS),
+    },
+    nodos_directos={
+        "Agente_Ayuda": nodo_ayuda_directo,
+        # Sync y async: el grafo usa la que corresponda a invoke / ainvoke
+        "Agente_RAG": RunnableLambda(nodo_rag, afunc=anodo_rag, name="Agente_RAG")
+    }
+)
+
+# Nombres históricos de los agentes (tests y scripts): se resuelven bajo demanda
+_AGENTES_POR_NOMBRE = {
+    "agent_renta_fija": "Agente_Renta_Fija",
+    "agent_fin_corp": "Agente_Finanzas_Corp",
+    "agent_equity": "Agente_Equity",
+    "agent_portafolio": "Agente_Portafolio",
+    "agent_derivados": "Agente_Derivados",
 }
 
+
+def __getattr__(name):
+    if name in _AGENTES_POR_NOMBRE:
+        return agent_nodes[_AGENTES_POR_NOMBRE[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # ========================================
 # SUPERVISOR (MÁQUINA DE ESTADOS)
 # ========================================
 
 class RouterSchema(BaseModel):
-    next_agent: Literal["Agente_Renta_Fija", "Agente_Finanzas_Corp", "Agente_Equity", 
-                       "Agente_Portafolio", "Agente_Derivados", "Agente_Ayuda", 
-                       "Agente_RAG", "FINISH"] = Field(description="Próximo nodo o FINISH")
+    next_agent: AgentName = Field(description="Próximo nodo o FINISH")
 
-supervisor_llm = llm.with_structured_output(RouterSchema)
+supervisor_llm = get_structured_llm(RouterSchema)
 
 supervisor_system_prompt = """Eres el Supervisor.
 MÁQUINA DE ESTADOS (PRIORIDAD MÁXIMA):
@@ -277,4 +652,6 @@ MÁQUINA DE ESTADOS (PRIORIDAD MÁXIMA):
    - Ayuda -> `Agente_Ayuda`
 """
 
+supervisor_system_message = mensaje_sistema_cacheable(supervisor_system_prompt)
+
 logger.info("✅ Agentes financieros cargados (Modo Cliente Microservicio + Protocolo RAG)")
\ No newline at end of file
@@ -5,8 +5,9 @@ Actualizado para LangChain 1.0+
 """
 
 import os
+import sys
+import functools
 from pathlib import Path
-import streamlit as st
 from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
 
@@ -34,6 +35,36 @@ except ImportError:
         return os.getenv('STREAMLIT_IN_CLOUD') == 'true'
 
 IS_IN_CLOUD = is_streamlit_cloud()
+
+# ========================================
+# STREAMLIT (CARGA PEREZOSA)
+# ========================================
+
+# CFA_HEADLESS=1 para CLI / evaluaciones batch: los errores se lanzan como
+# excepciones en lugar de pasar por st.error / st.stop
+HEADLESS = os.getenv("CFA_HEADLESS") == "1"
+
+
+def get_streamlit():
+    """
+    Devuelve el módulo streamlit solo si la app ya corre bajo Streamlit.
+
+    Nunca lo importa por su cuenta: los scripts de CLI/batch no pagan la
+    carga de todo el árbol de dependencias de Streamlit.
+    """
+    if HEADLESS:
+        return None
+    return sys.modules.get("streamlit")
+
+
+def abortar(mensaje: str):
+    """Muestra el error en la UI y detiene la app; sin UI lanza RuntimeError."""
+    st = get_streamlit()
+    if st is None:
+        raise RuntimeError(mensaje)
+    st.error(mensaje)
+    st.stop()
+
 # ========================================
 # PATHS DEL PROYECTO (CORREGIDO)
 # ========================================
@@ -91,7 +122,10 @@ def load_api_key(secret_name: str, env_var_name: str, required: bool = True) ->
     source = "unknown"
 
     try:
-        # Intenta Streamlit Secrets primero
+        # Intenta Streamlit Secrets primero (solo si corre bajo Streamlit)
+        st = get_streamlit()
+        if st is None:
+            raise KeyError(secret_name)
         loaded_key = st.secrets[secret_name]
         source = "Streamlit secrets"
         print(f"🔑 Cargada {secret_name} desde {source}.")
@@ -117,17 +151,19 @@ def load_api_key(secret_name: str, env_var_name: str, required: bool = True) ->
         else:
             if required:
                 error_message = f"{env_var_name} no encontrada. Configúrala en secrets o .env"
-                st.error(error_message)
                 print(f"❌ {error_message}")
-                st.stop()
+                abortar(error_message)
             else:
                 print(f"⚠️ {env_var_name} no encontrada (opcional).")
                 return None
     except Exception as e:
-        st.error(f"Error inesperado al cargar {secret_name}: {e}")
+        error_message = f"Error inesperado al cargar {secret_name}: {e}"
         print(f"❌ Error al cargar {secret_name}: {e}")
         if required:
-            st.stop()
+            abortar(error_message)
+        st = get_streamlit()
+        if st is not None:
+            st.error(error_message)
         return None
 
 # Cargar API keys
@@ -172,14 +208,65 @@ _llm_instance = None
 # CACHE CONFIGURATION
 # ========================================
 
-# Habilitar cache in-memory para reducir latencia
+# Cache exacta de respuestas del LLM (mismo prompt + mismo modelo -> misma
+# respuesta). Cubre todas las llamadas invoke: supervisor, cada paso de los
+# agentes especialistas y la síntesis RAG.
 from langchain.globals import set_llm_cache
 from langchain.cache import InMemoryCache
 
-# Inicializar cache in-memory
+# En memoria del proceso: las respuestas no sobreviven a un reinicio, así
+# que no acumulan respuestas viejas sin caducidad en disco (y los scripts
+# admin que importan config no crean ningún archivo)
 set_llm_cache(InMemoryCache())
 print("✅ Cache de LLM habilitado (InMemoryCache)")
 
+# ========================================
+# PROMPT CACHING: MARCADORES SOLO PARA ANTHROPIC
+# ========================================
+
+def _sin_cache_control(messages):
+    """Mensajes sin los bloques cache_control (clave exclusiva de Anthropic)."""
+    limpios = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, list) and any(
+            isinstance(block, dict) and "cache_control" in block for block in content
+        ):
+            message = message.model_copy(update={"content": [
+                {k: v for k, v in block.items() if k != "cache_control"}
+                if isinstance(block, dict) else block
+                for block in content
+            ]})
+        limpios.append(message)
+    return limpios
+
+
+class _SinCacheControlMixin:
+    """
+    Los system prompts llevan cache_control para Claude, pero los mismos
+    mensajes llegan a los fallbacks (OpenAI, Gemini) vía with_fallbacks:
+    se quitan antes de construir la request de esos proveedores.
+    """
+
+    def _generate(self, messages, *args, **kwargs):
+        return super()._generate(_sin_cache_control(messages), *args, **kwargs)
+
+    async def _agenerate(self, messages, *args, **kwargs):
+        return await super()._agenerate(_sin_cache_control(messages), *args, **kwargs)
+
+    def _stream(self, messages, *args, **kwargs):
+        return super()._stream(_sin_cache_control(messages), *args, **kwargs)
+
+    def _astream(self, messages, *args, **kwargs):
+        return super()._astream(_sin_cache_control(messages), *args, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def _modelo_sin_cache_control(clase_modelo):
+    """Subclase del chat model que descarta los marcadores cache_control."""
+    return type(clase_modelo.__name__, (_SinCacheControlMixin, clase_modelo), {})
+
+
 # --- FUNCIÓN 'get_llm' MEJORADA - PATRÓN CHAIN OF RESPONSIBILITY ---
 def get_llm():
     """
@@ -240,7 +327,7 @@ def get_llm():
     # ========================================
     try:
         if OPENAI_API_KEY:
-            llm_openai = ChatOpenAI(
+            llm_openai = _modelo_sin_cache_control(ChatOpenAI)(
                 model=LLM_MODEL_FALLBACK,
                 temperature=LLM_TEMPERATURE,
                 api_key=OPENAI_API_KEY,
@@ -266,7 +353,7 @@ def get_llm():
         if google_api_key:
             from langchain_google_genai import ChatGoogleGenerativeAI
 
-            llm_gemini = ChatGoogleGenerativeAI(
+            llm_gemini = _modelo_sin_cache_control(ChatGoogleGenerativeAI)(
                 model="gemini-1.5-flash",
                 temperature=LLM_TEMPERATURE,
                 google_api_key=google_api_key,
@@ -287,16 +374,19 @@ def get_llm():
     # ========================================
     if len(llm_chain) == 0:
         # ❌ Caso crítico: NINGÚN modelo disponible
-        st.error("❌ ERROR CRÍTICO: No se pudo inicializar ningún modelo LLM.")
-        st.error("Verifica tus API keys en .env o Streamlit secrets.")
         print("❌ ERROR CRÍTICO: Fallo en la autenticación de TODOS los modelos LLM.")
-        st.stop()
+        abortar(
+            "❌ ERROR CRÍTICO: No se pudo inicializar ningún modelo LLM. "
+            "Verifica tus API keys en .env o Streamlit secrets."
+        )
 
     elif len(llm_chain) == 1:
         # ⚠️ Solo UN modelo disponible (sin fallback)
         _llm_instance = llm_chain[0]
         print(f"⚠️ LLM configurado con 1 modelo (SIN fallback)")
-        st.warning("⚠️ Sistema funcionando con 1 solo modelo LLM. Considera configurar fallbacks.")
+        st = get_streamlit()
+        if st is not None:
+            st.warning("⚠️ Sistema funcionando con 1 solo modelo LLM. Considera configurar fallbacks.")
 
     else:
         # ✅ Múltiples modelos: Construir cadena con with_fallbacks
@@ -305,6 +395,51 @@ def get_llm():
         print(f"   Orden: {' → '.join([type(llm).__name__ for llm in llm_chain])}")
 
     return _llm_instance
+
+
+def _estructurar_modelo(modelo, schema):
+    """
+    Salida estructurada por tool calling forzado (sin modo JSON libre).
+    OpenAI admite además strict=True (decodificación restringida al schema);
+    Claude y Gemini ya fuerzan la tool con tool_choice.
+    """
+    if isinstance(modelo, ChatOpenAI):
+        return modelo.with_structured_output(schema, method="function_calling", strict=True)
+    return modelo.with_structured_output(schema)
+
+
+def _por_modelo(transformar):
+    """
+    Aplica `transformar` a cada modelo de la cadena de fallbacks y la
+    reconstruye. bind()/with_structured_output sobre RunnableWithFallbacks
+    solo afectan al primario (o pasan los mismos kwargs a todos).
+    """
+    llm = get_llm()
+    modelos = [llm.runnable, *llm.fallbacks] if hasattr(llm, "fallbacks") else [llm]
+    transformados = [transformar(m) for m in modelos]
+    if len(transformados) == 1:
+        return transformados[0]
+    return transformados[0].with_fallbacks(transformados[1:])
+
+
+def get_structured_llm(schema):
+    """
+    LLM con salida estructurada `schema`, respetando la cadena de fallbacks.
+    Cada proveedor recibe sus propios kwargs (strict solo donde existe).
+    """
+    return _por_modelo(lambda modelo: _estructurar_modelo(modelo, schema))
+
+
+def _limitar_tokens(modelo, max_tokens: int):
+    # Gemini llama al campo max_output_tokens; Claude y OpenAI, max_tokens
+    campo = "max_output_tokens" if "max_output_tokens" in type(modelo).model_fields else "max_tokens"
+    return modelo.model_copy(update={campo: max_tokens})
+
+
+def get_llm_limitado(max_tokens: int):
+    """LLM con la salida limitada a `max_tokens` en TODOS los modelos de la cadena."""
+    return _por_modelo(lambda modelo: _limitar_tokens(modelo, max_tokens))
+
 # ========================================
 # OTRAS CONFIGURACIONES
 # ========================================
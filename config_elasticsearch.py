@@ -5,6 +5,7 @@ Actualizado para LangChain 1.0+ con OpenAI Embeddings
 """
 
 import os
+import threading
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -65,8 +66,36 @@ CHUNK_OVERLAP = 250
 # FUNCIÓN PARA OBTENER CLIENTE ELASTICSEARCH
 # ========================================
 
+# Cliente compartido por todo el proceso (pool de conexiones keep-alive)
+_es_client = None
+_es_client_lock = threading.Lock()
+
+
 def get_elasticsearch_client():
-    """Crea y retorna un cliente de Elasticsearch configurado."""
+    """
+    Retorna el cliente de Elasticsearch configurado (singleton).
+
+    La primera llamada conecta y verifica el cluster; las siguientes
+    reutilizan el mismo cliente, sin repetir el handshake TLS + auth. Si la
+    conexión falla se retorna None y el siguiente intento vuelve a probar.
+    """
+    global _es_client
+
+    if _es_client is not None:
+        return _es_client
+
+    with _es_client_lock:
+        if _es_client is None:
+            _es_client = _create_elasticsearch_client()
+        return _es_client
+
+
+# Conexiones keep-alive del pool compartido (búsquedas multi-query en paralelo)
+ES_CONNECTIONS_PER_NODE = int(os.getenv("ES_CONNECTIONS_PER_NODE", "25"))
+
+
+def _create_elasticsearch_client():
+    """Crea un cliente de Elasticsearch y verifica la conexión."""
     from elasticsearch import Elasticsearch
     
     try:
@@ -76,7 +105,9 @@ def get_elasticsearch_client():
             verify_certs=True,  # ⚠️ En producción, usa certificados válidos
             request_timeout=30,
             max_retries=3,
-            retry_on_timeout=True
+            retry_on_timeout=True,
+            connections_per_node=ES_CONNECTIONS_PER_NODE,
+            http_compress=True  # gzip: los _bulk con vectores densos comprimen muy bien
         )
         
         if es_client.ping():
@@ -4,11 +4,13 @@ Grafo de agentes financieros.
 Actualizado: Sincronizado con protocolos de financial_agents.py
 """
 
-from typing import TypedDict, Annotated, Literal
+import re
+import functools
+from typing import TypedDict, Annotated, Literal, Optional
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-import streamlit as st
 from datetime import datetime
 # graph/agent_graph.py
 
@@ -24,13 +26,16 @@ from config import (
     CIRCUIT_BREAKER_MAX_RETRIES,
     CIRCUIT_BREAKER_COOLDOWN,
     ENABLE_POSTGRES_PERSISTENCE,
-    get_postgres_uri
+    get_postgres_uri,
+    get_structured_llm,
+    get_llm_limitado,
+    abortar
 )
 
 # Importar nodos de agente y supervisor
 from agents.financial_agents import (
-    supervisor_llm, supervisor_system_prompt,
-    agent_nodes, RouterSchema
+    supervisor_llm, supervisor_system_message,
+    agent_nodes, RouterSchema, mensaje_sistema_cacheable
 )
 
 # Routing eliminado - ahora usamos clasificación LLM simple
@@ -47,6 +52,13 @@ except ImportError:
 # ESTADO DEL GRAFO
 # ========================================
 
+def _acumular_resultados(actuales: list, nuevos: Optional[list]) -> list:
+    """Reducer de parallel_results: suma ramas en paralelo; None lo vacía."""
+    if nuevos is None:
+        return []
+    return (actuales or []) + nuevos
+
+
 class AgentState(TypedDict):
     """Estado del grafo con tracking de errores mejorado."""
     messages: Annotated[list, lambda x, y: x + y]
@@ -55,6 +67,11 @@ class AgentState(TypedDict):
     error_types: dict
     last_error_time: float
     circuit_open: bool
+    parallel_targets: list
+    # Respuestas (agente, texto) de las ramas Send del fan-out paralelo
+    parallel_results: Annotated[list, _acumular_resultados]
+    # Sub-preguntas teóricas {"pregunta", "query"} que RAG resuelve en lote
+    rag_queries: list
 
 # ========================================
 # HELPERS: DETECCIÓN DE ERRORES (ACTUALIZADO)
@@ -73,6 +90,354 @@ class DecisionSupervisor(BaseModel):
     razonamiento: str = Field(
         description="Breve justificación de la clasificación y optimización."
     )
+
+
+# Prompt del supervisor (constante: se construye una sola vez)
+SUPERVISOR_DECISION_PROMPT = """Eres el Supervisor Financiero CFA. 
+    
+    TU OBJETIVO:
+    1. CLASIFICAR la intención del usuario con precisión quirúrgica.
+    2. GENERAR una 'query_optimizada' para el siguiente paso.
+
+    REGLAS DE CATEGORÍA:
+    - TEORICA: Preguntas de "¿Qué es?", definiciones, conceptos, fórmulas o explicaciones.
+      **CRÍTICO:** Preguntas sobre "mediana", "promedio", "WACC", "Beta" (sin pedir cálculo numérico explícito) son TEÓRICAS.
+    - PRACTICA: Solicitudes EXPLÍCITAS de realizar un cálculo numérico con datos (ej: "Calcula el VAN", "Obtén el precio").
+    - AYUDA: Saludos, agradecimientos o solicitudes de guía de uso.
+
+    REGLAS DE 'query_optimizada':
+    - Si es TEORICA: TRADUCE la intención principal a KEYWORDS EN INGLÉS para búsqueda vectorial eficiente.
+      (Ej: "¿Qué es la mediana?" -> "Median definition statistics formula finance")
+    - Si es PRACTICA: Mantén la query en ESPAÑOL y asegúrate de incluir los datos numéricos del contexto.
+    """
+
+
+# SystemMessage construido una vez (prefijo idéntico en cada llamada)
+MENSAJE_DECISION = mensaje_sistema_cacheable(SUPERVISOR_DECISION_PROMPT)
+
+
+@functools.lru_cache(maxsize=1)
+def get_decision_llm():
+    """
+    LLM del supervisor con salida estructurada (DecisionSupervisor).
+    with_structured_output arma el schema de la tool y un parser nuevos en
+    cada llamada: se construye una vez y se reutiliza en cada request.
+    Tool calling forzado (strict en OpenAI): la categoría llega siempre
+    dentro del Literal, sin parseo de JSON libre.
+    """
+    return get_structured_llm(DecisionSupervisor)
+
+
+# Decisiones de routing memorizadas (misma consulta + contexto -> misma ruta)
+ROUTING_CACHE_SIZE = 512
+
+# Decisiones L1 precalculadas en lote (evaluaciones offline)
+_DECISIONES_PRECALCULADAS: dict = {}
+
+
+@functools.lru_cache(maxsize=ROUTING_CACHE_SIZE)
+def _decidir_categoria(query_con_contexto: str) -> DecisionSupervisor:
+    """
+    Clasificación L1 (TEORICA / PRACTICA / AYUDA) + query optimizada.
+    Memorizada por query con contexto: una consulta repetida (re-intentos,
+    evaluaciones en lote) no vuelve a pagar el round-trip al LLM. Los
+    errores no se memorizan (lru_cache no guarda excepciones).
+    """
+    precalculada = _DECISIONES_PRECALCULADAS.get(query_con_contexto)
+    if precalculada is not None:
+        return precalculada
+    return get_decision_llm().invoke([
+        MENSAJE_DECISION,
+        HumanMessage(content=query_con_contexto)
+    ])
+
+
+# Clasificación L2 con etiquetas de una letra: la respuesta es 1 token
+ETIQUETAS_ESPECIALISTAS = {
+    "A": "Agente_Renta_Fija",
+    "B": "Agente_Finanzas_Corp",
+    "C": "Agente_Equity",
+    "D": "Agente_Portafolio",
+    "E": "Agente_Derivados",
+}
+
+# Prompt L2 constante (la consulta va en el HumanMessage)
+PROMPT_NIVEL2 = """Determina el agente especialista para esta consulta de cálculo.
+
+AGENTES:
+A. Renta Fija (Bonos, duration, convexity)
+B. Finanzas Corporativas (VAN, TIR, WACC)
+C. Equity (Valuación acciones, Gordon)
+D. Portafolio (CAPM, Sharpe, Mediana, Promedio, Estadísticas) <-- Nota: Estadística va aquí
+E. Derivados (Opciones)
+
+Responde SOLO con la letra del agente (A, B, C, D o E)."""
+
+MENSAJE_NIVEL2 = mensaje_sistema_cacheable(PROMPT_NIVEL2)
+
+
+# La respuesta completa debe ser la letra (con puntuación opcional)
+_ETIQUETA_L2_PATTERN = re.compile(r"\W*([A-E])\W*", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1)
+def get_nivel2_llm():
+    """LLM de la clasificación L2, limitado a un token de salida (la letra)."""
+    return get_llm_limitado(1)
+
+
+@functools.lru_cache(maxsize=ROUTING_CACHE_SIZE)
+def _clasificar_especialista(query_con_contexto: str) -> str:
+    """Clasificación L2: agente especialista para una consulta PRACTICA (memorizada)."""
+    especialista_msg = get_nivel2_llm().invoke([
+        MENSAJE_NIVEL2,
+        HumanMessage(content=query_con_contexto)
+    ])
+    respuesta = especialista_msg.content.strip()
+    # Solo una letra A-E aislada: "Agente de..." o "A continuación..." no cuentan
+    etiqueta = _ETIQUETA_L2_PATTERN.fullmatch(respuesta)
+    next_node = ETIQUETAS_ESPECIALISTAS[etiqueta.group(1).upper()] if etiqueta else None
+
+    # Validación de seguridad
+    if next_node is None:
+        logger.warning("⚠️ Respuesta L2 ambigua: '%s'. Usando fallback por keywords.", respuesta)
+        # Fallback mejorado
+        combined = query_con_contexto.lower()
+        if "bono" in combined: next_node = "Agente_Renta_Fija"
+        elif any(x in combined for x in ["capm", "beta", "mediana", "promedio", "desviación"]): 
+            next_node = "Agente_Portafolio" # <--- Agregamos mediana/promedio aquí por si acaso
+        elif "opcion" in combined: next_node = "Agente_Derivados"
+        else: next_node = "Agente_Finanzas_Corp"
+
+    return next_node
+
+
+# ========================================
+# ROUTING RÁPIDO (SIN LLM)
+# ========================================
+
+# Mensajes que son solo un saludo o una petición de ayuda
+_AYUDA_PATTERN = re.compile(
+    r"^\W*(hola|buen[oa]s(\s+(días|dias|tardes|noches))?|gracias|muchas gracias|"
+    r"ayuda|help|ejemplos?|qué puedes hacer|que puedes hacer)\W*$",
+    re.IGNORECASE
+)
+
+# Cálculo explícito: verbo de cálculo + al menos un número en el mensaje
+_CALCULO_PATTERN = re.compile(
+    r"\b(calcul\w*|obt[eé]n\w*|determin\w*|comput\w*|cu[aá]nto)\b", re.IGNORECASE
+)
+_NUMERO_PATTERN = re.compile(r"\d")
+
+# Marcadores de pregunta teórica: esas consultas siempre pasan por el LLM
+_TEORIA_PATTERN = re.compile(
+    r"(qu[eé] es|define|definici[oó]n|explica|concepto|significado|diferencia entre|por qu[eé])",
+    re.IGNORECASE
+)
+
+# Consultas dirigidas a la documentación CFA: siempre RAG, aunque traigan números
+RAG_PATTERN = re.compile(
+    r"(qu[eé] dice el cfa|seg[uú]n (el )?cfa|explica el concepto|"
+    r"busca en la documentaci[oó]n|qu[eé] es .+ seg[uú]n)",
+    re.IGNORECASE
+)
+
+# Keywords -> especialista (se compilan una vez al importar)
+ROUTE_RULES = [
+    (re.compile(r"\b(bonos?|cup[oó]n|duration|duraci[oó]n|convexi\w*|current yield|ytm)\b", re.IGNORECASE),
+     "Agente_Renta_Fija"),
+    (re.compile(r"\b(npv|tir|irr|wacc|payback|índice de rentabilidad|profitability index)\b", re.IGNORECASE),
+     "Agente_Finanzas_Corp"),
+    # "van" también es el verbo ("cuánto van a valer"): VAN en mayúsculas
+    # o precedido de artículo ("el van", "del VAN")
+    (re.compile(r"\bVAN\b|\b(?i:el|del|un)\s+(?i:van)\b"),
+     "Agente_Finanzas_Corp"),
+    (re.compile(r"\b(gordon|ddm|dividendos?)\b", re.IGNORECASE),
+     "Agente_Equity"),
+    (re.compile(r"\b(capm|beta|sharpe|treynor|jensen|alfa|alpha|portafolio|cartera|mediana|promedio|desviaci[oó]n)\b", re.IGNORECASE),
+     "Agente_Portafolio"),
+    (re.compile(r"\b(opci[oó]n|opciones|call|put|black[- ]?scholes|paridad)\b", re.IGNORECASE),
+     "Agente_Derivados"),
+]
+
+
+def fast_route(query: str) -> Optional[str]:
+    """
+    Routing determinista para los casos obvios, sin llamar al LLM.
+
+    - Saludo / ayuda (el mensaje completo) -> Agente_Ayuda
+    - Cálculo explícito con datos numéricos que solo encaja con UN
+      especialista -> ese especialista
+
+    Todo lo demás (teoría, consultas ambiguas) devuelve None y sigue por
+    la clasificación con LLM: las consultas teóricas necesitan la query
+    traducida a keywords en inglés para el RAG.
+    """
+    if not query:
+        return None
+
+    if _AYUDA_PATTERN.match(query):
+        return "Agente_Ayuda"
+
+    if (
+        _CALCULO_PATTERN.search(query)
+        and _NUMERO_PATTERN.search(query)
+        and not _TEORIA_PATTERN.search(query)
+        and not RAG_PATTERN.search(query)
+    ):
+        matches = {agent for pattern, agent in ROUTE_RULES if pattern.search(query)}
+        if len(matches) == 1:
+            return matches.pop()
+
+    return None
+
+
+# Separadores entre sub-tareas de una consulta compuesta ("calcula el VAN ... y el CAPM ...")
+_CONJUNCION_PATTERN = re.compile(
+    r"\s*(?:;|\by\s+(?:luego|también|tambien|además|ademas)\b|\by\b|\badem[aá]s\b)\s*",
+    re.IGNORECASE
+)
+
+
+def fast_route_parallel(query: str) -> list:
+    """
+    Detecta cálculos compuestos e independientes (p. ej. "calcula el VAN
+    con ... y el CAPM con ...") que corresponden a especialistas distintos.
+
+    La consulta se parte por conjunciones; cada tramo con keywords debe
+    encajar con UN solo especialista (los tramos sin keywords son datos del
+    tramo anterior). Si salen 2+ especialistas distintos se devuelven en
+    orden de aparición; si no (o hay ambigüedad), lista vacía.
+    """
+    if not query or not (
+        _CALCULO_PATTERN.search(query)
+        and _NUMERO_PATTERN.search(query)
+        and not _TEORIA_PATTERN.search(query)
+        and not RAG_PATTERN.search(query)
+    ):
+        return []
+
+    targets = []
+    for segment in _CONJUNCION_PATTERN.split(query):
+        matches = {agent for pattern, agent in ROUTE_RULES if pattern.search(segment)}
+        if len(matches) > 1:
+            return []
+        if matches:
+            agent = matches.pop()
+            if agent not in targets:
+                targets.append(agent)
+
+    return targets if len(targets) > 1 else []
+
+
+def precalcular_decisiones(queries: list, max_concurrency: int = 16) -> int:
+    """
+    Clasifica en lote (L1) las consultas de una evaluación offline.
+
+    Usa llm.batch con max_concurrency en vez de una llamada secuencial por
+    consulta; las decisiones quedan disponibles para supervisor_node. Las
+    consultas que resuelven las reglas rápidas y las ya calculadas se
+    omiten. Devuelve el número de decisiones nuevas.
+    """
+    pendientes = {}
+    for query in queries:
+        if fast_route_parallel(query) or fast_route(query):
+            continue
+        # Misma clave que usa supervisor_node para un primer mensaje
+        clave = extraer_query_con_contexto(
+            [HumanMessage(content=query)], window_size=2, categoria_actual=None
+        ) or query
+        if clave not in _DECISIONES_PRECALCULADAS:
+            pendientes[clave] = [
+                MENSAJE_DECISION,
+                HumanMessage(content=clave)
+            ]
+
+    if not pendientes:
+        return 0
+
+    logger.info("📦 Clasificando %s consultas en lote", len(pendientes))
+    resultados = get_decision_llm().batch(
+        list(pendientes.values()),
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True
+    )
+
+    nuevas = 0
+    for clave, resultado in zip(pendientes, resultados):
+        if isinstance(resultado, Exception):
+            logger.warning("⚠️ Decisión en lote fallida (%s); se resolverá en línea", resultado)
+            continue
+        _DECISIONES_PRECALCULADAS[clave] = resultado
+        nuevas += 1
+    return nuevas
+
+
+# Sub-preguntas de un mensaje ("¿Qué es el WACC? ¿Y cómo se calcula?")
+_PREGUNTA_PATTERN = re.compile(r"¿?[^¿?]+\?")
+MAX_SUBPREGUNTAS = 4
+
+# Cada sub-pregunta se optimiza con el mensaje completo como contexto
+PLANTILLA_SUBPREGUNTA = (
+    "MENSAJE COMPLETO DEL USUARIO:\n{mensaje}\n\n"
+    "Clasifica y optimiza SOLO esta sub-pregunta (usa el mensaje completo para "
+    "resolver referencias como \"¿y cómo se calcula?\"):\n{subpregunta}"
+)
+
+
+def dividir_subpreguntas(texto: str) -> list:
+    """Preguntas del mensaje (2 o más, hasta MAX_SUBPREGUNTAS) o lista vacía."""
+    if not isinstance(texto, str):
+        return []
+    preguntas = [p.strip() for p in _PREGUNTA_PATTERN.findall(texto) if len(p.strip()) > 3]
+    return preguntas[:MAX_SUBPREGUNTAS] if len(preguntas) > 1 else []
+
+
+def planificar_subpreguntas(texto_usuario: str) -> list:
+    """
+    Sub-consultas RAG de un mensaje con varias preguntas teóricas.
+
+    Cada pregunta pasa por la misma reescritura a keywords en inglés que la
+    consulta única (DecisionSupervisor, en un solo batch), con el mensaje
+    completo como contexto: "¿Y cómo se calcula?" se resuelve contra la
+    pregunta anterior en vez de buscarse suelta. Si alguna no es TEORICA o
+    la reescritura falla, devuelve [] y RAG usa la consulta única.
+    """
+    preguntas = dividir_subpreguntas(texto_usuario)
+    if not preguntas:
+        return []
+
+    try:
+        decisiones = get_decision_llm().batch([
+            [
+                MENSAJE_DECISION,
+                HumanMessage(content=PLANTILLA_SUBPREGUNTA.format(
+                    mensaje=texto_usuario, subpregunta=pregunta
+                ))
+            ]
+            for pregunta in preguntas
+        ])
+    except Exception as e:
+        logger.warning("⚠️ Sin optimización por sub-pregunta (%s): consulta única", e)
+        return []
+
+    if any(d.categoria != "TEORICA" for d in decisiones):
+        logger.info("📝 Sub-preguntas mixtas: se resuelve como consulta única")
+        return []
+
+    return [
+        {"pregunta": pregunta, "query": decision.query_optimizada}
+        for pregunta, decision in zip(preguntas, decisiones)
+    ]
+
+
+def clear_routing_cache():
+    """Vacía la caché de decisiones de routing (p. ej. al reiniciar la sesión)."""
+    _DECISIONES_PRECALCULADAS.clear()
+    _decidir_categoria.cache_clear()
+    _clasificar_especialista.cache_clear()
+
+
 def detect_error_type(message: AIMessage) -> str:
     """
     Detecta el tipo de error en un mensaje de agente.
@@ -112,6 +477,55 @@ def detect_error_type(message: AIMessage) -> str:
     return 'unknown'
 
 
+SENAL_TRANSFERIR_RAG = "TRANSFERIR_A_RAG"
+
+# Marca de las consultas que el supervisor reescribe y añade al historial
+NOMBRE_CONSULTA_SUPERVISOR = "consulta_supervisor"
+
+
+def _consulta_supervisor(content: str) -> HumanMessage:
+    """Consulta reescrita por el supervisor para el nodo destino (no la escribió el usuario)."""
+    return HumanMessage(content=content, name=NOMBRE_CONSULTA_SUPERVISOR)
+
+
+def consulta_original_usuario(messages: list) -> str:
+    """Último mensaje escrito por el usuario (ignora las consultas del supervisor)."""
+    return next(
+        (
+            m.content for m in reversed(messages)
+            if isinstance(m, HumanMessage) and m.name != NOMBRE_CONSULTA_SUPERVISOR
+        ),
+        ""
+    )
+
+
+def _transferir_a_rag(messages: list) -> dict:
+    """
+    Redirige a RAG la consulta que un especialista rechazó por teórica.
+
+    RAG toma el último mensaje como consulta, así que se reenvía la
+    pregunta original del usuario (no la reescrita por el supervisor, cuya
+    decisión PRACTICA ya está en caché), optimizada a keywords si el LLM
+    la clasifica como teórica.
+    """
+    query = consulta_original_usuario(messages)
+    try:
+        decision = _decidir_categoria(query)
+        if decision.categoria == "TEORICA":
+            query = decision.query_optimizada
+    except Exception as e:
+        logger.warning("⚠️ Sin optimización de query para RAG: %s", e)
+
+    logger.info("📚 Especialista transfiere a RAG")
+    return {
+        "next_node": "Agente_RAG",
+        "messages": [_consulta_supervisor(query)],
+        "rag_queries": [],
+        "error_count": 0,
+        "error_types": {}
+    }
+
+
 def should_open_circuit(error_types: dict, error_count: int) -> bool:
     """Determina si el circuit breaker debe activarse."""
     if error_types.get('tool_failure', 0) >= 2:
@@ -174,7 +588,7 @@ def _analyze_last_message(messages: list) -> tuple:
                 possible_error_detected = True
                 error_count_delta = 1
                 error_types_update[error_type] = 1
-                logger.warning(f"⚠️ Error detectado - Tipo: {error_type}")
+                logger.warning("⚠️ Error detectado - Tipo: %s", error_type)
 
     return possible_error_detected, error_type, error_count_delta, error_types_update
 
@@ -204,16 +618,14 @@ def _execute_routing_decision(state: AgentState, messages: list) -> tuple:
     routing_confidence = 0.95
 
     try:
-        from agents.financial_agents import supervisor_llm, supervisor_system_prompt
-
-        supervisor_messages = [HumanMessage(content=supervisor_system_prompt)] + messages
+        supervisor_messages = [supervisor_system_message] + messages
         route = supervisor_llm.invoke(supervisor_messages)
 
-        next_node_decision = route.next_agent if hasattr(route, 'next_agent') else "FINISH"
-        logger.info(f"🧭 Supervisor LLM decide: {next_node_decision}")
+        next_node_decision = getattr(route, 'next_agent', None) or "FINISH"
+        logger.info("🧭 Supervisor LLM decide: %s", next_node_decision)
 
     except Exception as e:
-        logger.error(f"❌ Error en supervisor: {e}", exc_info=True)
+        logger.error("❌ Error en supervisor: %s", e, exc_info=True)
         next_node_decision = "FINISH"
 
     return next_node_decision, routing_method, routing_confidence
@@ -271,7 +683,7 @@ def extraer_query_con_contexto(
         return last_user_msg
     
     # 4. Si ES refinamiento → Incluir contexto limitado Y FILTRADO
-    logger.info(f"📥 Extrayendo contexto (window={window_size}, cat={categoria_actual})")
+    logger.info("📥 Extrayendo contexto (window=%s, cat=%s)", window_size, categoria_actual)
     
     context_messages = []
     turn_count = 0
@@ -298,7 +710,7 @@ def extraer_query_con_contexto(
                 es_pregunta_teorica = any(kw in msg_lower for kw in teoricas_keywords)
                 
                 if es_pregunta_teorica:
-                    logger.info(f"⏭️ Saltando contexto teórico: '{msg.content[:50]}...'")
+                    logger.info("⏭️ Saltando contexto teórico: '%.50s...'", msg.content)
                     continue  # ← SALTAR mensaje teórico
             
             # Si pasa filtro, agregar
@@ -323,7 +735,7 @@ def extraer_query_con_contexto(
         NUEVA CONSULTA:
         {last_user_msg}"""
                 
-        logger.info(f"✅ Query enriquecida ({len(enriched_query)} chars)")
+        logger.info("✅ Query enriquecida (%s chars)", len(enriched_query))
         return enriched_query
     else:
         logger.info("⚠️ Sin contexto relevante, retornando query aislada")
@@ -350,6 +762,10 @@ def supervisor_node(state: AgentState) -> dict:
         return cb_status
     
     if not messages or not isinstance(messages[-1], HumanMessage):
+        # Respuesta de un agente: se decide con reglas, nunca con el LLM
+        if messages and isinstance(messages[-1], AIMessage) and \
+                SENAL_TRANSFERIR_RAG in _texto_mensaje(messages[-1]):
+            return _transferir_a_rag(messages)
         is_error, error_type, delta_count, delta_types = _analyze_last_message(messages)
         if is_error:
             error_count += delta_count
@@ -370,46 +786,44 @@ def supervisor_node(state: AgentState) -> dict:
     if not query_con_contexto: 
         query_con_contexto = last_user_query_raw
 
-    logger.info(f"📝 Contexto recuperado: {query_con_contexto[:100]}...")
+    logger.info("📝 Contexto recuperado: %.100s...", query_con_contexto)
 
-    # 3. DECISIÓN ESTRUCTURADA (Clasificación + Traducción)
-    # Aquí usamos la clase DecisionSupervisor que ya tienes definida en tu archivo
-    
-    system_prompt = """Eres el Supervisor Financiero CFA. 
-    
-    TU OBJETIVO:
-    1. CLASIFICAR la intención del usuario con precisión quirúrgica.
-    2. GENERAR una 'query_optimizada' para el siguiente paso.
-
-    REGLAS DE CATEGORÍA:
-    - TEORICA: Preguntas de "¿Qué es?", definiciones, conceptos, fórmulas o explicaciones.
-      **CRÍTICO:** Preguntas sobre "mediana", "promedio", "WACC", "Beta" (sin pedir cálculo numérico explícito) son TEÓRICAS.
-    - PRACTICA: Solicitudes EXPLÍCITAS de realizar un cálculo numérico con datos (ej: "Calcula el VAN", "Obtén el precio").
-    - AYUDA: Saludos, agradecimientos o solicitudes de guía de uso.
+    # 2b. Fast-path: casos obvios sin pasar por el LLM
+    rutas_paralelas = fast_route_parallel(last_user_query_raw)
+    if rutas_paralelas:
+        logger.info("⚡ Cálculo compuesto en paralelo: %s", rutas_paralelas)
+        return {
+            "next_node": NODO_PARALELO,
+            "parallel_targets": rutas_paralelas,
+            "error_count": 0,
+            "error_types": {}
+        }
 
-    REGLAS DE 'query_optimizada':
-    - Si es TEORICA: TRADUCE la intención principal a KEYWORDS EN INGLÉS para búsqueda vectorial eficiente.
-      (Ej: "¿Qué es la mediana?" -> "Median definition statistics formula finance")
-    - Si es PRACTICA: Mantén la query en ESPAÑOL y asegúrate de incluir los datos numéricos del contexto.
-    """
+    ruta_rapida = fast_route(last_user_query_raw)
+    if ruta_rapida:
+        logger.info("⚡ Routing rápido (reglas): %s", ruta_rapida)
+        return {
+            "next_node": ruta_rapida,
+            "messages": [_consulta_supervisor(query_con_contexto)],
+            "error_count": 0,
+            "error_types": {}
+        }
 
+    # 3. DECISIÓN ESTRUCTURADA (Clasificación + Traducción)
+    # Aquí usamos la clase DecisionSupervisor que ya tienes definida en tu archivo
     try:
         # Invocación estructurada usando tu clase Pydantic
-        decision_llm = get_llm().with_structured_output(DecisionSupervisor)
-        decision = decision_llm.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=query_con_contexto)
-        ])
+        decision = _decidir_categoria(query_con_contexto)
         
         categoria = decision.categoria
         query_final = decision.query_optimizada
         razonamiento = decision.razonamiento
         
-        logger.info(f"🧠 Decisión: {categoria} | Razón: {razonamiento}")
-        logger.info(f"🔍 Query Optimizada: {query_final}")
+        logger.info("🧠 Decisión: %s | Razón: %s", categoria, razonamiento)
+        logger.info("🔍 Query Optimizada: %s", query_final)
 
     except Exception as e:
-        logger.error(f"❌ Error en decisión estructurada: {e}")
+        logger.error("❌ Error en decisión estructurada: %s", e)
         # Fallback seguro ante error del LLM
         categoria = "PRACTICA"
         query_final = query_con_contexto
@@ -418,9 +832,14 @@ def supervisor_node(state: AgentState) -> dict:
     
     if categoria == "TEORICA":
         logger.info("📚 Ruteando a RAG (Keywords en Inglés)")
+        # Varias preguntas en el mensaje: una query optimizada por pregunta
+        rag_queries = planificar_subpreguntas(last_user_query_raw)
+        if rag_queries:
+            logger.info("📚 %s sub-preguntas optimizadas para RAG", len(rag_queries))
         return {
             "next_node": "Agente_RAG",
-            "messages": [HumanMessage(content=query_final)], # Enviamos keywords en inglés
+            "messages": [_consulta_supervisor(query_final)], # Enviamos keywords en inglés
+            "rag_queries": rag_queries,
             "error_count": 0, 
             "error_types": {}
         }
@@ -429,7 +848,7 @@ def supervisor_node(state: AgentState) -> dict:
         logger.info("❓ Ruteando a Ayuda")
         return {
             "next_node": "Agente_Ayuda",
-            "messages": [HumanMessage(content=query_con_contexto)],
+            "messages": [_consulta_supervisor(query_con_contexto)],
             "error_count": 0, 
             "error_types": {}
         }
@@ -437,59 +856,110 @@ def supervisor_node(state: AgentState) -> dict:
     else:  # PRACTICA
         logger.info("🧮 Ruteando a Especialista (Query en Español con datos)")
         
+        # Mientras L2 espera al LLM, se construye el especialista que apuntan
+        # las keywords (solo si es uno): el resto sigue construyéndose en su
+        # primer uso
+        candidatos = {agent for pattern, agent in ROUTE_RULES if pattern.search(query_con_contexto)}
+        if len(candidatos) == 1:
+            agent_nodes.precalentar(candidatos)
+
         # Clasificación de Nivel 2 para elegir el agente matemático correcto
-        prompt_nivel2 = f"""Determina el agente especialista para esta consulta de cálculo.
-        CONSULTA: {query_con_contexto}
-        
-        AGENTES:
-        - Agente_Renta_Fija (Bonos, duration, convexity)
-        - Agente_Finanzas_Corp (VAN, TIR, WACC)
-        - Agente_Equity (Valuación acciones, Gordon)
-        - Agente_Portafolio (CAPM, Sharpe, Mediana, Promedio, Estadísticas) <-- Nota: Estadística va aquí
-        - Agente_Derivados (Opciones)
-
-        Responde EXACTAMENTE: "Agente_XXXXX" """
-        
         try:
-            especialista_msg = get_llm().invoke([
-                SystemMessage(content=prompt_nivel2),
-                HumanMessage(content=query_con_contexto)
-            ])
-            next_node = especialista_msg.content.strip()
+            next_node = _clasificar_especialista(query_con_contexto)
             
-            # Validación de seguridad
-            agentes_validos = [
-                "Agente_Renta_Fija", "Agente_Finanzas_Corp",
-                "Agente_Equity", "Agente_Portafolio", "Agente_Derivados"
-            ]
-            
-            if next_node not in agentes_validos:
-                logger.warning(f"⚠️ Respuesta L2 ambigua: '{next_node}'. Usando fallback por keywords.")
-                # Fallback mejorado
-                combined = query_con_contexto.lower()
-                if "bono" in combined: next_node = "Agente_Renta_Fija"
-                elif any(x in combined for x in ["capm", "beta", "mediana", "promedio", "desviación"]): 
-                    next_node = "Agente_Portafolio" # <--- Agregamos mediana/promedio aquí por si acaso
-                elif "opcion" in combined: next_node = "Agente_Derivados"
-                else: next_node = "Agente_Finanzas_Corp"
-            
-            logger.info(f"🎯 Agente Seleccionado: {next_node}")
+            logger.info("🎯 Agente Seleccionado: %s", next_node)
             
             return {
                 "next_node": next_node,
-                "messages": [HumanMessage(content=query_con_contexto)], # Mantenemos español para el agente
+                "messages": [_consulta_supervisor(query_con_contexto)], # Mantenemos español para el agente
                 "error_count": 0, 
                 "error_types": {}
             }
             
         except Exception as e:
-            logger.error(f"❌ Error en clasificación L2: {e}")
+            logger.error("❌ Error en clasificación L2: %s", e)
             return {
                 "next_node": "Agente_Finanzas_Corp",
-                "messages": [HumanMessage(content=query_con_contexto)],
+                "messages": [_consulta_supervisor(query_con_contexto)],
                 "error_count": error_count, 
                 "error_types": error_types
             }
+# ========================================
+# NODO ESPECIALISTAS EN PARALELO
+# ========================================
+
+NODO_PARALELO = "Especialistas_Paralelo"
+
+INSTRUCCION_PARALELO = (
+    "\n\n(Resuelve SOLO la parte de esta consulta que corresponde a tu especialidad; "
+    "las demás partes las resuelve otro especialista en paralelo.)"
+)
+
+
+def _texto_mensaje(message) -> str:
+    """Texto de un mensaje (content puede ser str o lista de bloques)."""
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        part['text'] if isinstance(part, dict) else part
+        for part in message.content
+        if isinstance(part, str) or (isinstance(part, dict) and 'text' in part)
+    )
+
+
+NODO_UNION_PARALELO = "Unir_Paralelo"
+
+
+def despachar_paralelo(state: AgentState) -> list:
+    """
+    Fan-out con la API Send de LangGraph: una rama por especialista.
+
+    Las ramas corren en el mismo superstep, así que la latencia total es la
+    del especialista más lento en vez de la suma. Cada rama recibe la
+    consulta completa con la instrucción de resolver solo su parte.
+    """
+    targets = state.get("parallel_targets") or []
+    query = _texto_mensaje(state["messages"][-1]) + INSTRUCCION_PARALELO
+    logger.info("🔀 Ejecutando en paralelo: %s", targets)
+    return [Send(NODO_PARALELO, {"agente": name, "query": query}) for name in targets]
+
+
+def nodo_especialista_paralelo(tarea: dict, config=None) -> dict:
+    """Rama del fan-out: ejecuta un especialista y guarda solo su respuesta final."""
+    name = tarea["agente"]
+    try:
+        result = agent_nodes.nodo(name)(
+            {"messages": [HumanMessage(content=tarea["query"])]}, config
+        )
+        respuesta = _texto_mensaje(result["messages"][-1])
+    except Exception as e:
+        logger.error("❌ Error en %s (paralelo): %s", name, e)
+        respuesta = f"Error técnico en {name}: {e}. ERROR_BLOQUEANTE"
+    return {"parallel_results": [(name, respuesta)]}
+
+
+def nodo_unir_paralelo(state: AgentState) -> dict:
+    """
+    Une las respuestas de las ramas en un único AIMessage (lo que muestra
+    la app), en el orden de la consulta, y limpia el estado del fan-out.
+    """
+    targets = state.get("parallel_targets") or []
+    respuestas = dict(state.get("parallel_results") or [])
+    contenido = "\n\n".join(
+        f"**{name.replace('Agente_', '').replace('_', ' ')}:**\n{respuestas.get(name, '')}"
+        for name in targets
+    )
+    return {
+        "messages": [AIMessage(content=contenido)],
+        "parallel_targets": [],
+        "parallel_results": None
+    }
+
+
+# Pasos máximos por turno del grafo principal (Supervisor -> Agente -> Supervisor ...)
+GRAPH_RECURSION_LIMIT = 12
+
+
 def build_graph():
     """Construye el grafo con persistencia."""
     logger.info("🏗️ Construyendo grafo...")
@@ -497,17 +967,22 @@ def build_graph():
 
     # Nodos
     workflow.add_node("Supervisor", supervisor_node)
-    for name, node in agent_nodes.items():
-        workflow.add_node(name, node)
+    for name in agent_nodes:
+        workflow.add_node(name, agent_nodes.nodo(name))
+    workflow.add_node(NODO_PARALELO, nodo_especialista_paralelo)
+    workflow.add_node(NODO_UNION_PARALELO, nodo_unir_paralelo)
 
     # Edges
     workflow.set_entry_point("Supervisor")
     
     def conditional_router(state):
         dest = state.get("next_node")
-        return dest if dest in agent_nodes or dest == "FINISH" else "FINISH"
+        if dest == NODO_PARALELO:
+            return despachar_paralelo(state)
+        return dest if dest in conditional_map else "FINISH"
 
     conditional_map = {name: name for name in agent_nodes}
+    conditional_map[NODO_PARALELO] = NODO_PARALELO
     conditional_map["FINISH"] = END
 
     workflow.add_conditional_edges("Supervisor", conditional_router, conditional_map)
@@ -516,10 +991,10 @@ def build_graph():
     for name in agent_nodes:
         if name in ["Agente_Ayuda", "Agente_RAG"]: 
             workflow.add_edge(name, END) # RAG y Ayuda terminan directo
-        elif name == "Agente_Sintesis_RAG":
-            workflow.add_edge(name, END)
         else:
             workflow.add_edge(name, "Supervisor")
+    workflow.add_edge(NODO_PARALELO, NODO_UNION_PARALELO)
+    workflow.add_edge(NODO_UNION_PARALELO, "Supervisor")
 
     # Persistencia
     checkpointer = MemorySaver()
@@ -545,7 +1020,7 @@ def build_graph():
             checkpointer.setup() # Crea las tablas si no existen
             logger.info("✅ PostgreSQL Persistence ON")
         except Exception as e:
-            logger.warning(f"⚠️ PostgreSQL falló ({e}), usando MemorySaver")
+            logger.warning("⚠️ PostgreSQL falló (%s), usando MemorySaver", e)
     return workflow.compile(checkpointer=checkpointer)
 
 
@@ -558,6 +1033,5 @@ try:
     compiled_graph = build_graph()
     logger.info("✅ Grafo compilado (routing simplificado con clasificación LLM)")
 except Exception as e:
-    logger.error(f"🔥 Error Fatal en Graph Init: {e}")
-    st.error("Error crítico del sistema.")
-    st.stop()
\ No newline at end of file
+    logger.error("🔥 Error Fatal en Graph Init: %s", e)
+    abortar("Error crítico del sistema.")
\ No newline at end of file
@@ -29,7 +29,8 @@ Los usuarios consultan material financiero indexado en Elasticsearch.
 El admin indexa documentos con generate_index.py
 """
 
-from typing import List
+import re
+from typing import List, Optional
 from langchain_openai import OpenAIEmbeddings
 from langchain_elasticsearch import ElasticsearchStore
 from langchain_core.documents import Document
@@ -40,12 +41,12 @@ from config_elasticsearch import (
     ES_INDEX_NAME,
     EMBEDDING_MODEL,
     EMBEDDING_DIMENSIONS,
-    get_elasticsearch_client,
-    get_es_config
+    get_elasticsearch_client
 )
 
 # Importar API key de OpenAI desde config principal
 from config import OPENAI_API_KEY
+from rag.semantic_cache import SemanticCacheLSH
 
 # ========================================
 # CLASE RAG ELASTICSEARCH
@@ -113,16 +114,12 @@ class FinancialRAGElasticsearch:
                 print("   python admin/generate_index.py")
                 return False
             
-            # Obtener configuración
-            es_config = get_es_config()
-            
-            # Crear ElasticsearchStore (LangChain 1.0 syntax)
+            # Crear ElasticsearchStore sobre el cliente compartido: un único
+            # pool keep-alive por proceso (sin un segundo cliente propio)
             self.vector_store = ElasticsearchStore(
                 index_name=self.index_name,
                 embedding=self.embeddings,
-                es_url=es_config["es_url"],
-                es_user=es_config["es_user"],
-                es_password=es_config["es_password"]
+                es_connection=es_client
             )
             
             print(f"✅ Conectado a Elasticsearch (índice: {self.index_name})")
@@ -166,7 +163,8 @@ class FinancialRAGElasticsearch:
         self,
         query: str,
         k: int = None,
-        filter_dict: dict = None
+        filter_dict: dict = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Document]:
         """
         Busca documentos similares a la query en Elasticsearch.
@@ -175,6 +173,8 @@ class FinancialRAGElasticsearch:
             query: Consulta de búsqueda
             k: Número de documentos a retornar
             filter_dict: Filtros de metadata (ej: {"cfa_level": "I"})
+            query_embedding: Embedding ya calculado de `query` (evita
+                volver a llamar a OpenAI)
         
         Returns:
             Lista de documentos relevantes
@@ -192,7 +192,15 @@ class FinancialRAGElasticsearch:
         
         try:
             # Búsqueda semántica con similarity_search
-            if filter_dict:
+            if query_embedding is not None:
+                extra = {"filter": filter_dict} if filter_dict else {}
+                results = [
+                    doc for doc, _ in
+                    self.vector_store.similarity_search_by_vector_with_relevance_scores(
+                        embedding=query_embedding, k=k, **extra
+                    )
+                ]
+            elif filter_dict:
                 results = self.vector_store.similarity_search(
                     query=query,
                     k=k,
@@ -219,6 +227,9 @@ class FinancialRAGElasticsearch:
 # Instancia única del sistema RAG
 rag_system = FinancialRAGElasticsearch()
 
+# Consultas casi idénticas (coseno >= 0.95) reutilizan el contexto ya buscado
+semantic_cache = SemanticCacheLSH(threshold=0.95)
+
 
 # ========================================
 # DICCIONARIO DE TÉRMINOS TÉCNICOS (ESPAÑOL ↔ INGLÉS)
@@ -297,6 +308,9 @@ def _construir_indice_inverso() -> dict:
 _INDICE_INVERSO = _construir_indice_inverso()
 print(f"✅ Índice inverso construido: {len(_INDICE_INVERSO)} palabras -> términos técnicos")
 
+# Acrónimos (2-5 letras mayúsculas), compilado una vez
+_ACRONIMO_PATTERN = re.compile(r'\b[A-Z]{2,5}\b')
+
 
 def enriquecer_query_bilingue(consulta: str) -> str:
     """
@@ -365,9 +379,8 @@ def generar_variaciones_query(consulta: str) -> List[str]:
         variaciones.append(consulta_enriquecida)
 
     # Variación 3: Extraer palabras clave (acrónimos y sustantivos técnicos) - OPTIMIZADO
-    import re
     # Buscar acrónimos (2-5 letras mayúsculas)
-    acronimos = re.findall(r'\b[A-Z]{2,5}\b', consulta)
+    acronimos = _ACRONIMO_PATTERN.findall(consulta)
 
     # Buscar palabras técnicas usando índice inverso (O(1) en lugar de O(n²))
     palabras_query = consulta.lower().split()
@@ -391,7 +404,11 @@ def generar_variaciones_query(consulta: str) -> List[str]:
     return variaciones
 
 
-def buscar_multi_query_paralelo(consulta: str, k_per_query: int = 2) -> List[Document]:
+def buscar_multi_query_paralelo(
+    consulta: str,
+    k_per_query: int = 2,
+    query_embedding: Optional[List[float]] = None
+) -> List[Document]:
     """
     Ejecuta múltiples variaciones de búsqueda EN PARALELO y combina resultados.
 
@@ -405,6 +422,8 @@ def buscar_multi_query_paralelo(consulta: str, k_per_query: int = 2) -> List[Doc
     Args:
         consulta: Query original del usuario
         k_per_query: Documentos a buscar por cada variación (default: 2)
+        query_embedding: Embedding de `consulta` ya calculado (caché
+            semántica); la variación original lo reutiliza
 
     Returns:
         Lista combinada de documentos únicos (max 4-6 resultados)
@@ -427,7 +446,11 @@ def buscar_multi_query_paralelo(consulta: str, k_per_query: int = 2) -> List[Doc
     def buscar_variacion(query_var):
         """Función helper para búsqueda en thread"""
         try:
-            docs = rag_system.search_documents(query_var, k=k_per_query)
+            # La variación 1 es la consulta original: su embedding ya existe
+            embedding = query_embedding if query_var == consulta else None
+            docs = rag_system.search_documents(
+                query_var, k=k_per_query, query_embedding=embedding
+            )
             return docs
         except Exception as e:
             print(f"❌ Error en búsqueda de variación '{query_var[:30]}...': {e}")
@@ -491,8 +514,19 @@ def buscar_documentacion_financiera(consulta: str) -> str:
     """
     print(f"\n🔍 RAG Tool (Multi-Query) invocado con consulta: '{consulta}'")
 
+    # Caché semántica: un embedding en lugar de multi-query + Elasticsearch
+    query_embedding = None
+    try:
+        query_embedding = rag_system.embeddings.embed_query(consulta)
+        cached = semantic_cache.get(query_embedding)
+        if cached is not None:
+            print(f"⚡ Caché semántica (hit): {semantic_cache.stats()}")
+            return cached
+    except Exception as e:
+        print(f"⚠️ Caché semántica no disponible: {e}")
+
     # OPTIMIZACIÓN: Multi-Query en paralelo (2-3 búsquedas concurrentes)
-    docs = buscar_multi_query_paralelo(consulta, k_per_query=2)
+    docs = buscar_multi_query_paralelo(consulta, k_per_query=2, query_embedding=query_embedding)
 
     if not docs:
         return (
@@ -531,7 +565,10 @@ def buscar_documentacion_financiera(consulta: str) -> str:
 
     full_context = "\n\n".join(context_parts)
 
-    return f"📚 Información encontrada en el material de estudio:\n\n{full_context}"
+    resultado = f"📚 Información encontrada en el material de estudio:\n\n{full_context}"
+    if query_embedding is not None:
+        semantic_cache.put(query_embedding, resultado)
+    return resultado
 
 
 print("✅ Módulo financial_rag_elasticsearch cargado (LangChain 1.0, OpenAI Embeddings).")
\ No newline at end of file
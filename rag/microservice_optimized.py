@@ -4,7 +4,7 @@ Sistema RAG - VERSIÓN OPTIMIZADA PARA MICROSERVICIO
 Incluye todas las optimizaciones de rendimiento implementadas
 
 INSTRUCCIONES:
-1. Copia este archivo al proyecto del microservicio
+1. Copia este archivo (y rag/semantic_cache.py) al proyecto del microservicio
 2. Reemplaza el archivo financial_rag_elasticsearch.py existente
 3. Reinicia el servidor del microservicio
 
@@ -13,9 +13,10 @@ OPTIMIZACIONES INCLUIDAS:
 - Multi-query paralelo con timeout
 - Deduplicación robusta con SHA256
 - Mejor manejo de errores
+- Caché semántica LSH para consultas casi idénticas
 """
 
-from typing import List
+from typing import List, Optional
 import sys
 import os
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
@@ -32,10 +33,10 @@ from langchain_core.tools import tool
 from config_elasticsearch import (
     ES_INDEX_NAME,
     EMBEDDING_MODEL,
-    get_elasticsearch_client,
-    get_es_config
+    get_elasticsearch_client
 )
 from config import OPENAI_API_KEY
+from rag.semantic_cache import SemanticCacheLSH
 
 
 # ========================================
@@ -117,6 +118,9 @@ def _construir_indice_inverso() -> dict:
 _INDICE_INVERSO = _construir_indice_inverso()
 print(f"✅ Índice inverso construido: {len(_INDICE_INVERSO)} palabras -> términos técnicos")
 
+# Acrónimos (2-5 letras mayúsculas), compilado una vez
+_ACRONIMO_PATTERN = re.compile(r'\b[A-Z]{2,5}\b')
+
 
 # ========================================
 # CLASE RAG ELASTICSEARCH OPTIMIZADA
@@ -164,22 +168,13 @@ class FinancialRAGElasticsearch:
                 print(f"❌ El índice '{self.index_name}' no existe")
                 return False
 
-            es_config = get_es_config()
-
-            # Configuración dinámica para Cloud ID o URL
-            store_kwargs = {
-                "index_name": self.index_name,
-                "embedding": self.embeddings,
-                "es_user": es_config["es_user"],
-                "es_password": es_config["es_password"]
-            }
-
-            if "es_cloud_id" in es_config:
-                store_kwargs["es_cloud_id"] = es_config["es_cloud_id"]
-            else:
-                store_kwargs["es_url"] = es_config.get("es_url")
-
-            self.vector_store = ElasticsearchStore(**store_kwargs)
+            # Store sobre el cliente compartido (Cloud ID o URL ya resueltos
+            # en config_elasticsearch): un único pool keep-alive por proceso
+            self.vector_store = ElasticsearchStore(
+                index_name=self.index_name,
+                embedding=self.embeddings,
+                es_connection=es_client
+            )
 
             # Mostrar info del índice
             count = es_client.count(index=self.index_name)
@@ -192,9 +187,15 @@ class FinancialRAGElasticsearch:
             print(f"❌ Error conectando a Elasticsearch: {e}")
             return False
 
-    def search_documents(self, query: str, k: int = 4) -> List[Document]:
+    def search_documents(
+        self,
+        query: str,
+        k: int = 4,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
         """
         Búsqueda básica de documentos (sin multi-query).
+        Con `query_embedding` ya calculado no se vuelve a llamar a OpenAI.
         """
         if not self.vector_store:
             if not self._connect():
@@ -202,7 +203,15 @@ class FinancialRAGElasticsearch:
 
         try:
             print(f"🔍 Buscando: '{query}' (top {k})")
-            results = self.vector_store.similarity_search(query=query, k=k)
+            if query_embedding is not None:
+                results = [
+                    doc for doc, _ in
+                    self.vector_store.similarity_search_by_vector_with_relevance_scores(
+                        embedding=query_embedding, k=k
+                    )
+                ]
+            else:
+                results = self.vector_store.similarity_search(query=query, k=k)
             print(f"✅ {len(results)} documentos encontrados")
             return results
         except Exception as e:
@@ -256,7 +265,7 @@ class FinancialRAGElasticsearch:
             variaciones.append(consulta_enriquecida)
 
         # Variación 3: Keywords (acrónimos + términos técnicos)
-        acronimos = re.findall(r'\b[A-Z]{2,5}\b', consulta)
+        acronimos = _ACRONIMO_PATTERN.findall(consulta)
 
         # Extraer palabras técnicas con índice inverso
         palabras_query = consulta.lower().split()
@@ -276,7 +285,12 @@ class FinancialRAGElasticsearch:
 
         return variaciones
 
-    def buscar_multi_query_paralelo(self, consulta: str, k_per_query: int = 2) -> List[Document]:
+    def buscar_multi_query_paralelo(
+        self,
+        consulta: str,
+        k_per_query: int = 2,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
         """
         Multi-query paralelo OPTIMIZADO.
 
@@ -301,7 +315,9 @@ class FinancialRAGElasticsearch:
         def buscar_variacion(query_var):
             """Helper para búsqueda en thread"""
             try:
-                return self.search_documents(query_var, k=k_per_query)
+                # La variación 1 es la consulta original: su embedding ya existe
+                embedding = query_embedding if query_var == consulta else None
+                return self.search_documents(query_var, k=k_per_query, query_embedding=embedding)
             except Exception as e:
                 print(f"❌ Error en variación '{query_var[:30]}...': {e}")
                 return []
@@ -346,6 +362,9 @@ class FinancialRAGElasticsearch:
 
 rag_system = FinancialRAGElasticsearch()
 
+# Consultas casi idénticas (coseno >= 0.95) reutilizan el contexto ya buscado
+semantic_cache = SemanticCacheLSH(threshold=0.95)
+
 
 # ========================================
 # TOOL PARA COMPATIBILIDAD
@@ -366,9 +385,23 @@ def buscar_documentacion_financiera(consulta: str, use_multi_query: bool = True)
     print(f"\n🔍 RAG Tool invocado: '{consulta}'")
     print(f"   Multi-query: {use_multi_query}")
 
+    # Caché semántica: un embedding en lugar de multi-query + Elasticsearch
+    query_embedding = None
+    if use_multi_query:
+        try:
+            query_embedding = rag_system.embeddings.embed_query(consulta)
+            cached = semantic_cache.get(query_embedding)
+            if cached is not None:
+                print(f"⚡ Caché semántica (hit): {semantic_cache.stats()}")
+                return cached
+        except Exception as e:
+            print(f"⚠️ Caché semántica no disponible: {e}")
+
     # Seleccionar estrategia de búsqueda
     if use_multi_query:
-        docs = rag_system.buscar_multi_query_paralelo(consulta, k_per_query=2)
+        docs = rag_system.buscar_multi_query_paralelo(
+            consulta, k_per_query=2, query_embedding=query_embedding
+        )
     else:
         docs = rag_system.search_documents(consulta, k=4)
 
@@ -397,7 +430,10 @@ def buscar_documentacion_financiera(consulta: str, use_multi_query: bool = True)
             f"Contenido:\n{doc.page_content.strip()}"
         )
 
-    return f"📚 Información encontrada:\n\n" + "\n\n".join(context_parts)
+    resultado = f"📚 Información encontrada:\n\n" + "\n\n".join(context_parts)
+    if query_embedding is not None:
+        semantic_cache.put(query_embedding, resultado)
+    return resultado
 
 
 print("✅ Módulo RAG optimizado cargado (Multi-query + Índice inverso)")
@@ -0,0 +1,135 @@
+"""
+semantic_cache.py
+Caché semántica (LSH) para las búsquedas RAG.
+
+Consultas casi idénticas ("¿Qué es el WACC?" / "Explica el WACC") producen
+embeddings muy parecidos: si la similitud coseno con una consulta ya
+respondida supera el umbral, se devuelve el contexto guardado sin volver a
+lanzar el multi-query contra Elasticsearch.
+
+Localizar candidatos usa Locality Sensitive Hashing con hiperplanos
+aleatorios: cada tabla resume el vector en `n_bits` signos y solo se
+comparan (producto punto con numpy) los vectores que comparten cubeta en
+alguna tabla. Expulsión por TTL + LRU.
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+import numpy as np
+
+
+class SemanticCacheLSH:
+    """Caché de resultados indexada por embedding de la consulta."""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        n_tables: int = 8,
+        n_bits: int = 16,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        seed: int = 42
+    ):
+        self.threshold = threshold
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._rng = np.random.default_rng(seed)
+        self._planes = None  # (n_tables, n_bits, dim): se crean con el primer vector
+        self._bit_weights = 1 << np.arange(n_bits, dtype=np.int64)
+
+        self._tables = [defaultdict(set) for _ in range(n_tables)]
+        # id -> (vector normalizado, resultado, timestamp, hashes)
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _normalizar(self, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hashes(self, vector: np.ndarray) -> tuple:
+        if self._planes is None:
+            self._planes = self._rng.standard_normal(
+                (self.n_tables, self.n_bits, vector.shape[0])
+            ).astype(np.float32)
+        bits = (self._planes @ vector) > 0  # (n_tables, n_bits)
+        return tuple((bits @ self._bit_weights).tolist())
+
+    def _eliminar(self, entry_id: int):
+        _, _, _, hashes = self._entries.pop(entry_id)
+        for table, key in zip(self._tables, hashes):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del table[key]
+
+    def get(self, embedding) -> Optional[str]:
+        """Resultado de la consulta más parecida (>= threshold) o None."""
+        vector = self._normalizar(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            hashes = self._hashes(vector)
+            candidatos = set()
+            for table, key in zip(self._tables, hashes):
+                candidatos.update(table.get(key, ()))
+
+            mejor_id, mejor_sim = None, self.threshold
+            for entry_id in candidatos:
+                entry_vector, _, ts, _ = self._entries[entry_id]
+                if now - ts > self.ttl_seconds:
+                    self._eliminar(entry_id)
+                    continue
+                similitud = float(entry_vector @ vector)
+                if similitud >= mejor_sim:
+                    mejor_id, mejor_sim = entry_id, similitud
+
+            if mejor_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(mejor_id)
+            self.hits += 1
+            return self._entries[mejor_id][1]
+
+    def put(self, embedding, resultado: str):
+        """Guarda el resultado de una consulta (expulsa la más antigua si está llena)."""
+        vector = self._normalizar(embedding)
+
+        with self._lock:
+            hashes = self._hashes(vector)
+            entry_id = self._next_id
+            self._next_id += 1
+
+            self._entries[entry_id] = (vector, resultado, time.monotonic(), hashes)
+            for table, key in zip(self._tables, hashes):
+                table[key].add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._eliminar(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            for table in self._tables:
+                table.clear()
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -32,6 +32,48 @@ st.set_page_config(
     initial_sidebar_state="auto"
 )
 
+# ========================================
+# UTILIDADES DE RESPUESTA
+# ========================================
+
+# Nodos cuyos tokens se muestran en vivo (stream_mode="messages")
+NODOS_EN_VIVO = {"Agente_RAG"}
+
+# Especialistas ReAct: se transmite su nodo interno "agent" (el LLM)
+ESPECIALISTAS_EN_VIVO = {
+    "Agente_Renta_Fija", "Agente_Finanzas_Corp", "Agente_Equity",
+    "Agente_Portafolio", "Agente_Derivados"
+}
+
+
+def es_token_en_vivo(namespace: tuple, metadata: dict) -> bool:
+    """True si el chunk viene de un nodo cuya respuesta se pinta en vivo."""
+    if not namespace:
+        return metadata.get("langgraph_node") in NODOS_EN_VIVO
+    return (
+        metadata.get("langgraph_node") == "agent"
+        and namespace[0].split(":", 1)[0] in ESPECIALISTAS_EN_VIVO
+    )
+
+
+def texto_de_contenido(content, separador: str = "") -> str:
+    """
+    Texto de un mensaje (str o lista de bloques de Anthropic).
+    Los chunks de streaming se concatenan tal cual (""); el mensaje final
+    une sus bloques con "\n" para que no queden pegados.
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        text_parts = []
+        for part in content:
+            if isinstance(part, dict) and 'text' in part:
+                text_parts.append(part['text'])
+            elif isinstance(part, str):
+                text_parts.append(part)
+        return separador.join(text_parts)
+    return ""
+
 # ========================================
 # HEALTH CHECK SYSTEM
 # ========================================
@@ -145,7 +187,7 @@ with st.spinner("🔍 Verificando sistemas..."):
     health = verify_system_health()
 
 # Importar grafo después de health check
-from graph.agent_graph import compiled_graph
+from graph.agent_graph import compiled_graph, GRAPH_RECURSION_LIMIT
 from config import LANGSMITH_ENABLED
 import os
 
@@ -273,7 +315,10 @@ if prompt := st.chat_input("Ej: Calcula VAN: inversión 50k, flujos [15k, 20k, 2
     
     # Preparar entrada para LangGraph
     graph_input = {"messages": [HumanMessage(content=prompt)]}
-    config = {"configurable": {"thread_id": st.session_state.thread_id}}
+    config = {
+        "configurable": {"thread_id": st.session_state.thread_id},
+        "recursion_limit": GRAPH_RECURSION_LIMIT
+    }
     
     # Ejecutar grafo
     with st.chat_message("assistant"):
@@ -289,26 +334,38 @@ if prompt := st.chat_input("Ej: Calcula VAN: inversión 50k, flujos [15k, 20k, 2
                     'thread_id': st.session_state.thread_id
                 })
                 
-                # Invocar grafo
-                final_state = compiled_graph.invoke(graph_input, config=config)
+                # Ejecutar grafo en streaming: los tokens de la síntesis RAG y
+                # de los especialistas se pintan mientras el modelo genera; el
+                # estado final llega por el canal "values" del grafo raíz.
+                # subgraphs=True expone los tokens de los agentes ReAct anidados.
+                final_state = None
+                streamed_text = ""
+                streamed_id = None
+                for namespace, mode, payload in compiled_graph.stream(
+                    graph_input, config=config,
+                    stream_mode=["messages", "values"], subgraphs=True
+                ):
+                    if mode == "values":
+                        if not namespace:
+                            final_state = payload
+                        continue
+                    chunk, metadata = payload
+                    if getattr(chunk, "tool_call_chunks", None) or not es_token_en_vivo(namespace, metadata):
+                        continue
+                    # Mensaje nuevo (p. ej. respuesta tras una tool): se reemplaza el texto
+                    if chunk.id != streamed_id:
+                        streamed_id = chunk.id
+                        streamed_text = ""
+                    streamed_text += texto_de_contenido(chunk.content)
+                    if streamed_text:
+                        message_placeholder.markdown(streamed_text + "▌")
                 
                 # Extraer respuesta final
                 if final_state and "messages" in final_state and final_state["messages"]:
                     for msg in reversed(final_state["messages"]):
                         is_final_ai_msg = isinstance(msg, AIMessage) and not getattr(msg, 'tool_calls', [])
                         if is_final_ai_msg:
-                            content = msg.content
-                            if isinstance(content, str):
-                                final_response_content = content
-                            elif isinstance(content, list):
-                                text_parts = []
-                                for part in content:
-                                    if isinstance(part, dict) and 'text' in part:
-                                        text_parts.append(part['text'])
-                                    elif isinstance(part, str):
-                                        text_parts.append(part)
-                                final_response_content = "\n".join(text_parts).strip()
-                            
+                            final_response_content = texto_de_contenido(msg.content, separador="\n").strip()
                             if final_response_content:
                                 break
                 
@@ -9,7 +9,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from langchain_core.messages import HumanMessage
-from graph.agent_graph import supervisor_node, AgentState
+from graph.agent_graph import supervisor_node, AgentState, precalcular_decisiones
 
 print("🧪 VALIDACIÓN DE ROUTING SIMPLIFICADO")
 print("=" * 60)
@@ -38,6 +38,9 @@ test_cases = [
 
 results = []
 
+# Clasificación L1 de todos los casos en una sola llamada batch
+precalcular_decisiones([test['query'] for test in test_cases])
+
 for i, test in enumerate(test_cases, 1):
     print(f"\n{test['name']}")
     print("-" * 60)
@@ -224,6 +224,62 @@ def test_agent_fin_corp_rechaza_teoria(agent_fin_corp):
         "El agente intentó usar herramientas en una pregunta teórica"
 
 
+# ========================================
+# TESTS PROMPT CACHING
+# ========================================
+
+def test_fallbacks_descartan_cache_control():
+    """Los modelos de fallback no reciben la clave cache_control de Anthropic"""
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import SystemMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from config import _modelo_sin_cache_control
+
+    recibidos = []
+
+    class ModeloEco(BaseChatModel):
+        @property
+        def _llm_type(self):
+            return "eco"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            recibidos.extend(messages)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    system = SystemMessage(content=[{
+        "type": "text", "text": "Eres un agente.", "cache_control": {"type": "ephemeral"}
+    }])
+    _modelo_sin_cache_control(ModeloEco)().invoke([system, HumanMessage(content="Hola")])
+
+    assert recibidos[0].content == [{"type": "text", "text": "Eres un agente."}]
+    # El mensaje original (compartido con Claude) no se modifica
+    assert "cache_control" in system.content[0]
+
+
+# ========================================
+# TESTS NODO RAG
+# ========================================
+
+def test_rag_sin_contexto_responde_sin_llm():
+    """Búsquedas sin resultados o con error se responden sin síntesis LLM"""
+    from agents.financial_agents import (
+        _respuesta_sin_contexto, RESPUESTA_SIN_CONTEXTO
+    )
+
+    sin_resultados = _respuesta_sin_contexto(
+        "No se encontró información relevante en la base de datos. Intenta reformular tu pregunta."
+    )
+    assert sin_resultados.content == RESPUESTA_SIN_CONTEXTO
+
+    error = _respuesta_sin_contexto("Error de Conexión con RAG: timed out")
+    assert "ERROR_BLOQUEANTE" in error.content
+
+    assert _respuesta_sin_contexto("   ") is not None
+
+    contexto = "📚 Información encontrada:\n\n--- Fragmento 1 ---\nContenido:\n" + "WACC " * 20
+    assert _respuesta_sin_contexto(contexto) is None
+
+
 # ========================================
 # RUNNER
 # ========================================
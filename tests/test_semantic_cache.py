@@ -0,0 +1,118 @@
+"""
+Tests para la caché semántica (LSH) de las búsquedas RAG.
+Valida aciertos, fallos, expiración por TTL y expulsión LRU.
+"""
+
+import numpy as np
+import pytest
+
+
+# ========================================
+# FIXTURES
+# ========================================
+
+@pytest.fixture
+def vector():
+    """Embedding de referencia (dimensión reducida)"""
+    return np.random.default_rng(0).standard_normal(64)
+
+
+def _sin_huerfanos(cache):
+    """Las cubetas de las tablas solo referencian entradas vivas"""
+    ids_en_tablas = set()
+    for table in cache._tables:
+        for bucket in table.values():
+            assert bucket, "Cubeta vacía sin eliminar"
+            ids_en_tablas |= bucket
+    return ids_en_tablas == set(cache._entries)
+
+
+# ========================================
+# TESTS ACIERTOS / FALLOS
+# ========================================
+
+def test_cache_acierto_exacto(vector):
+    """Test que el mismo embedding devuelve el resultado guardado"""
+    from rag.semantic_cache import SemanticCacheLSH
+
+    cache = SemanticCacheLSH()
+    cache.put(vector, "contexto WACC")
+
+    assert cache.get(vector) == "contexto WACC"
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_acierto_casi_duplicado(vector):
+    """Test que un embedding con similitud >= 0.95 reutiliza el resultado"""
+    from rag.semantic_cache import SemanticCacheLSH
+
+    ruido = np.random.default_rng(1).standard_normal(64)
+    parecido = vector + 0.1 * ruido
+    similitud = parecido @ vector / (np.linalg.norm(parecido) * np.linalg.norm(vector))
+    assert similitud >= 0.95
+
+    cache = SemanticCacheLSH(threshold=0.95)
+    cache.put(vector, "contexto WACC")
+
+    assert cache.get(parecido) == "contexto WACC"
+
+
+def test_cache_fallo_vector_distinto(vector):
+    """Test que una consulta no relacionada no reutiliza el resultado"""
+    from rag.semantic_cache import SemanticCacheLSH
+
+    otro = np.random.default_rng(2).standard_normal(64)
+
+    cache = SemanticCacheLSH()
+    cache.put(vector, "contexto WACC")
+
+    assert cache.get(otro) is None
+    assert cache.stats()["misses"] == 1
+
+
+# ========================================
+# TESTS EXPULSIÓN
+# ========================================
+
+def test_cache_expira_por_ttl(vector, monkeypatch):
+    """Test que una entrada caducada no se devuelve y sale de las cubetas"""
+    from rag import semantic_cache
+
+    ahora = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: ahora[0])
+
+    cache = semantic_cache.SemanticCacheLSH(ttl_seconds=60)
+    cache.put(vector, "contexto WACC")
+    assert cache.get(vector) == "contexto WACC"
+
+    ahora[0] += 61
+    assert cache.get(vector) is None
+    assert not cache._entries
+    assert all(not table for table in cache._tables)
+
+
+def test_cache_max_entries_sin_ids_huerfanos():
+    """Test que la expulsión LRU respeta max_entries y limpia las tablas"""
+    from rag.semantic_cache import SemanticCacheLSH
+
+    rng = np.random.default_rng(3)
+    vectores = [rng.standard_normal(64) for _ in range(10)]
+
+    cache = SemanticCacheLSH(max_entries=3)
+    for i, v in enumerate(vectores):
+        cache.put(v, f"resultado {i}")
+
+    assert len(cache._entries) == 3
+    assert _sin_huerfanos(cache)
+
+    # Las más antiguas se expulsaron; las últimas siguen disponibles
+    assert cache.get(vectores[0]) is None
+    assert cache.get(vectores[-1]) == "resultado 9"
+
+
+# ========================================
+# RUNNER
+# ========================================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -44,7 +44,7 @@ def _calcular_valor_presente_bono(
     frecuencia_cupon: int
 ) -> dict:
     """Calcula el valor presente de un bono."""
-    logger.info(f"🔧 Calculando valor de bono: nominal={valor_nominal}, años={num_anos}")
+    logger.info("🔧 Calculando valor de bono: nominal=%s, años=%s", valor_nominal, num_anos)
     
     try:
         tasa_cupon_periodo = (tasa_cupon_anual / 100) / frecuencia_cupon
@@ -72,14 +72,14 @@ def _calcular_valor_presente_bono(
         logger.error("❌ Overflow en cálculo de bono")
         return {"error": "Error de cálculo: Overflow. Verifica tasas muy grandes o periodos largos."}
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de bono: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de bono: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando valor del bono: {type(e).__name__}"}
 
 
 @tool("calcular_van", args_schema=VANInput)
 def _calcular_van(tasa_descuento: float, inversion_inicial: float, flujos_caja: List[float]) -> dict:
     """Calcula el Valor Actual Neto (VAN) de un proyecto."""
-    logger.info(f"🔧 Calculando VAN: inversión={inversion_inicial}, flujos={len(flujos_caja)}")
+    logger.info("🔧 Calculando VAN: inversión=%s, flujos=%s", inversion_inicial, len(flujos_caja))
     
     try:
         tasa = tasa_descuento / 100
@@ -95,14 +95,14 @@ def _calcular_van(tasa_descuento: float, inversion_inicial: float, flujos_caja:
         return {"van": round(van, 2), "interpretacion": "Si VAN > 0, el proyecto es rentable."}
         
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de VAN: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de VAN: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando VAN: {type(e).__name__}"}
 
 
 @tool("calcular_opcion_call", args_schema=OpcionCallInput)
 def _calcular_opcion_call(S: float, K: float, T: float, r: float, sigma: float) -> dict:
     """Calcula el valor de una Opción Call Europea usando Black-Scholes."""
-    logger.info(f"🔧 Calculando opción call: S={S}, K={K}, T={T}")
+    logger.info("🔧 Calculando opción call: S=%s, K=%s, T=%s", S, K, T)
     
     try:
         if T <= 0 or sigma <= 0 or S <= 0 or K <= 0:
@@ -114,7 +114,7 @@ def _calcular_opcion_call(S: float, K: float, T: float, r: float, sigma: float)
         
         if sigma_dec == 0:
             call_price = max(S - K * np.exp(-r_dec * T), 0)
-            logger.info(f"✅ Opción call (σ=0): ${call_price:.4f}")
+            logger.info("✅ Opción call (σ=0): $%.4f", call_price)
             return {"valor_opcion_call": round(call_price, 4)}
         
         denominator = sigma_dec * np.sqrt(T)
@@ -124,17 +124,17 @@ def _calcular_opcion_call(S: float, K: float, T: float, r: float, sigma: float)
         call_price = (S * norm.cdf(d1) - K * np.exp(-r_dec * T) * norm.cdf(d2))
         call_price = max(call_price, 0)
         
-        logger.info(f"✅ Opción call calculada: ${call_price:.4f}")
+        logger.info("✅ Opción call calculada: $%.4f", call_price)
         return {"valor_opcion_call": round(call_price, 4)}
         
     except OverflowError:
         logger.error("❌ Overflow en cálculo de opción")
         return {"error": "Error de cálculo: Overflow. Verifica inputs muy grandes/pequeños."}
     except ValueError as ve:
-        logger.error(f"❌ Error matemático en opción: {ve}")
+        logger.error("❌ Error matemático en opción: %s", ve)
         return {"error": f"Error matemático: {ve}. Verifica los inputs (S, K > 0)."}
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de opción: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de opción: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Opción Call: {type(e).__name__}"}
 
 
@@ -147,7 +147,7 @@ def _calcular_wacc(
     valor_mercado_equity: float
 ) -> dict:
     """Calcula el Costo Promedio Ponderado de Capital (WACC)."""
-    logger.info(f"🔧 Calculando WACC: D={valor_mercado_deuda}, E={valor_mercado_equity}")
+    logger.info("🔧 Calculando WACC: D=%s, E=%s", valor_mercado_deuda, valor_mercado_equity)
     
     try:
         t_c = tasa_impuestos / 100
@@ -173,36 +173,36 @@ def _calcular_wacc(
         
         wacc = weight_e * k_e + weight_d * k_d * (1 - t_c)
         
-        logger.info(f"✅ WACC calculado: {wacc*100:.4f}%")
+        logger.info("✅ WACC calculado: %.4f%%", wacc*100)
         return {"wacc_porcentaje": round(wacc * 100, 4)}
         
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de WACC: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de WACC: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando WACC: {type(e).__name__}"}
 
 
 @tool("calcular_capm", args_schema=CAPMInput)
 def _calcular_capm(tasa_libre_riesgo: float, beta: float, retorno_mercado: float) -> dict:
     """Calcula el Costo del Equity (Ke) usando el Capital Asset Pricing Model (CAPM)."""
-    logger.info(f"🔧 Calculando CAPM: rf={tasa_libre_riesgo}%, β={beta}")
+    logger.info("🔧 Calculando CAPM: rf=%s%%, β=%s", tasa_libre_riesgo, beta)
     
     try:
         rf = tasa_libre_riesgo / 100
         rm = retorno_mercado / 100
         k_e = rf + beta * (rm - rf)
         
-        logger.info(f"✅ Ke (CAPM) calculado: {k_e*100:.4f}%")
+        logger.info("✅ Ke (CAPM) calculado: %.4f%%", k_e*100)
         return {"costo_equity_porcentaje": round(k_e * 100, 4)}
         
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de CAPM: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de CAPM: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando CAPM: {type(e).__name__}"}
 
 
 @tool("calcular_sharpe_ratio", args_schema=SharpeRatioInput)
 def _calcular_sharpe_ratio(retorno_portafolio: float, tasa_libre_riesgo: float, std_dev_portafolio: float) -> dict:
     """Calcula el Ratio de Sharpe para medir el retorno ajustado al riesgo."""
-    logger.info(f"🔧 Calculando Sharpe Ratio: rp={retorno_portafolio}%, σ={std_dev_portafolio}%")
+    logger.info("🔧 Calculando Sharpe Ratio: rp=%s%%, σ=%s%%", retorno_portafolio, std_dev_portafolio)
     
     try:
         r_p = retorno_portafolio / 100
@@ -215,11 +215,11 @@ def _calcular_sharpe_ratio(retorno_portafolio: float, tasa_libre_riesgo: float,
         
         sharpe = (r_p - r_f) / std_p
         
-        logger.info(f"✅ Sharpe Ratio calculado: {sharpe:.4f}")
+        logger.info("✅ Sharpe Ratio calculado: %.4f", sharpe)
         return {"sharpe_ratio": round(sharpe, 4)}
         
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Sharpe: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Sharpe: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Sharpe Ratio: {type(e).__name__}"}
 
 
@@ -230,7 +230,7 @@ def _calcular_gordon_growth(
     tasa_crecimiento_dividendos: float
 ) -> dict:
     """Calcula el valor de una acción usando el Modelo de Crecimiento de Gordon (DDM)."""
-    logger.info(f"🔧 Calculando Gordon Growth: D1={dividendo_prox_periodo}, Ke={tasa_descuento_equity}%")
+    logger.info("🔧 Calculando Gordon Growth: D1=%s, Ke=%s%%", dividendo_prox_periodo, tasa_descuento_equity)
     
     try:
         D1 = dividendo_prox_periodo
@@ -256,11 +256,11 @@ def _calcular_gordon_growth(
             logger.error("❌ Valor negativo inesperado")
             return {"error": "El cálculo resultó en un valor negativo inesperado."}
         
-        logger.info(f"✅ Valor acción calculado: ${valor_accion:.2f}")
+        logger.info("✅ Valor acción calculado: $%.2f", valor_accion)
         return {"valor_intrinseco_accion": round(valor_accion, 2)}
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Gordon: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Gordon: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Gordon Growth: {type(e).__name__}"}
 
 
@@ -273,7 +273,7 @@ def _calcular_gordon_growth(
 @tool("calcular_tir", args_schema=IRRInput)
 def _calcular_tir(inversion_inicial: float, flujos_caja: List[float]) -> dict:
     """Calcula la Tasa Interna de Retorno (IRR) de un proyecto."""
-    logger.info(f"🔧 Calculando TIR: inversión={inversion_inicial}, flujos={len(flujos_caja)}")
+    logger.info("🔧 Calculando TIR: inversión=%s, flujos=%s", inversion_inicial, len(flujos_caja))
 
     try:
         if not all(isinstance(fc, (int, float)) for fc in flujos_caja):
@@ -292,21 +292,21 @@ def _calcular_tir(inversion_inicial: float, flujos_caja: List[float]) -> dict:
 
         irr_porcentaje = irr * 100
 
-        logger.info(f"✅ TIR calculada: {irr_porcentaje:.4f}%")
+        logger.info("✅ TIR calculada: %.4f%%", irr_porcentaje)
         return {
             "tir_porcentaje": round(irr_porcentaje, 4),
             "interpretacion": f"La TIR es {irr_porcentaje:.2f}%. Si TIR > tasa de descuento, el proyecto es aceptable."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de TIR: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de TIR: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando TIR: {type(e).__name__}"}
 
 
 @tool("calcular_payback_period", args_schema=PaybackPeriodInput)
 def _calcular_payback_period(inversion_inicial: float, flujos_caja: List[float]) -> dict:
     """Calcula el Periodo de Recuperación (Payback Period) en años."""
-    logger.info(f"🔧 Calculando Payback Period: inversión={inversion_inicial}")
+    logger.info("🔧 Calculando Payback Period: inversión=%s", inversion_inicial)
 
     try:
         if not flujos_caja:
@@ -322,7 +322,7 @@ def _calcular_payback_period(inversion_inicial: float, flujos_caja: List[float])
                 fraccion_ano = faltante / flujo if flujo > 0 else 0
                 payback = (i - 1) + fraccion_ano
 
-                logger.info(f"✅ Payback Period calculado: {payback:.2f} años")
+                logger.info("✅ Payback Period calculado: %.2f años", payback)
                 return {
                     "payback_period_anos": round(payback, 2),
                     "interpretacion": f"El proyecto recupera la inversión en {payback:.2f} años."
@@ -336,14 +336,14 @@ def _calcular_payback_period(inversion_inicial: float, flujos_caja: List[float])
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Payback: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Payback: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Payback Period: {type(e).__name__}"}
 
 
 @tool("calcular_profitability_index", args_schema=ProfitabilityIndexInput)
 def _calcular_profitability_index(tasa_descuento: float, inversion_inicial: float, flujos_caja: List[float]) -> dict:
     """Calcula el Índice de Rentabilidad (Profitability Index)."""
-    logger.info(f"🔧 Calculando Profitability Index")
+    logger.info("🔧 Calculando Profitability Index")
 
     try:
         tasa = tasa_descuento / 100
@@ -354,7 +354,7 @@ def _calcular_profitability_index(tasa_descuento: float, inversion_inicial: floa
         # PI = PV(flujos futuros) / Inversión Inicial
         pi = pv_flujos / inversion_inicial
 
-        logger.info(f"✅ Profitability Index calculado: {pi:.4f}")
+        logger.info("✅ Profitability Index calculado: %.4f", pi)
         return {
             "profitability_index": round(pi, 4),
             "interpretacion": f"PI = {pi:.4f}. Si PI > 1, el proyecto crea valor. Si PI < 1, destruye valor."
@@ -364,7 +364,7 @@ def _calcular_profitability_index(tasa_descuento: float, inversion_inicial: floa
         logger.error("❌ División por cero en PI")
         return {"error": "La inversión inicial no puede ser cero."}
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de PI: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de PI: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Profitability Index: {type(e).__name__}"}
 
 
@@ -379,7 +379,7 @@ def _calcular_duration_macaulay(
     frecuencia_cupon: int
 ) -> dict:
     """Calcula la Duration Macaulay de un bono en años."""
-    logger.info(f"🔧 Calculando Duration Macaulay")
+    logger.info("🔧 Calculando Duration Macaulay")
 
     try:
         tasa_cupon_periodo = (tasa_cupon_anual / 100) / frecuencia_cupon
@@ -411,21 +411,21 @@ def _calcular_duration_macaulay(
         # Convertir a años
         duration_anos = duration_periodos / frecuencia_cupon
 
-        logger.info(f"✅ Duration Macaulay calculada: {duration_anos:.4f} años")
+        logger.info("✅ Duration Macaulay calculada: %.4f años", duration_anos)
         return {
             "duration_macaulay_anos": round(duration_anos, 4),
             "interpretacion": f"La Duration Macaulay es {duration_anos:.2f} años (tiempo promedio ponderado de los flujos)."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Duration Macaulay: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Duration Macaulay: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Duration Macaulay: {type(e).__name__}"}
 
 
 @tool("calcular_duration_modificada", args_schema=DurationModificadaInput)
 def _calcular_duration_modificada(duration_macaulay: float, ytm_anual: float, frecuencia_cupon: int) -> dict:
     """Calcula la Duration Modificada (sensibilidad del precio del bono)."""
-    logger.info(f"🔧 Calculando Duration Modificada")
+    logger.info("🔧 Calculando Duration Modificada")
 
     try:
         ytm_periodo = (ytm_anual / 100) / frecuencia_cupon
@@ -433,14 +433,14 @@ def _calcular_duration_modificada(duration_macaulay: float, ytm_anual: float, fr
         # Modified Duration = Macaulay Duration / (1 + YTM_per_period)
         duration_modificada = duration_macaulay / (1 + ytm_periodo)
 
-        logger.info(f"✅ Duration Modificada calculada: {duration_modificada:.4f}")
+        logger.info("✅ Duration Modificada calculada: %.4f", duration_modificada)
         return {
             "duration_modificada": round(duration_modificada, 4),
             "interpretacion": f"Por cada 1% de cambio en YTM, el precio del bono cambia aproximadamente {duration_modificada:.2f}%."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Duration Modificada: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Duration Modificada: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Duration Modificada: {type(e).__name__}"}
 
 
@@ -453,7 +453,7 @@ def _calcular_convexity(
     frecuencia_cupon: int
 ) -> dict:
     """Calcula la Convexity de un bono."""
-    logger.info(f"🔧 Calculando Convexity")
+    logger.info("🔧 Calculando Convexity")
 
     try:
         tasa_cupon_periodo = (tasa_cupon_anual / 100) / frecuencia_cupon
@@ -480,26 +480,26 @@ def _calcular_convexity(
         # Convexity = convexity_sum / (PV_total * (1 + y)^2 * frecuencia^2)
         convexity = convexity_sum / (pv_total * (1 + ytm_periodo)**2 * frecuencia_cupon**2)
 
-        logger.info(f"✅ Convexity calculada: {convexity:.4f}")
+        logger.info("✅ Convexity calculada: %.4f", convexity)
         return {
             "convexity": round(convexity, 4),
             "interpretacion": f"Convexity = {convexity:.4f}. Mide la curvatura de la relación precio-yield."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Convexity: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Convexity: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Convexity: {type(e).__name__}"}
 
 
 @tool("calcular_current_yield", args_schema=CurrentYieldInput)
 def _calcular_current_yield(pago_cupon_anual: float, precio_actual_bono: float) -> dict:
     """Calcula el Current Yield de un bono."""
-    logger.info(f"🔧 Calculando Current Yield")
+    logger.info("🔧 Calculando Current Yield")
 
     try:
         current_yield = (pago_cupon_anual / precio_actual_bono) * 100
 
-        logger.info(f"✅ Current Yield calculado: {current_yield:.4f}%")
+        logger.info("✅ Current Yield calculado: %.4f%%", current_yield)
         return {
             "current_yield_porcentaje": round(current_yield, 4),
             "interpretacion": f"El Current Yield es {current_yield:.2f}% (retorno anual del cupón sobre el precio actual)."
@@ -509,14 +509,14 @@ def _calcular_current_yield(pago_cupon_anual: float, precio_actual_bono: float)
         logger.error("❌ División por cero en Current Yield")
         return {"error": "El precio actual del bono no puede ser cero."}
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Current Yield: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Current Yield: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Current Yield: {type(e).__name__}"}
 
 
 @tool("calcular_bono_cupon_cero", args_schema=BonoCuponCeroInput)
 def _calcular_bono_cupon_cero(valor_nominal: float, ytm_anual: float, num_anos: float) -> dict:
     """Calcula el valor presente de un Bono Cupón Cero (Zero-Coupon Bond)."""
-    logger.info(f"🔧 Calculando Bono Cupón Cero: nominal={valor_nominal}, años={num_anos}")
+    logger.info("🔧 Calculando Bono Cupón Cero: nominal=%s, años=%s", valor_nominal, num_anos)
 
     try:
         ytm = ytm_anual / 100
@@ -524,14 +524,14 @@ def _calcular_bono_cupon_cero(valor_nominal: float, ytm_anual: float, num_anos:
         # PV = FV / (1 + r)^T
         pv = valor_nominal / (1 + ytm)**num_anos
 
-        logger.info(f"✅ Valor bono cupón cero: ${pv:.2f}")
+        logger.info("✅ Valor bono cupón cero: $%.2f", pv)
         return {
             "valor_presente": round(pv, 2),
             "interpretacion": f"El valor presente del bono cupón cero es ${pv:,.2f}."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de bono cupón cero: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de bono cupón cero: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando bono cupón cero: {type(e).__name__}"}
 
 
@@ -540,7 +540,7 @@ def _calcular_bono_cupon_cero(valor_nominal: float, ytm_anual: float, num_anos:
 @tool("calcular_opcion_put", args_schema=OpcionPutInput)
 def _calcular_opcion_put(S: float, K: float, T: float, r: float, sigma: float) -> dict:
     """Calcula el valor de una Opción Put Europea usando Black-Scholes."""
-    logger.info(f"🔧 Calculando opción put: S={S}, K={K}, T={T}")
+    logger.info("🔧 Calculando opción put: S=%s, K=%s, T=%s", S, K, T)
 
     try:
         if T <= 0 or sigma <= 0 or S <= 0 or K <= 0:
@@ -552,7 +552,7 @@ def _calcular_opcion_put(S: float, K: float, T: float, r: float, sigma: float) -
 
         if sigma_dec == 0:
             put_price = max(K * np.exp(-r_dec * T) - S, 0)
-            logger.info(f"✅ Opción put (σ=0): ${put_price:.4f}")
+            logger.info("✅ Opción put (σ=0): $%.4f", put_price)
             return {"valor_opcion_put": round(put_price, 4)}
 
         denominator = sigma_dec * np.sqrt(T)
@@ -563,14 +563,14 @@ def _calcular_opcion_put(S: float, K: float, T: float, r: float, sigma: float) -
         put_price = (K * np.exp(-r_dec * T) * norm.cdf(-d2) - S * norm.cdf(-d1))
         put_price = max(put_price, 0)
 
-        logger.info(f"✅ Opción put calculada: ${put_price:.4f}")
+        logger.info("✅ Opción put calculada: $%.4f", put_price)
         return {"valor_opcion_put": round(put_price, 4)}
 
     except OverflowError:
         logger.error("❌ Overflow en cálculo de opción put")
         return {"error": "Error de cálculo: Overflow. Verifica inputs muy grandes/pequeños."}
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de opción put: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de opción put: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Opción Put: {type(e).__name__}"}
 
 
@@ -584,7 +584,7 @@ def _calcular_put_call_parity(
     tasa_libre_riesgo: float
 ) -> dict:
     """Verifica la Put-Call Parity: C + PV(K) = P + S."""
-    logger.info(f"🔧 Verificando Put-Call Parity")
+    logger.info("🔧 Verificando Put-Call Parity")
 
     try:
         r = tasa_libre_riesgo / 100
@@ -602,7 +602,7 @@ def _calcular_put_call_parity(
 
         es_valida = diferencia < 0.01  # Tolerancia de 1 centavo
 
-        logger.info(f"✅ Put-Call Parity verificada: válida={es_valida}")
+        logger.info("✅ Put-Call Parity verificada: válida=%s", es_valida)
         return {
             "call_mas_pv_strike": round(lado_izq, 4),
             "put_mas_spot": round(lado_der, 4),
@@ -612,7 +612,7 @@ def _calcular_put_call_parity(
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en Put-Call Parity: {type(e).__name__} - {e}")
+        logger.error("❌ Error en Put-Call Parity: %s - %s", type(e).__name__, e)
         return {"error": f"Error verificando Put-Call Parity: {type(e).__name__}"}
 
 
@@ -621,7 +621,7 @@ def _calcular_put_call_parity(
 @tool("calcular_treynor_ratio", args_schema=TreynorRatioInput)
 def _calcular_treynor_ratio(retorno_portafolio: float, tasa_libre_riesgo: float, beta_portafolio: float) -> dict:
     """Calcula el Treynor Ratio (retorno ajustado por riesgo sistemático)."""
-    logger.info(f"🔧 Calculando Treynor Ratio")
+    logger.info("🔧 Calculando Treynor Ratio")
 
     try:
         r_p = retorno_portafolio / 100
@@ -633,14 +633,14 @@ def _calcular_treynor_ratio(retorno_portafolio: float, tasa_libre_riesgo: float,
 
         treynor = (r_p - r_f) / beta_portafolio
 
-        logger.info(f"✅ Treynor Ratio calculado: {treynor:.4f}")
+        logger.info("✅ Treynor Ratio calculado: %.4f", treynor)
         return {
             "treynor_ratio": round(treynor, 4),
             "interpretacion": f"Treynor Ratio = {treynor:.4f}. Mayor valor indica mejor retorno ajustado por riesgo sistemático."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Treynor: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Treynor: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Treynor Ratio: {type(e).__name__}"}
 
 
@@ -652,7 +652,7 @@ def _calcular_jensen_alpha(
     retorno_mercado: float
 ) -> dict:
     """Calcula Jensen's Alpha (exceso de retorno vs CAPM)."""
-    logger.info(f"🔧 Calculando Jensen's Alpha")
+    logger.info("🔧 Calculando Jensen's Alpha")
 
     try:
         r_p = retorno_portafolio / 100
@@ -666,14 +666,14 @@ def _calcular_jensen_alpha(
         alpha = r_p - retorno_esperado_capm
         alpha_porcentaje = alpha * 100
 
-        logger.info(f"✅ Jensen's Alpha calculado: {alpha_porcentaje:.4f}%")
+        logger.info("✅ Jensen's Alpha calculado: %.4f%%", alpha_porcentaje)
         return {
             "jensen_alpha_porcentaje": round(alpha_porcentaje, 4),
             "interpretacion": f"Jensen's Alpha = {alpha_porcentaje:.2f}%. Alpha > 0 indica desempeño superior al mercado."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Jensen's Alpha: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Jensen's Alpha: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Jensen's Alpha: {type(e).__name__}"}
 
 
@@ -685,26 +685,26 @@ def _calcular_beta_portafolio(
     beta_activo_2: float
 ) -> dict:
     """Calcula el Beta de un portafolio de 2 activos."""
-    logger.info(f"🔧 Calculando Beta de Portafolio")
+    logger.info("🔧 Calculando Beta de Portafolio")
 
     try:
         # Validar que los pesos sumen 1
         suma_pesos = peso_activo_1 + peso_activo_2
         if not (0.99 <= suma_pesos <= 1.01):
-            logger.warning(f"⚠️ Pesos no suman 1 (suma={suma_pesos})")
+            logger.warning("⚠️ Pesos no suman 1 (suma=%s)", suma_pesos)
             return {"error": f"Los pesos deben sumar 1.0 (suma actual: {suma_pesos:.4f})"}
 
         # Beta portafolio = w1*β1 + w2*β2
         beta_portfolio = peso_activo_1 * beta_activo_1 + peso_activo_2 * beta_activo_2
 
-        logger.info(f"✅ Beta portafolio calculado: {beta_portfolio:.4f}")
+        logger.info("✅ Beta portafolio calculado: %.4f", beta_portfolio)
         return {
             "beta_portafolio": round(beta_portfolio, 4),
             "interpretacion": f"El beta del portafolio es {beta_portfolio:.4f} (riesgo sistemático)."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Beta portafolio: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Beta portafolio: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Beta de Portafolio: {type(e).__name__}"}
 
 
@@ -716,25 +716,25 @@ def _calcular_retorno_portafolio(
     retorno_activo_2: float
 ) -> dict:
     """Calcula el Retorno Esperado de un portafolio de 2 activos."""
-    logger.info(f"🔧 Calculando Retorno de Portafolio")
+    logger.info("🔧 Calculando Retorno de Portafolio")
 
     try:
         suma_pesos = peso_activo_1 + peso_activo_2
         if not (0.99 <= suma_pesos <= 1.01):
-            logger.warning(f"⚠️ Pesos no suman 1 (suma={suma_pesos})")
+            logger.warning("⚠️ Pesos no suman 1 (suma=%s)", suma_pesos)
             return {"error": f"Los pesos deben sumar 1.0 (suma actual: {suma_pesos:.4f})"}
 
         # E(Rp) = w1*R1 + w2*R2
         retorno_portfolio = peso_activo_1 * retorno_activo_1 + peso_activo_2 * retorno_activo_2
 
-        logger.info(f"✅ Retorno portafolio calculado: {retorno_portfolio:.4f}%")
+        logger.info("✅ Retorno portafolio calculado: %.4f%%", retorno_portfolio)
         return {
             "retorno_esperado_porcentaje": round(retorno_portfolio, 4),
             "interpretacion": f"El retorno esperado del portafolio es {retorno_portfolio:.2f}%."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Retorno portafolio: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Retorno portafolio: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Retorno de Portafolio: {type(e).__name__}"}
 
 
@@ -747,12 +747,12 @@ def _calcular_std_dev_portafolio(
     correlacion: float
 ) -> dict:
     """Calcula la Desviación Estándar de un portafolio de 2 activos."""
-    logger.info(f"🔧 Calculando Desviación Estándar de Portafolio")
+    logger.info("🔧 Calculando Desviación Estándar de Portafolio")
 
     try:
         suma_pesos = peso_activo_1 + peso_activo_2
         if not (0.99 <= suma_pesos <= 1.01):
-            logger.warning(f"⚠️ Pesos no suman 1 (suma={suma_pesos})")
+            logger.warning("⚠️ Pesos no suman 1 (suma=%s)", suma_pesos)
             return {"error": f"Los pesos deben sumar 1.0 (suma actual: {suma_pesos:.4f})"}
 
         # Convertir % a decimal
@@ -768,14 +768,14 @@ def _calcular_std_dev_portafolio(
 
         std_dev_portfolio = np.sqrt(varianza_portfolio) * 100  # Convertir a %
 
-        logger.info(f"✅ Desviación estándar portafolio: {std_dev_portfolio:.4f}%")
+        logger.info("✅ Desviación estándar portafolio: %.4f%%", std_dev_portfolio)
         return {
             "std_dev_portafolio_porcentaje": round(std_dev_portfolio, 4),
             "interpretacion": f"La desviación estándar del portafolio es {std_dev_portfolio:.2f}% (riesgo total)."
         }
 
     except Exception as e:
-        logger.error(f"❌ Error en cálculo de Std Dev portafolio: {type(e).__name__} - {e}")
+        logger.error("❌ Error en cálculo de Std Dev portafolio: %s - %s", type(e).__name__, e)
         return {"error": f"Error calculando Desviación Estándar de Portafolio: {type(e).__name__}"}
 
 
@@ -814,4 +814,4 @@ financial_tool_list = [
     _calcular_std_dev_portafolio,
 ]
 
-logger.info(f"✅ Módulo financial_tools cargado ({len(financial_tool_list)} herramientas)")
\ No newline at end of file
+logger.info("✅ Módulo financial_tools cargado (%s herramientas)", len(financial_tool_list))
\ No newline at end of file